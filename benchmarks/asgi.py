@@ -0,0 +1,122 @@
+"""
+Threaded Flask against the ASGI serving mode, in process: session reads at a given concurrency, and
+the threads held and the wake up latency of waiting long-polls when the session changes.
+
+    $ python -m benchmarks.asgi [--requests 2000] [--concurrency 16] [--waiters 100 1000]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ssshare.app import app
+from ssshare.asgi import AsgiApp
+from ssshare.control import session_notifier
+
+
+async def _asgi(asgi_app, method: str, path: str, query: str = '', body=None) -> int:
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'root_path': '',
+        'query_string': query.encode(), 'headers': []
+    }
+    requests = [{'type': 'http.request', 'body': body and json.dumps(body).encode() or b''}]
+    response = {}
+
+    async def receive():
+        return requests and requests.pop() or {'type': 'http.disconnect'}
+
+    async def send(message):
+        response.setdefault('status', message.get('status'))
+    await asgi_app(scope, receive, send)
+    return response['status']
+
+
+def _session(client):
+    response = client.post('/split', data=json.dumps({
+        'client_alias': 'master',
+        'session_alias': 'benchmark',
+        'session_policies': {'shares': 5, 'quorum': 3}
+    }))
+    return response.json['session_id'], response.json['session']['users'][0]['auth']
+
+
+def _listening(key: str, waiters: int) -> bool:
+    listeners = session_notifier._keys.get(key)
+    return bool(listeners) and listeners.count >= waiters
+
+
+def threaded_reads(path: str, query: str, requests: int, concurrency: int) -> float:
+    def _get(_):
+        assert app.test_client().get(path + '?' + query).status_code == 200
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(_get, range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def asgi_reads(path: str, query: str, requests: int, concurrency: int) -> float:
+    async def _reads():
+        asgi_app, semaphore = AsgiApp(), asyncio.Semaphore(concurrency)
+
+        async def _get():
+            async with semaphore:
+                assert await _asgi(asgi_app, 'GET', path, query) == 200
+        await asyncio.gather(*(_get() for _ in range(requests)))
+    start = time.perf_counter()
+    asyncio.run(_reads())
+    return requests / (time.perf_counter() - start)
+
+
+def threaded_long_polls(waiters: int):
+    session_id, auth = _session(app.test_client())
+    url = '/split/%s/events?auth=%s&client_alias=master&version=1' % (session_id, auth)
+    threads = [threading.Thread(target=lambda: app.test_client().get(url)) for _ in range(waiters)]
+    for thread in threads:
+        thread.start()
+    while not _listening('split/' + session_id, waiters):
+        time.sleep(0.01)
+    start = time.perf_counter()
+    app.test_client().put('/split/%s' % session_id, data=json.dumps({'client_alias': 'shareholder'}))
+    for thread in threads:
+        thread.join()
+    return waiters, time.perf_counter() - start
+
+
+def asgi_long_polls(waiters: int):
+    async def _long_polls():
+        asgi_app = AsgiApp()
+        session_id, auth = _session(app.test_client())
+        path, query = '/split/%s/events' % session_id, 'auth=%s&client_alias=master&version=1' % auth
+        polls = [asyncio.ensure_future(_asgi(asgi_app, 'GET', path, query)) for _ in range(waiters)]
+        while not _listening('split/' + session_id, waiters):
+            await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        await _asgi(asgi_app, 'PUT', '/split/%s' % session_id, body={'client_alias': 'shareholder'})
+        assert set(await asyncio.gather(*polls)) == {200}
+        return len(asgi_app.executor._threads), time.perf_counter() - start
+    return asyncio.run(_long_polls())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--waiters', type=int, nargs='+', default=[100, 1000])
+    args = parser.parse_args()
+    session_id, auth = _session(app.test_client())
+    path, query = '/split/%s' % session_id, 'auth=%s&client_alias=master' % auth
+    print('session reads, {} requests at concurrency {}'.format(args.requests, args.concurrency))
+    print('{:>10} {:>12}'.format('mode', 'req/s'))
+    print('{:>10} {:>12.0f}'.format('threaded', threaded_reads(path, query, args.requests, args.concurrency)))
+    print('{:>10} {:>12.0f}'.format('asgi', asgi_reads(path, query, args.requests, args.concurrency)))
+    print('\nlong-polls woken up by a session update')
+    print('{:>10} {:>8} {:>10} {:>12}'.format('mode', 'waiters', 'threads', 'wake ms'))
+    for waiters in args.waiters:
+        for mode, run in (('threaded', threaded_long_polls), ('asgi', asgi_long_polls)):
+            threads, elapsed = run(waiters)
+            print('{:>10} {:>8} {:>10} {:>12.1f}'.format(mode, waiters, threads, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Session codec, compact and marshal formats, against JSON (bytes as hex) and pickle: encode / decode
+microseconds and payload size.
+
+    $ python -m benchmarks.codec [--users 5 50 250] [--rounds 2000]
+"""
+import argparse
+import json
+import pickle
+import time
+from benchmarks.memory import _session
+from ssshare.repository import codec
+from ssshare.repository.memory import VolatileRepository
+
+
+def _json_encode(data: dict) -> bytes:
+    return json.dumps(data, default=bytes.hex).encode()
+
+
+FORMATS = {
+    'codec': (codec.encode, codec.decode),
+    'marshal': (lambda data: codec.encode(data, compact=False), codec.decode),
+    'json': (_json_encode, json.loads),
+    'pickle': (lambda data: pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+}
+
+
+def _timed(fun, arg, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fun(arg)
+    return (time.perf_counter() - start) * 10 ** 6 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[5, 50, 250])
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+    repo = VolatileRepository(storage=dict())
+    print('{:>8} {:>8} {:>12} {:>12} {:>10}'.format('users', 'format', 'encode us', 'decode us', 'bytes'))
+    for users in args.users:
+        data = _session(users, repo)
+        for name, (encode, decode) in FORMATS.items():
+            payload = encode(data)
+            print('{:>8} {:>8} {:>12.1f} {:>12.1f} {:>10}'.format(
+                users, name, _timed(encode, data, args.rounds), _timed(decode, payload, args.rounds), len(payload)
+            ))
+
+
+if __name__ == '__main__':
+    main()
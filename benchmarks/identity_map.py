@@ -0,0 +1,50 @@
+"""
+SplitSession.get latency on a hot session, rehydrating it on every call against the identity map.
+
+    $ python -m benchmarks.identity_map [--users 5 50 500] [--gets 5000]
+"""
+import argparse
+import time
+from ssshare.control import identity_map
+from ssshare.domain.master import SharedSessionMaster
+from ssshare.domain.split import SplitSession
+
+
+def _session(users: int) -> SplitSession:
+    session = SplitSession.new(
+        master=SharedSessionMaster.new(alias='master'),
+        alias='bench session',
+        policies={'shares': users + 1, 'quorum': users}
+    ).store()
+    session = SplitSession.get(str(session.uuid))
+    for i in range(users):
+        session.join('user %s' % i)
+    return session.update()
+
+
+def run(session_id: str, auth: str, gets: int, size: int) -> float:
+    identity_map.clear()
+    identity_map._size = size
+    start = time.perf_counter()
+    for _ in range(gets):
+        SplitSession.get(session_id, auth=auth)
+    return (time.perf_counter() - start) / gets
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--gets', type=int, default=5000)
+    args = parser.parse_args()
+    size = identity_map._size
+    print('{:>8} {:>16} {:>16} {:>10}'.format('users', 'rehydrate us', 'identity us', 'speedup'))
+    for users in args.users:
+        session = _session(users)
+        auth = str(session.users[-1].uuid)
+        cold = run(str(session.uuid), auth, args.gets, 0)
+        hot = run(str(session.uuid), auth, args.gets, size or 1024)
+        print('{:>8} {:>16.2f} {:>16.2f} {:>9.1f}x'.format(users, cold * 10 ** 6, hot * 10 ** 6, cold / hot))
+
+
+if __name__ == '__main__':
+    main()
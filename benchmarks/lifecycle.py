@@ -0,0 +1,213 @@
+"""
+Full split and combine lifecycles at a given concurrency, latency percentiles per endpoint and throughput.
+
+A lifecycle creates a split session, joins the shareholders, sets the secret, fetches every share, then
+creates a transparent combine session and submits shares until the quorum rebuilds the secret.
+
+    $ python -m benchmarks.lifecycle [--sessions 200] [--concurrency 8] [--users 5] [--quorum 3]
+        [--fxc-stub [--fxc-delay 0.005] | --fxc-url http://localhost:3000] [--url http://localhost:5000]
+        [--output results.json] [--baseline previous.json]
+
+Requests go through the Flask test client unless --url points to a running server; --fxc-stub and
+--fxc-url switch the sessions to the fxc1 protocol, the in-process native1 engine is used otherwise.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from ssshare import control
+from ssshare.app import app
+from ssshare.services.fxc.api import FXCWebApiService
+
+
+ENDPOINTS = (
+    'split create', 'split join', 'split secret', 'split share', 'combine create', 'combine share'
+)
+
+
+class _InProcess():
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, method: str, path: str, payload: dict = None) -> dict:
+        client = getattr(self._local, 'client', None) or app.test_client()
+        self._local.client = client
+        response = getattr(client, method)(path, data=payload and json.dumps(payload))
+        assert response.status_code == 200, (method, path, response.status_code)
+        return response.json
+
+
+class _Http():
+    def __init__(self, url: str):
+        self._url = url.rstrip('/')
+        self._local = threading.local()
+
+    def __call__(self, method: str, path: str, payload: dict = None) -> dict:
+        http = getattr(self._local, 'http', None) or requests.Session()
+        self._local.http = http
+        response = http.request(method, self._url + path, data=payload and json.dumps(payload))
+        assert response.status_code == 200, (method, path, response.status_code)
+        return response.json()
+
+
+class Recorder():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+
+    def timed(self, endpoint: str, request, *args) -> dict:
+        start = time.perf_counter()
+        res = request(*args)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+        return res
+
+
+def lifecycle(request, recorder: Recorder, i: int, users: int, quorum: int, protocol: str):
+    timed = recorder.timed
+    res = timed('split create', request, 'post', '/split', {
+        'client_alias': 'master',
+        'session_alias': 'lifecycle %s' % i,
+        'session_policies': {'shares': users, 'quorum': quorum}
+    })
+    session_id, master = res['session_id'], res['session']['users'][0]['auth']
+    holders = []
+    for u in range(users):
+        res = timed('split join', request, 'put', '/split/%s' % session_id, {'client_alias': 'holder %s' % u})
+        holders.append(('holder %s' % u, res['session']['users'][-1]['auth']))
+    secret = os.urandom(16).hex()
+    timed('split secret', request, 'put', '/split/%s' % session_id, {
+        'client_alias': 'master',
+        'auth': master,
+        'session': {'secret': {'value': secret, 'protocol': protocol}}
+    })
+    shares = []
+    for alias, auth in holders:
+        res = timed('split share', request, 'get', '/split/%s?auth=%s&client_alias=%s' % (session_id, auth, alias))
+        shares.append([u['share'] for u in res['session']['users'] if u.get('auth') == auth][0])
+    res = timed('combine create', request, 'post', '/combine', {
+        'client_alias': 'master',
+        'session_alias': 'lifecycle %s' % i,
+        'session_type': 'transparent',
+        'session_policies': {'shares': users, 'quorum': quorum, 'protocol': protocol}
+    })
+    session_id = res['session_id']
+    for u, share in enumerate(shares[:quorum]):
+        res = timed('combine share', request, 'put', '/combine/%s' % session_id, {
+            'client_alias': 'holder %s' % u,
+            'share': share
+        })
+    assert res['session']['secret']['secret'] == secret
+
+
+def percentile(values: list, p: float) -> float:
+    """
+    Nearest rank percentile of sorted values.
+    """
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summary(recorder: Recorder, elapsed: float, sessions: int) -> dict:
+    endpoints = {}
+    for endpoint, values in recorder.latencies.items():
+        values = sorted(values)
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+    requests_count = sum(e['requests'] for e in endpoints.values())
+    return {
+        'endpoints': endpoints,
+        'elapsed_s': elapsed,
+        'lifecycles_per_s': sessions / elapsed,
+        'requests_per_s': requests_count / elapsed
+    }
+
+
+def run(request, sessions: int, concurrency: int, users: int, quorum: int, protocol: str) -> dict:
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [
+            executor.submit(lifecycle, request, recorder, i, users, quorum, protocol) for i in range(sessions)
+        ]
+        for future in futures:
+            future.result()
+    return summary(recorder, time.perf_counter() - start, sessions)
+
+
+def report(results: dict, baseline: dict = None):
+    print('{:<16} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+        'endpoint', 'requests', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'
+    ))
+    for endpoint, stats in results['endpoints'].items():
+        print('{:<16} {:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            endpoint, stats['requests'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['max_ms']
+        ), end='')
+        previous = baseline and baseline['endpoints'].get(endpoint)
+        print(previous and '   p95 {:+.1f}%'.format((stats['p95_ms'] / previous['p95_ms'] - 1) * 100) or '')
+    print('\n{:.1f} lifecycles/s, {:.0f} requests/s in {:.2f}s'.format(
+        results['lifecycles_per_s'], results['requests_per_s'], results['elapsed_s']
+    ), end='')
+    print(baseline and ', throughput {:+.1f}% on the baseline'.format(
+        (results['requests_per_s'] / baseline['requests_per_s'] - 1) * 100
+    ) or '')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--quorum', type=int, default=3)
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--fxc-url', default=None)
+    parser.add_argument('--fxc-stub', action='store_true')
+    parser.add_argument('--fxc-delay', type=float, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    args = parser.parse_args()
+
+    protocol = 'native1'
+    if args.fxc_stub:
+        from tests.fxc_stub import FXCStubServer
+        stub = FXCStubServer().start()
+        stub.delay = args.fxc_delay
+        args.fxc_url = stub.url
+    if args.fxc_url:
+        protocol = 'fxc1'
+        control.fxc_web_api_service = FXCWebApiService(args.fxc_url, pool_size=args.concurrency)
+    request = args.url and _Http(args.url) or _InProcess()
+    results = run(request, args.sessions, args.concurrency, args.users, args.quorum, protocol)
+    results['params'] = {
+        'sessions': args.sessions,
+        'concurrency': args.concurrency,
+        'users': args.users,
+        'quorum': args.quorum,
+        'protocol': protocol,
+        'target': args.url or 'in-process',
+        'fxc_delay': args.fxc_delay,
+        'python': platform.python_version(),
+        'timestamp': int(time.time())
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
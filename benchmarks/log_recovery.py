@@ -0,0 +1,52 @@
+"""
+LogRepository restart recovery time as a function of the session count, replaying the raw log
+(every session updated --updates times) and replaying a snapshot.
+
+    $ python -m benchmarks.log_recovery [--counts 1000 10000 50000] [--updates 4]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from benchmarks.repository import session
+from ssshare.repository.log import LogRepository
+
+
+def recovery(path: str, count: int, updates: int, snapshot: bool) -> tuple:
+    repo = LogRepository(path, session_ttl=600, compact_min_size=float('inf'))
+    sessions = repo.store_sessions([session(5) for _ in range(count)])
+    for _ in range(updates):
+        for s in sessions:
+            repo.update_session(s)
+    snapshot and repo.snapshot()
+    repo.close()
+    size = os.path.getsize(path + '.log') + os.path.getsize(path + '.snapshot')
+    start = time.perf_counter()
+    repo = LogRepository(path, session_ttl=600)
+    elapsed = time.perf_counter() - start
+    assert len(repo) == count
+    repo.close()
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--updates', type=int, default=4)
+    args = parser.parse_args()
+    print('{:<10} {:>10} {:>14} {:>14} {:>16}'.format('replay', 'sessions', 'file MB', 'recovery ms', 'us / session'))
+    for count in args.counts:
+        for snapshot in (False, True):
+            path = tempfile.mkdtemp()
+            try:
+                elapsed, size = recovery(os.path.join(path, 'bench'), count, args.updates, snapshot)
+            finally:
+                shutil.rmtree(path)
+            print('{:<10} {:>10} {:>14.1f} {:>14.1f} {:>16.2f}'.format(
+                snapshot and 'snapshot' or 'log', count, size / 1024 ** 2, elapsed * 1000, elapsed * 10 ** 6 / count
+            ))
+
+
+if __name__ == '__main__':
+    main()
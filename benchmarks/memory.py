@@ -0,0 +1,59 @@
+"""
+Memory held by a split session with N shareholders: the hydrated domain objects and the dict handed
+to the repository, in bytes per session and per shareholder.
+
+    $ python -m benchmarks.memory [--users 10 100 250] [--sessions 20]
+"""
+import argparse
+import gc
+import tracemalloc
+from ssshare.domain.master import SharedSessionMaster
+from ssshare.domain.split import SplitSession
+from ssshare.repository.memory import VolatileRepository
+
+
+def _session(users: int, repo) -> dict:
+    session = SplitSession.new(
+        master=SharedSessionMaster.new(alias='master'),
+        alias='bench session',
+        policies={'shares': users, 'quorum': max(users - 1, 1)},
+        repo=repo
+    )
+    session._uuid = 'bench'
+    for i in range(users):
+        session.join('user %s' % i)
+    session.secret.edit_secret({'protocol': 'native1', 'value': 'the secret'})
+    return session.to_dict()
+
+
+def _measure(build, count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    held = [build() for _ in range(count)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del held
+    return size // count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[10, 100, 250])
+    parser.add_argument('--sessions', type=int, default=20)
+    args = parser.parse_args()
+    repo = VolatileRepository(storage=dict())
+    print('{:>8} {:>10} {:>16} {:>16}'.format('users', 'form', 'bytes/session', 'bytes/user'))
+    for users in args.users:
+        data = _session(users, repo)
+        for form, build in (
+            ('stored', lambda: SplitSession.from_dict(data, repo=repo).to_dict()),
+            ('hydrated', lambda: SplitSession.from_dict(data, repo=repo)),
+        ):
+            size = _measure(build, args.sessions)
+            print('{:>8} {:>10} {:>16} {:>16}'.format(users, form, size, size // users))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Cost of the metrics instrumentation: a single observation, and a repository read with and without timing.
+
+    $ python -m benchmarks.metrics [--rounds 200000]
+"""
+import argparse
+import time
+from ssshare import metrics
+from ssshare.repository.memory import VolatileRepository
+
+
+def _per_call(fun, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fun()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+    counter = metrics.Counter('bench_total', 'Benchmark counter.', labels=('endpoint', 'status'))
+    histogram = metrics.Histogram('bench_seconds', 'Benchmark histogram.', labels=('endpoint', 'method'))
+    raw = VolatileRepository(storage=dict())
+    timed = metrics.instrument_repository(VolatileRepository(storage=dict()))
+    keys = ['split/{}'.format(repository.store_session({'type': 'split'})['uuid']) for repository in (raw, timed)]
+    results = (
+        ('counter inc', _per_call(lambda: counter.inc('split.split_session_shared', 200), args.rounds)),
+        ('histogram observe', _per_call(
+            lambda: histogram.observe(0.002, 'split.split_session_shared', 'GET'), args.rounds
+        )),
+        ('get_session', _per_call(lambda: raw.get_session(keys[0]), args.rounds)),
+        ('timed get_session', _per_call(lambda: timed.get_session(keys[1]), args.rounds)),
+    )
+    print('{:<20} {:>10}'.format('operation', 'ns'))
+    for name, elapsed in results:
+        print('{:<20} {:>10.0f}'.format(name, elapsed * 10 ** 9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Scaling of the native split\\combine of a large secret on a process pool, against the in-process engine.
+
+    $ python -m benchmarks.parallel_shamir [--size 1024000] [--workers 1 2 4 8] [--rounds 10]
+
+The split speedup and the efficiencies (speedup / workers) are relative to the pool of one worker, so they
+measure the scaling of the pool apart from its fixed shared memory and scheduling cost, shown by the in-process row.
+"""
+import argparse
+import os
+from benchmarks.shamir import run
+from ssshare.domain.secret import SecretProtocol
+from ssshare.services.shamir.api import ShamirService
+from ssshare.services.shamir.parallel import ProcessPoolShamir
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1024000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+    parser.add_argument('--shares', type=int, default=5)
+    parser.add_argument('--quorum', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    print('{} bytes, {} shares, quorum {}, {} cpus'.format(args.size, args.shares, args.quorum, os.cpu_count()))
+    print('{:<12} {:>10} {:>12} {:>10} {:>12} {:>10}'.format(
+        'workers', 'split ms', 'efficiency', 'combine ms', 'efficiency', 'speedup'
+    ))
+    split_time, combine_time = run(
+        ShamirService(), SecretProtocol.NATIVE1, args.size, args.shares, args.quorum, args.rounds
+    )
+    print('{:<12} {:>10.1f} {:>12} {:>10.1f} {:>12} {:>10}'.format(
+        'in-process', split_time * 1000, '-', combine_time * 1000, '-', '-'
+    ))
+    base = None
+    for workers in args.workers:
+        pool = ProcessPoolShamir(workers, min_size=0, chunk_size=args.chunk_size)
+        service = ShamirService(parallel=pool)
+        run(service, SecretProtocol.NATIVE1, args.size, args.shares, args.quorum, 1)  # starts the workers
+        split_time, combine_time = run(
+            service, SecretProtocol.NATIVE1, args.size, args.shares, args.quorum, args.rounds
+        )
+        pool.shutdown()
+        base = base or (split_time, combine_time)
+        print('{:<12} {:>10.1f} {:>12.2f} {:>10.1f} {:>12.2f} {:>10.2f}'.format(
+            workers, split_time * 1000, base[0] / split_time / workers,
+            combine_time * 1000, base[1] / combine_time / workers, base[0] / split_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Repository backends operations per second, on sessions shaped like a joined split session.
+
+    $ python -m benchmarks.repository [--sessions 5000] [--users 5] [--threads 1] [--backends memory sharded sqlite log]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from ssshare.repository.log import LogRepository
+from ssshare.repository.memory import VolatileRepository, ShardedVolatileRepository
+from ssshare.repository.sqlite import SQLiteRepository
+
+
+def backends(path: str) -> dict:
+    return {
+        'memory': lambda: VolatileRepository(storage=dict(), session_ttl=600),
+        'sharded': lambda: ShardedVolatileRepository(shards=16, session_ttl=600),
+        'sqlite': lambda: SQLiteRepository(os.path.join(path, 'bench.sqlite'), session_ttl=600),
+        'log': lambda: LogRepository(os.path.join(path, 'bench'), session_ttl=600),
+    }
+
+
+def session(users: int) -> dict:
+    return dict(
+        uuid=None,
+        master=dict(uuid=str(uuid.uuid4()), alias='the session master', shareholder=False),
+        last_update=int(time.time()),
+        alias='the session alias',
+        users=[dict(uuid=str(uuid.uuid4()), alias='user %s' % i, shareholder=True) for i in range(users)],
+        secret=dict(
+            secret=None, shares=users, quorum=max(users - 1, 1), protocol='native1',
+            splitted=[dict(user=None, value=os.urandom(32).hex()) for _ in range(users)]
+        ),
+        type='split',
+        subtype=None
+    )
+
+
+def _timed(fun, chunks: list) -> float:
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda chunk: [fun(x) for x in chunk], chunks))
+        return time.perf_counter() - start
+
+
+def run(repo, sessions: int, users: int, threads: int = 1) -> dict:
+    data = [session(users) for _ in range(sessions)]
+    chunks = [data[i::threads] for i in range(threads)]
+    res = {'store': sessions / _timed(repo.store_session, chunks)}
+    res['update'] = sessions / _timed(repo.update_session, chunks)
+    keys = [['split/%s' % d['uuid'] for d in chunk] for chunk in chunks]
+    res['get'] = sessions / _timed(repo.get_session, keys)
+    return res
+
+
+def main():
+    path = tempfile.mkdtemp()
+    available = backends(path)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--backends', nargs='+', default=list(available), choices=list(available))
+    args = parser.parse_args()
+    try:
+        print('{:<10} {:>12} {:>12} {:>12}'.format('backend', 'store/s', 'update/s', 'get/s'))
+        for name in args.backends:
+            res = run(available[name](), args.sessions, args.users, args.threads)
+            print('{:<10} {:>12.0f} {:>12.0f} {:>12.0f}'.format(name, res['store'], res['update'], res['get']))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Native in-process split\\combine against the FXC web-api HTTP path.
+
+    $ python -m benchmarks.shamir [--fxc-url http://localhost:3000 | --fxc-stub] [--sizes 32 1024 65536]
+
+--fxc-stub runs the HTTP path against the local stub server used by the tests.
+"""
+import argparse
+import os
+import time
+from ssshare.domain.secret import SharedSessionSecret, SecretProtocol
+from ssshare.services.fxc.api import FXCWebApiService
+from ssshare.services.shamir.api import ShamirService
+
+
+def _secret(size, shares, quorum, protocol):
+    secret = SharedSessionSecret.new(shares=shares, quorum=quorum, protocol=protocol.value)
+    secret._secret = os.urandom(size // 2).hex()
+    return secret
+
+
+def run(service, protocol, size, shares, quorum, rounds):
+    secret = _secret(size, shares, quorum, protocol)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        splitted = service.split(secret)
+    split_time = (time.perf_counter() - start) / rounds
+
+    combined = SharedSessionSecret.new(shares=shares, quorum=quorum, protocol=protocol.value)
+    combined._splitted = splitted[:quorum]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        res = service.combine(combined)
+    combine_time = (time.perf_counter() - start) / rounds
+    assert res == secret.secret
+    return split_time, combine_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fxc-url', default=None)
+    parser.add_argument('--fxc-stub', action='store_true')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 1024, 65536, 1024000])
+    parser.add_argument('--shares', type=int, default=5)
+    parser.add_argument('--quorum', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    services = [('native', ShamirService(), SecretProtocol.NATIVE1)]
+    if args.fxc_stub:
+        from tests.fxc_stub import FXCStubServer
+        args.fxc_url = FXCStubServer().start().url
+    if args.fxc_url:
+        services.append(('fxc-http', FXCWebApiService(args.fxc_url), SecretProtocol.FXC1))
+    print('{:<10} {:>10} {:>14} {:>14}'.format('backend', 'bytes', 'split ms', 'combine ms'))
+    for name, service, protocol in services:
+        for size in args.sizes:
+            split_time, combine_time = run(service, protocol, size, args.shares, args.quorum, args.rounds)
+            print('{:<10} {:>10} {:>14.3f} {:>14.3f}'.format(name, size, split_time * 1000, combine_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Split sessions per second: one POST /split + master PUT per session against POST /split/batch.
+
+    $ python -m benchmarks.split_batch [--sessions 2000] [--batch-size 500]
+"""
+import argparse
+import json
+import time
+from ssshare.app import app
+
+
+def _item(i):
+    return {
+        'session_alias': 'device %s' % i,
+        'session_policies': {'shares': 5, 'quorum': 3},
+        'secret': {'value': 'device secret %s' % i, 'protocol': 'native1'}
+    }
+
+
+def single(client, sessions):
+    for i in range(sessions):
+        item = _item(i)
+        response = client.post('/split', data=json.dumps({
+            'client_alias': 'provisioner',
+            'session_alias': item['session_alias'],
+            'session_policies': item['session_policies']
+        }))
+        session_id, auth = response.json['session_id'], response.json['session']['users'][0]['auth']
+        response = client.put('/split/%s' % session_id, data=json.dumps({
+            'client_alias': 'provisioner',
+            'auth': auth,
+            'session': {'secret': item['secret']}
+        }))
+        assert response.status_code == 200
+
+
+def batch(client, sessions, batch_size):
+    for start in range(0, sessions, batch_size):
+        response = client.post('/split/batch', data=json.dumps({
+            'client_alias': 'provisioner',
+            'sessions': [_item(i) for i in range(start, min(start + batch_size, sessions))]
+        }))
+        assert response.status_code == 200
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    client = app.test_client()
+    for name, run in (('single', lambda: single(client, args.sessions)),
+                      ('batch', lambda: batch(client, args.sessions, args.batch_size))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print('{:<8} {:>8} sessions {:>10.1f} sessions/s'.format(name, args.sessions, args.sessions / elapsed))
+
+
+if __name__ == '__main__':
+    main()
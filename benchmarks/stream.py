@@ -0,0 +1,59 @@
+"""
+Peak traced memory of a master PUT of the secret: whole-payload JSON against the streaming endpoint.
+
+    $ python -m benchmarks.stream [--size 1000000]
+"""
+import argparse
+import json
+import os
+import tracemalloc
+from ssshare.app import app
+
+
+def _session(client):
+    response = client.post('/split', data=json.dumps({
+        'client_alias': 'master',
+        'session_alias': 'benchmark',
+        'session_policies': {'shares': 5, 'quorum': 3}
+    }))
+    return response.json['session_id'], response.json['session']['users'][0]['auth']
+
+
+def buffered(client, secret: bytes):
+    session_id, auth = _session(client)
+    payload = json.dumps({
+        'client_alias': 'master',
+        'auth': auth,
+        'session': {'secret': {'value': secret.hex(), 'protocol': 'native1'}}
+    })
+    tracemalloc.start()
+    response = client.put('/split/%s' % session_id, data=payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert response.status_code == 200
+    return peak
+
+
+def streamed(client, secret: bytes):
+    session_id, auth = _session(client)
+    payload = secret.hex().encode()
+    tracemalloc.start()
+    response = client.put('/split/%s/secret?auth=%s&client_alias=master' % (session_id, auth), data=payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert response.status_code == 200
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000000)
+    args = parser.parse_args()
+    client = app.test_client()
+    secret = os.urandom(args.size // 2)
+    for name, run in (('buffered', buffered), ('streamed', streamed)):
+        print('{:<10} {:>10} bytes secret {:>12} bytes peak'.format(name, args.size, run(client, secret)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Request validation cost: pycomb combinators against the compiled validators, in microseconds per payload.
+
+    $ python -m benchmarks.validators [--rounds 1000]
+"""
+import argparse
+import time
+import uuid
+from ssshare.blueprints import validators
+
+AUTH = str(uuid.uuid4())
+SECRET = {'value': 'the secret', 'protocol': 'native1'}
+PAYLOADS = [
+    ('split create', validators.SplitSessionCreateValidator, {
+        'client_alias': 'master', 'session_alias': 'session', 'session_policies': {'shares': 5, 'quorum': 3}
+    }),
+    ('split get', validators.SplitSessionGetValidator, {'client_alias': 'user', 'auth': AUTH}),
+    ('split join', validators.SplitSessionEditValidator, {'client_alias': 'user'}),
+    ('split secret', validators.SplitSessionEditValidator, {
+        'client_alias': 'master', 'auth': AUTH, 'session': {'secret': SECRET}
+    }),
+    ('combine share', validators.CombineSessionEditValidator, {'client_alias': 'user', 'auth': AUTH, 'share': 'cafe'}),
+    ('combine edit', validators.CombineSessionEditValidator, {
+        'client_alias': 'master', 'auth': AUTH, 'session_alias': 'session', 'session_type': 'federated'
+    }),
+    ('split batch x100', validators.SplitSessionBatchCreateValidator, {
+        'client_alias': 'provisioner',
+        'sessions': [
+            {'session_alias': 'session', 'session_policies': {'shares': 5, 'quorum': 3}, 'secret': SECRET}
+        ] * 100
+    }),
+]
+
+
+def _timed(fun, value, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fun(value)
+    return (time.perf_counter() - start) * 10 ** 6 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=1000)
+    args = parser.parse_args()
+    print('{:<18} {:>12} {:>12} {:>10}'.format('payload', 'pycomb us', 'compiled us', 'speedup'))
+    for name, validator, payload in PAYLOADS:
+        check = validators.compile_validator(validator)
+        assert check(payload)
+        slow, fast = _timed(validator, payload, args.rounds), _timed(check, payload, args.rounds)
+        print('{:<18} {:>12.2f} {:>12.2f} {:>9.1f}x'.format(name, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
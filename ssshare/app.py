@@ -1,6 +1,10 @@
-from flask import Flask, Response
-from pycomb.exceptions import PyCombValidationError
-from ssshare import settings, exceptions
+import hmac
+import os
+import time
+from flask import Flask, Response, g, request
+from ssshare import metrics, profiling, settings, tracing
+from ssshare.blueprints import ERROR_RESPONSES
+from ssshare.control import identity_map, job_runner
 from ssshare.blueprints.split import bp as split_bp
 from ssshare.blueprints.combine import bp as combine_bp
 
@@ -15,33 +19,91 @@ app.register_blueprint(split_bp, url_prefix='/split')
 app.register_blueprint(combine_bp, url_prefix='/combine')
 
 
-@app.errorhandler(exceptions.WrongParametersException)
-def wrong_parameters_error(_):
-    return Response(status=400, response='arguments')
+@app.after_request
+def release_sessions(response):
+    identity_map.release(commit=response.status_code < 400)
+    return response
 
 
-@app.errorhandler(PyCombValidationError)
-def validation_error(_):
-    return Response(status=400, response='values')
+@app.teardown_request
+def discard_sessions(exc):
+    identity_map.release(commit=False)
+    job_runner.release()
 
 
-@app.errorhandler(exceptions.ObjectDeniedException)
-def domain_object_request_not_authorized(_):
-    return Response(status=401)
+def _error_handler(status: int, body: str):
+    def handler(exc):
+        metrics.errors.inc(type(exc).__name__, status)
+        return Response(status=status, response=body)
+    return handler
 
-@app.errorhandler(exceptions.DomainObjectBusyException)
-def domain_busy_error(_):
-    return Response(status=403)
 
+for _exception, _status, _body in ERROR_RESPONSES:
+    app.register_error_handler(_exception, _error_handler(_status, _body))
 
-@app.errorhandler(exceptions.ObjectNotFoundException)
-def domain_object_not_found_error(_):
-    return Response(status=404)
 
+if settings.METRICS_ENABLED:
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
 
-@app.errorhandler(exceptions.ObjectExpiredException)
-def domain_object_expired_error(_):
-    return Response(status=410)
+    @app.after_request
+    def observe_request(response):
+        endpoint = request.endpoint or 'unmatched'
+        metrics.request_latency.observe(time.perf_counter() - g.request_start, endpoint, request.method)
+        metrics.responses.inc(endpoint, response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics_view():
+        token = settings.METRICS_TOKEN and 'Bearer {}'.format(settings.METRICS_TOKEN).encode()
+        if not token or not hmac.compare_digest(request.headers.get('Authorization', '').encode(), token):
+            return Response(status=404)
+        return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.before_request
+def start_trace():
+    g.trace = tracing.start_trace(
+        request.endpoint or 'unmatched',
+        request.headers.get(tracing.HEADER),
+        sample_rate=settings.TRACING_SAMPLE_RATE,
+        method=request.method,
+        path=request.path
+    )
+
+
+@app.after_request
+def trace_status(response):
+    if g.get('trace'):
+        tracing.current().attributes['status'] = response.status_code
+    return response
+
+
+@app.teardown_request
+def end_trace(exc):
+    token = g.pop('trace', None)
+    if token:
+        tracing.end_trace(token, error=exc and type(exc).__name__)
+
+
+@app.before_request
+def start_profile():
+    if profiling.wanted(request.headers.get(profiling.HEADER)):
+        profiling.start()
+
+
+@app.after_request
+def stop_profile(response):
+    path = profiling.stop(request.endpoint or 'unmatched', request.method, bytes=request.content_length)
+    if path:
+        response.headers[profiling.HEADER] = os.path.basename(path)
+    return response
+
+
+@app.teardown_request
+def discard_profile(exc):
+    profiling.discard()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+from ssshare import exceptions, metrics, settings
+from ssshare.app import app as flask_app
+from ssshare.blueprints import error_response, events, validators
+from ssshare.control import identity_map, session_notifier
+
+
+_check_events = validators.checker(validators.SessionEventsValidator)
+
+
+def _poll(session_class, session_id: str, auth: str, since: int):
+    try:
+        session = session_class.get(session_id, auth=auth)
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        state = session.version > since and events.render(session, auth) or None
+    except BaseException:
+        identity_map.release(commit=False)
+        raise
+    identity_map.release()
+    return state
+
+
+def _environ(scope: dict, body, length: int) -> dict:
+    server = scope.get('server') or (settings.LISTEN_HOSTNAME, settings.LISTEN_PORT)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope['http_version']),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        environ[name] = name in environ and '{},{}'.format(environ[name], value) or value
+    environ['CONTENT_LENGTH'] = str(length)  # the body is read whole, also when sent chunked
+    return environ
+
+
+def _headers(scope: dict) -> dict:
+    return {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+
+
+class AsgiApp():
+    def __init__(self, wsgi_app=flask_app, workers: int = settings.ASGI_WORKERS):
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if not self._executor:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ssshare-asgi')
+        return self._executor
+
+    async def _call(self, fun, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fun, *args)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        assert scope['type'] == 'http'
+        session_class = self._events_session_class(scope)
+        if session_class:
+            return await self._events(session_class, scope, receive, self._observed(scope, send))
+        return await self._wsgi(scope, receive, send)
+
+    @staticmethod
+    def _observed(scope: dict, send):
+        if not settings.METRICS_ENABLED:
+            return send
+        start = time.perf_counter()
+
+        async def _send(message):
+            if message['type'] == 'http.response.start':
+                metrics.request_latency.observe(time.perf_counter() - start, scope['endpoint'], scope['method'])
+                metrics.responses.inc(scope['endpoint'], message['status'])
+            await send(message)
+        return _send
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor:
+                    self._executor.shutdown(wait=False)
+                self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _events_session_class(self, scope: dict):
+        try:
+            endpoint, args = self.wsgi_app.url_map.bind('').match(scope['path'], scope['method'])
+        except HTTPException:
+            return
+        view_class = getattr(self.wsgi_app.view_functions[endpoint], 'view_class', None)
+        if view_class and issubclass(view_class, events.SessionEventsView):
+            scope['endpoint'], scope['view_args'] = endpoint, args
+            return view_class.session_class
+
+    async def _send_error(self, send, exc: Exception):
+        status, body = error_response(exc) or (500, None)
+        if settings.METRICS_ENABLED and status != 500:
+            metrics.errors.inc(type(exc).__name__, status)
+        await send({'type': 'http.response.start', 'status': status, 'headers': []})
+        await send({'type': 'http.response.body', 'body': (body or '').encode()})
+
+    async def _events(self, session_class, scope, receive, send):
+        headers = _headers(scope)
+        session_id = scope['view_args']['session_id']
+        key = '{}/{}'.format(session_class.TYPE, session_id)
+        try:
+            params = _check_events(dict(urllib.parse.parse_qsl(scope['query_string'].decode('latin1'))))
+            since = events.cursor(params, headers.get('last-event-id', ''))
+            stream = parse_accept_header(headers.get('accept'), MIMEAccept).best == 'text/event-stream'
+            if stream:
+                # authentication and missing sessions are answered before the stream starts
+                await self._call(_poll, session_class, session_id, params['auth'], since)
+        except Exception as exc:
+            return await self._send_error(send, exc)
+        with session_notifier.listen(key) as listener:
+            if stream:
+                return await self._stream(listener, session_class, session_id, params['auth'], since, receive, send)
+            try:
+                state = await self._next_change(
+                    listener, session_class, session_id, params['auth'], since, events.timeout(params)
+                )
+            except Exception as exc:
+                return await self._send_error(send, exc)
+        if not state:
+            await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+            return await send({'type': 'http.response.body', 'body': b''})
+        body = json.dumps(state).encode()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _next_change(self, listener, session_class, session_id: str, auth: str, since: int, wait: float):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            seen = listener.generation
+            state = await self._call(_poll, session_class, session_id, auth, since)
+            if state:
+                return state
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            await listener.wait_async(seen, remaining)
+
+    async def _stream(self, listener, session_class, session_id: str, auth: str, since: int, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache')
+        ]})
+        disconnect = asyncio.ensure_future(self._disconnect(receive))
+        try:
+            while not disconnect.done():
+                change = asyncio.ensure_future(self._next_change(
+                    listener, session_class, session_id, auth, since, settings.EVENTS_HEARTBEAT
+                ))
+                await asyncio.wait((change, disconnect), return_when=asyncio.FIRST_COMPLETED)
+                if not change.done():
+                    change.cancel()
+                    return
+                try:
+                    state = change.result()
+                except (exceptions.ObjectNotFoundException, exceptions.ObjectExpiredException):
+                    await send({'type': 'http.response.body', 'body': events.END.encode()})
+                    return
+                if state:
+                    since = state['version']
+                chunk = state and events.event(state) or events.KEEP_ALIVE
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        finally:
+            disconnect.cancel()
+
+    @staticmethod
+    async def _disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _wsgi(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=settings.ASGI_SPOOL_SIZE)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return body.close()
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        length = body.tell()
+        body.seek(0)
+        try:
+            status, headers, chunks, chunk, done = await self._call(self._respond, _environ(scope, body, length))
+        except BaseException:
+            body.close()
+            raise
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            while not done:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await self._call(next, chunks, None)
+                done = chunk is None
+                chunk = chunk or b''
+            await send({'type': 'http.response.body', 'body': chunk})
+        finally:
+            await self._call(self._close, chunks, body)
+
+    def _respond(self, environ: dict):
+        # a buffered response is complete in a single pool call
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [
+                int(status.split(' ', 1)[0]),
+                [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers]
+            ]
+        response = self.wsgi_app(environ, start_response)
+        chunks = iter(response)
+        chunk = next(chunks, b'')
+        length = dict(started[1]).get(b'content-length')
+        done = length is not None and int(length) == len(chunk)
+        return started[0], started[1], _Chunks(response, chunks), chunk, done
+
+    @staticmethod
+    def _close(chunks, body):
+        try:
+            chunks.close()
+        finally:
+            body.close()
+
+
+class _Chunks():
+    __slots__ = ('response', 'chunks')
+
+    def __init__(self, response, chunks):
+        self.response = response
+        self.chunks = chunks
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def close(self):
+        getattr(self.response, 'close', lambda: None)()
+
+
+app = AsgiApp()
@@ -0,0 +1,59 @@
+import functools
+import flask
+from pycomb.exceptions import PyCombValidationError
+from ssshare import exceptions, settings
+from ssshare.control import job_runner
+
+
+# exception, HTTP status, response body: shared by the Flask app and the ASGI server
+ERROR_RESPONSES = (
+    (exceptions.WrongParametersException, 400, 'arguments'),
+    (PyCombValidationError, 400, 'values'),
+    (exceptions.ObjectDeniedException, 401, None),
+    (exceptions.DomainObjectBusyException, 403, None),
+    (exceptions.ObjectNotFoundException, 404, None),
+    (exceptions.ObjectExpiredException, 410, None),
+    (exceptions.ObjectConflictException, 409, None),
+    (exceptions.BackendUnavailableException, 503, None),
+)
+
+
+def error_response(exc: Exception):
+    """
+    The (status, body) an exception is mapped to, None for unexpected errors.
+    """
+    for exception, status, body in ERROR_RESPONSES:
+        if isinstance(exc, exception):
+            return status, body
+
+
+def retry_on_conflict(fun):
+    """
+    Re-runs a read-modify-update view when a concurrent request updated the session first.
+    """
+    @functools.wraps(fun)
+    def wrapper(*a, **kw):
+        for attempt in range(settings.SESSION_UPDATE_RETRIES):
+            try:
+                return fun(*a, **kw)
+            except exceptions.ObjectConflictException:
+                if attempt == settings.SESSION_UPDATE_RETRIES - 1:
+                    raise
+                job_runner.release()  # the next attempt admits its job again
+    return wrapper
+
+
+def not_modified(session_class, session_id: str, auth: str):
+    """
+    The 304 response to a conditional GET whose If-None-Match holds the current etag of the session.
+    """
+    etags = flask.request.if_none_match
+    etag = etags and session_class.match_etag(session_id, auth, etags)
+    if etag:
+        return cacheable(flask.Response(status=304), etag)
+
+
+def cacheable(response, etag: str):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
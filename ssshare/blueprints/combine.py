@@ -1,7 +1,8 @@
 import flask
 from flask.views import MethodView
 from ssshare import exceptions
-from ssshare.blueprints import validators
+from ssshare.blueprints import cacheable, not_modified, retry_on_conflict, validators
+from ssshare.blueprints.events import SessionEventsView
 from ssshare.domain.combine import CombineSession
 from ssshare.domain.master import SharedSessionMaster
 from ssshare.domain.secret import Share, SharedSessionSecret
@@ -38,19 +39,23 @@ class CombineSessionCreateView(MethodView):
 class CombineSessionSharedView(MethodView):
     @validators.validate(validators.CombineSessionGetValidator)
     def get(self, session_id, params=None):
+        response = not_modified(CombineSession, session_id, params['auth'])
+        if response:
+            return response
         session = CombineSession.get(session_id, auth=params['auth'])
         if not session:
             raise exceptions.ObjectNotFoundException
         if not session.ttl:
             raise exceptions.ObjectExpiredException
-        return flask.jsonify(
+        return cacheable(flask.jsonify(
             {
                 "session": session.to_api(auth=params['auth']),
                 "session_id": str(session.uuid)
             }
-        )
+        ), session.etag)
 
     @validators.validate(validators.CombineSessionEditValidator)
+    @retry_on_conflict
     def put(self, session_id, params=None):
         session = CombineSession.get(session_id)
         if not session:
@@ -61,7 +66,32 @@ class CombineSessionSharedView(MethodView):
             raise exceptions.ObjectDeniedException
         user.session = session
         if params.get('share'):
+            if session.secret.streamed:
+                raise exceptions.ObjectDeniedException
             session.secret.add_share(Share(params['share'], str(user.uuid)))
+        else:
+            session.secret.retry_job()
+        session.update()
+        return flask.jsonify(
+            {
+                "session": session.to_api(auth=str(user.uuid)),
+                "session_id": str(session.uuid)
+            }
+        )
+
+
+class CombineSessionShareStreamView(MethodView):
+    @validators.validate(validators.CombineSessionShareStreamValidator, stream=True)
+    def put(self, session_id, params=None):
+        session = CombineSession.get(session_id)
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        user = params.get('auth') and session.get_user(params['auth'], alias=str(params['client_alias'])) \
+               or session.join(params['client_alias'])
+        if not user:
+            raise exceptions.ObjectDeniedException
+        user.session = session
+        session.secret.add_share_stream(flask.request.stream.read, user)
         session.update()
         return flask.jsonify(
             {
@@ -71,6 +101,21 @@ class CombineSessionSharedView(MethodView):
         )
 
 
+class CombineSessionSecretStreamView(MethodView):
+    @validators.validate(validators.CombineSessionGetValidator)
+    def get(self, session_id, params=None):
+        session = CombineSession.get(session_id, auth=params['auth'])
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        if not session.secret.is_auth_for_secret(params['auth']):
+            raise exceptions.ObjectDeniedException
+        return flask.Response(session.secret.iter_secret(), mimetype='application/octet-stream')
+
+
+class CombineSessionEventsView(SessionEventsView):
+    session_class = CombineSession
+
+
 bp.add_url_rule(
     '/<string:session_id>',
     methods=['GET', 'PUT', 'POST'],
@@ -80,4 +125,19 @@ bp.add_url_rule(
 bp.add_url_rule(
     '',
     methods=['POST'],
-    view_func=CombineSessionCreateView.as_view('combine_session_create'))
\ No newline at end of file
+    view_func=CombineSessionCreateView.as_view('combine_session_create'))
+
+bp.add_url_rule(
+    '/<string:session_id>/share',
+    methods=['PUT'],
+    view_func=CombineSessionShareStreamView.as_view('combine_session_share_stream'))
+
+bp.add_url_rule(
+    '/<string:session_id>/secret',
+    methods=['GET'],
+    view_func=CombineSessionSecretStreamView.as_view('combine_session_secret_stream'))
+
+bp.add_url_rule(
+    '/<string:session_id>/events',
+    methods=['GET'],
+    view_func=CombineSessionEventsView.as_view('combine_session_events'))
@@ -0,0 +1,92 @@
+import json
+import time
+import flask
+from flask.views import MethodView
+from ssshare import exceptions, settings
+from ssshare.blueprints import validators
+from ssshare.control import session_notifier
+
+
+def _next_change(session_class, session_id: str, auth: str, since: int, listener, wait: float):
+    """
+    The session once its version is past the cursor, None on timeout.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        seen = listener.generation
+        session = session_class.get(session_id, auth=auth)
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        if session.version > since:
+            return session
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        listener.wait(seen, remaining)
+
+
+def render(session, auth: str) -> dict:
+    return {
+        "session": session.to_api(auth=auth),
+        "session_id": str(session.uuid),
+        "version": session.version
+    }
+
+
+def cursor(params: dict, last_event_id: str) -> int:
+    return int(last_event_id.isdigit() and last_event_id or params.get('version') or 0)
+
+
+def timeout(params: dict) -> int:
+    return min(int(params.get('timeout') or settings.EVENTS_MAX_TIMEOUT), settings.EVENTS_MAX_TIMEOUT)
+
+
+def event(state: dict) -> str:
+    return 'id: {}\nevent: session\ndata: {}\n\n'.format(state['version'], json.dumps(state))
+
+
+KEEP_ALIVE = ': keep-alive\n\n'
+END = 'event: end\ndata: {}\n\n'
+
+
+class SessionEventsView(MethodView):
+    """
+    Session changes past a version cursor: a long-poll answering 204 on timeout or, when the client
+    accepts text/event-stream, server-sent events until the session goes away.
+    """
+    session_class = NotImplemented
+
+    @validators.validate(validators.SessionEventsValidator)
+    def get(self, session_id, params=None):
+        since = cursor(params, flask.request.headers.get('Last-Event-ID', ''))
+        key = '{}/{}'.format(self.session_class.TYPE, session_id)
+        if flask.request.accept_mimetypes.best == 'text/event-stream':
+            self.session_class.get(session_id, auth=params['auth'])
+            return flask.Response(
+                self._stream(key, session_id, params['auth'], since),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache'}
+            )
+        with session_notifier.listen(key) as listener:
+            session = _next_change(
+                self.session_class, session_id, params['auth'], since, listener, timeout(params)
+            )
+        if not session:
+            return flask.Response(status=204)
+        return flask.jsonify(render(session, params['auth']))
+
+    def _stream(self, key: str, session_id: str, auth: str, since: int):
+        with session_notifier.listen(key) as listener:
+            while True:
+                try:
+                    session = _next_change(
+                        self.session_class, session_id, auth, since, listener, settings.EVENTS_HEARTBEAT
+                    )
+                except (exceptions.ObjectNotFoundException, exceptions.ObjectExpiredException):
+                    yield END
+                    return
+                if not session:
+                    yield KEEP_ALIVE
+                    continue
+                since = session.version
+                yield event(render(session, auth))
@@ -1,9 +1,12 @@
+import uuid
 import flask
 from flask.views import MethodView
-from ssshare import exceptions
-from ssshare.blueprints import validators
+from ssshare import exceptions, settings
+from ssshare.blueprints import cacheable, not_modified, retry_on_conflict, validators
+from ssshare.blueprints.events import SessionEventsView
 from ssshare.domain.split import SplitSession
 from ssshare.domain.master import SharedSessionMaster
+from ssshare.domain.secret import SharedSessionSecret
 
 bp = flask.Blueprint('split', __name__)
 
@@ -27,9 +30,48 @@ class SplitSessionCreateView(MethodView):
         )
 
 
+class SplitSessionBatchCreateView(MethodView):
+    @validators.validate(validators.SplitSessionBatchCreateValidator)
+    def post(self, params=None):
+        if not 0 < len(params['sessions']) <= settings.SPLIT_BATCH_MAX_SIZE:
+            raise exceptions.WrongParametersException('batch size')
+        master_id = str(uuid.uuid4())
+        sessions = []
+        for item in params['sessions']:
+            policies = item['session_policies']
+            if not 0 < policies['quorum'] < policies['shares']:
+                raise exceptions.WrongParametersException('quorum >= shares')
+            if not item['secret'].get('value'):
+                raise exceptions.WrongParametersException('secret value')
+            session = SplitSession.new(
+                master=SharedSessionMaster(user_id=master_id, alias=params['client_alias']),
+                alias=item['session_alias'],
+                policies=policies
+            )
+            session.secret.edit_secret(dict(item['secret']), split=False)
+            sessions.append(session)
+        SharedSessionSecret.split_many([session.secret for session in sessions])
+        SplitSession.store_many(sessions)
+        return flask.jsonify(
+            {
+                "auth": master_id,
+                "sessions": [
+                    {
+                        "session": session.to_api(auth=master_id),
+                        "session_id": str(session.uuid)
+                    } for session in sessions
+                ]
+            }
+        )
+
+
 class SplitSessionSharedView(MethodView):
     @validators.validate(validators.SplitSessionGetValidator)
+    @retry_on_conflict
     def get(self, session_id, params=None):
+        response = not_modified(SplitSession, session_id, params['auth'])
+        if response:
+            return response
         session = SplitSession.get(session_id, auth=params['auth'])
         if not session:
             raise exceptions.ObjectNotFoundException
@@ -39,14 +81,15 @@ class SplitSessionSharedView(MethodView):
                 session.secret.user_have_share(session.current_user):
             session.current_user.secret.attach_user_to_share(session.current_user)
             session.update()
-        return flask.jsonify(
+        return cacheable(flask.jsonify(
             {
                 "session": session.to_api(auth=params['auth']),
                 "session_id": str(session.uuid)
             }
-        )
+        ), session.etag)
 
     @validators.validate(validators.SplitSessionEditValidator)
+    @retry_on_conflict
     def put(self, session_id, params=None):
         session = SplitSession.get(session_id)
         if not session:
@@ -71,6 +114,43 @@ class SplitSessionSharedView(MethodView):
             }
         )
 
+class SplitSessionSecretStreamView(MethodView):
+    @validators.validate(validators.SplitSessionSecretStreamValidator, stream=True)
+    def put(self, session_id, params=None):
+        session = SplitSession.get(session_id, auth=params['auth'])
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        if not session.current_user.is_master:
+            raise exceptions.ObjectDeniedException
+        session.secret.edit_secret({'protocol': params.get('protocol') or 'native1'})
+        session.secret.stream_secret(flask.request.stream.read)
+        session.update()
+        return flask.jsonify(
+            {
+                "session": session.to_api(auth=params['auth']),
+                "session_id": str(session.uuid)
+            }
+        )
+
+
+class SplitSessionShareStreamView(MethodView):
+    @validators.validate(validators.SplitSessionGetValidator)
+    @retry_on_conflict
+    def get(self, session_id, params=None):
+        session = SplitSession.get(session_id, auth=params['auth'])
+        if not session.ttl:
+            raise exceptions.ObjectExpiredException
+        user = session.current_user
+        if user.is_shareholder and session.secret.splitted and not session.secret.user_have_share(user):
+            session.secret.attach_user_to_share(user)
+            session.update()
+        return flask.Response(session.secret.iter_share(user), mimetype='application/octet-stream')
+
+
+class SplitSessionEventsView(SessionEventsView):
+    session_class = SplitSession
+
+
 bp.add_url_rule(
     '/<string:session_id>',
     methods=['GET', 'PUT', 'POST'],
@@ -80,4 +160,24 @@ bp.add_url_rule(
 bp.add_url_rule(
     '',
     methods=['POST'],
-    view_func=SplitSessionCreateView.as_view('split_session_create'))
\ No newline at end of file
+    view_func=SplitSessionCreateView.as_view('split_session_create'))
+
+bp.add_url_rule(
+    '/batch',
+    methods=['POST'],
+    view_func=SplitSessionBatchCreateView.as_view('split_session_batch_create'))
+
+bp.add_url_rule(
+    '/<string:session_id>/secret',
+    methods=['PUT'],
+    view_func=SplitSessionSecretStreamView.as_view('split_session_secret_stream'))
+
+bp.add_url_rule(
+    '/<string:session_id>/share',
+    methods=['GET'],
+    view_func=SplitSessionShareStreamView.as_view('split_session_share_stream'))
+
+bp.add_url_rule(
+    '/<string:session_id>/events',
+    methods=['GET'],
+    view_func=SplitSessionEventsView.as_view('split_session_events'))
@@ -4,7 +4,7 @@ import flask
 from flask import json
 from pycomb import combinators as validators
 from pycomb.exceptions import PyCombValidationError
-from ssshare import exceptions, settings
+from ssshare import exceptions, settings, tracing
 
 
 def is_uuid(value):
@@ -15,17 +15,131 @@ def is_uuid(value):
         return
 
 
-def validate(validation_class, silent=not settings.DEBUG):
-    def decorator(fun):
-        @functools.wraps(fun)
-        def wrapper(*a, **kw):
-            if flask.request.method == 'GET':
-                p = {k: v for k, v in flask.request.values and flask.request.values.items() or {}}
-            else:
-                try:
-                    p = flask.request.data and json.loads(flask.request.data.decode())
-                except Exception:
-                    raise exceptions.WrongParametersException
+_SCHEMAS = {
+    validators.String: ('type', str),
+    validators.Int: ('type', int)
+}
+_COMPILED = {}
+
+
+def _schema(combinator, *node):
+    _SCHEMAS[combinator] = node
+    return combinator
+
+
+def struct(fields: dict, strict=False):
+    return _schema(validators.struct(fields, strict=strict), 'struct', fields, strict)
+
+
+def maybe(combinator):
+    return _schema(validators.maybe(combinator), 'maybe', combinator)
+
+
+def subtype(combinator, condition):
+    return _schema(validators.subtype(combinator, condition), 'subtype', combinator, condition)
+
+
+def listof(combinator):
+    return _schema(validators.list(combinator), 'list', combinator)
+
+
+def union(*combinators):
+    return _schema(validators.union(*combinators), 'union', combinators)
+
+
+class _Compiler():
+    """
+    Turns a schema into the body of a flat function returning False at the first failed check.
+    """
+    def __init__(self):
+        self.lines = []
+        self.names = {}
+        self._vars = 0
+
+    def _const(self, value) -> str:
+        name = 'c%s' % len(self.names)
+        self.names[name] = value
+        return name
+
+    def _var(self) -> str:
+        self._vars += 1
+        return 'v%s' % self._vars
+
+    def emit(self, combinator, var: str, indent: int):
+        kind, *args = _SCHEMAS[combinator]
+        pad = '    ' * indent
+        if kind == 'type':
+            self.lines.append('{}if type({}) is not {}: return False'.format(pad, var, self._const(args[0])))
+        elif kind == 'maybe':
+            self.lines.append('{}if {} is not None:'.format(pad, var))
+            self.emit(args[0], var, indent + 1)
+        elif kind == 'subtype':
+            self.emit(args[0], var, indent)
+            self.lines.append('{}if not {}({}): return False'.format(pad, self._const(args[1]), var))
+        elif kind == 'struct':
+            fields, strict = args
+            self.lines.append('{}if type({}) is not dict: return False'.format(pad, var))
+            if strict:
+                self.lines.append(
+                    '{}if not {}.keys() <= {}: return False'.format(pad, var, self._const(frozenset(fields)))
+                )
+            for k, v in fields.items():
+                item = self._var()
+                self.lines.append('{}{} = {}.get({!r})'.format(pad, item, var, k))
+                self.emit(v, item, indent)
+        elif kind == 'list':
+            item = self._var()
+            self.lines.append('{}if type({}) not in (list, tuple): return False'.format(pad, var))
+            self.lines.append('{}for {} in {}:'.format(pad, item, var))
+            self.emit(args[0], item, indent + 1)
+        elif kind == 'union':
+            self.lines.append('{}if not {}({}): return False'.format(pad, self._const(_compile_union(args[0])), var))
+
+
+def _key_set(combinator):
+    kind, *args = _SCHEMAS[combinator]
+    if kind != 'struct' or not args[1]:
+        return
+    fields = args[0]
+    return frozenset(k for k, v in fields.items() if not compile_validator(v)(None)), frozenset(fields)
+
+
+def _compile_union(combinators):
+    branches = [(_key_set(c), compile_validator(c)) for c in combinators]
+
+    def check(x):
+        keys = type(x) is dict and x.keys()
+        for key_set, fun in branches:
+            if keys and key_set and not key_set[0] <= keys <= key_set[1]:
+                continue
+            if fun(x):
+                return True
+        return False
+    return check
+
+
+def compile_validator(combinator):
+    """
+    The combinator schema as a flat function returning True on valid values. It may be stricter than
+    pycomb on odd inputs, validate() falls back to the combinator when it fails.
+    """
+    if combinator not in _COMPILED:
+        compiler = _Compiler()
+        compiler.emit(combinator, 'x', 1)
+        namespace = dict(compiler.names)
+        exec('def check(x):\n{}\n    return True'.format('\n'.join(compiler.lines)), namespace)
+        _COMPILED[combinator] = namespace['check']
+    return _COMPILED[combinator]
+
+
+def checker(validation_class, silent=not settings.DEBUG):
+    """
+    Compiles a schema into a function returning the valid parameters, raising as pycomb otherwise.
+    """
+    check = compile_validator(validation_class)
+
+    def _check(p):
+        if not check(p):
             if silent:
                 try:
                     validation_class(p)
@@ -33,37 +147,61 @@ def validate(validation_class, silent=not settings.DEBUG):
                     raise exceptions.WrongParametersException
             else:
                 validation_class(p)
+        return p
+    return _check
+
+
+def validate(validation_class, silent=not settings.DEBUG, stream=False):
+    def decorator(fun):
+        check = checker(validation_class, silent=silent)
+
+        @functools.wraps(fun)
+        def wrapper(*a, **kw):
+            with tracing.span('validate', view=fun.__qualname__):
+                if flask.request.method == 'GET':
+                    p = {k: v for k, v in flask.request.values and flask.request.values.items() or {}}
+                elif stream:
+                    # the body is the payload, the parameters are in the query string
+                    p = {k: v for k, v in flask.request.args.items()}
+                else:
+                    try:
+                        p = flask.request.data and json.loads(flask.request.data.decode())
+                    except Exception:
+                        raise exceptions.WrongParametersException
+                p = check(p)
             return fun(*a, params=p, **kw)
         return wrapper
     return decorator
 
 
-UUIDValidator = validators.subtype(
+UUIDValidator = subtype(
     validators.String,
     is_uuid
 )
 
-SplitProtocolValidator = validators.subtype(
+SplitProtocolValidator = subtype(
     validators.String,
-    lambda x: x in ['fxc1']
+    lambda x: x in ['fxc1', 'native1']
 )
 
-SplitSessionValidator = validators.struct(
+SplitSecretValidator = struct(
     {
-        "secret": validators.struct(
-            {
-                "value": validators.String,
-                "protocol": validators.maybe(SplitProtocolValidator),
-            }
-        )
+        "value": validators.String,
+        "protocol": maybe(SplitProtocolValidator),
     }
 )
 
-SplitSessionCreateValidator = validators.struct(
+SplitSessionValidator = struct(
+    {
+        "secret": SplitSecretValidator
+    }
+)
+
+SplitSessionCreateValidator = struct(
     {
         "client_alias": validators.String,
         "session_alias": validators.String,
-        "session_policies": validators.struct(
+        "session_policies": struct(
             {
                 "shares": validators.Int,
                 "quorum": validators.Int
@@ -73,7 +211,29 @@ SplitSessionCreateValidator = validators.struct(
     strict=True
 )
 
-SplitSessionGetValidator = validators.struct(
+SplitSessionBatchCreateValidator = struct(
+    {
+        "client_alias": validators.String,
+        "sessions": listof(
+            struct(
+                {
+                    "session_alias": validators.String,
+                    "session_policies": struct(
+                        {
+                            "shares": validators.Int,
+                            "quorum": validators.Int
+                        }
+                    ),
+                    "secret": SplitSecretValidator
+                },
+                strict=True
+            )
+        )
+    },
+    strict=True
+)
+
+SplitSessionGetValidator = struct(
     {
         "client_alias": validators.String,
         "auth": UUIDValidator
@@ -82,14 +242,38 @@ SplitSessionGetValidator = validators.struct(
 )
 
 
-SplitSessionJoinValidator = validators.struct(
+CursorValidator = subtype(
+    validators.String,
+    str.isdigit
+)
+
+SessionEventsValidator = struct(
     {
         "client_alias": validators.String,
+        "auth": UUIDValidator,
+        "version": maybe(CursorValidator),
+        "timeout": maybe(CursorValidator)
     },
     strict=True
 )
 
-SplitSessionMasterEditValidator = validators.struct(
+SplitSessionSecretStreamValidator = struct(
+    {
+        "client_alias": validators.String,
+        "auth": UUIDValidator,
+        "protocol": maybe(SplitProtocolValidator)
+    },
+    strict=True
+)
+
+SplitSessionJoinValidator = struct(
+    {
+        "client_alias": validators.String,
+    },
+    strict=True
+)
+
+SplitSessionMasterEditValidator = struct(
     {
         "client_alias": validators.String,
         "auth": validators.String,
@@ -98,18 +282,18 @@ SplitSessionMasterEditValidator = validators.struct(
     strict=True
 )
 
-SplitSessionEditValidator = validators.union(
+SplitSessionEditValidator = union(
     SplitSessionJoinValidator,
     SplitSessionMasterEditValidator
 )
 
-CombineSessionCreateValidator = validators.struct(
+CombineSessionCreateValidator = struct(
     {
         "client_alias": validators.String,
         "session_alias": validators.String,
         "session_type": validators.String,
-        "session_id": validators.maybe(UUIDValidator),
-        "session_policies": validators.struct(
+        "session_id": maybe(UUIDValidator),
+        "session_policies": struct(
             {
                 "quorum": validators.Int,
                 "shares": validators.Int
@@ -119,7 +303,7 @@ CombineSessionCreateValidator = validators.struct(
     strict=True
 )
 
-CombineSessionGetValidator = validators.struct(
+CombineSessionGetValidator = struct(
     {
         "client_alias": validators.String,
         "auth": UUIDValidator
@@ -127,23 +311,31 @@ CombineSessionGetValidator = validators.struct(
     strict=True
 )
 
-CombineSessionJoinValidator = validators.struct(
+CombineSessionJoinValidator = struct(
+    {
+        "client_alias": validators.String,
+    },
+    strict=True
+)
+
+CombineSessionShareStreamValidator = struct(
     {
         "client_alias": validators.String,
+        "auth": maybe(UUIDValidator)
     },
     strict=True
 )
 
-CombineSessionPutShareValidator = validators.struct(
+CombineSessionPutShareValidator = struct(
     {
         "client_alias": validators.String,
-        "auth": validators.maybe(validators.String),
+        "auth": maybe(validators.String),
         "share": validators.String
     },
     strict=True
 )
 
-CombineSessionMasterEditValidator = validators.struct(
+CombineSessionMasterEditValidator = struct(
     {
         "client_alias": validators.String,
         "auth": validators.String,
@@ -153,7 +345,7 @@ CombineSessionMasterEditValidator = validators.struct(
     strict=True
 )
 
-CombineSessionEditValidator = validators.union(
+CombineSessionEditValidator = union(
     CombineSessionJoinValidator,
     CombineSessionPutShareValidator,
     CombineSessionMasterEditValidator
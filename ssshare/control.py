@@ -1,7 +1,104 @@
-from ssshare.repository.memory import VolatileRepository
+from ssshare import metrics, settings, tracing
+from ssshare.jobs import JobRunner
+from ssshare.domain.identity import IdentityMap
+from ssshare.domain.notifier import SessionNotifier
+from ssshare.repository import codec
+from ssshare.repository.blobs import FileBlobStorage
+from ssshare.repository.log import LogRepository
+from ssshare.repository.memory import VolatileRepository, ShardedVolatileRepository
+from ssshare.repository.shm import SharedMemoryRepository
+from ssshare.repository.sqlite import SQLiteRepository
 from ssshare.services.fxc.api import FXCWebApiService
-from ssshare.settings import FXC_API_URL
+from ssshare.services.shamir.api import ShamirService
+from ssshare.services.shamir.parallel import ProcessPoolShamir
 
 
-secret_share_repository = VolatileRepository(storage=dict())
-fxc_web_api_service = FXCWebApiService(FXC_API_URL)
\ No newline at end of file
+blob_storage = FileBlobStorage(settings.STREAM_STORAGE_PATH)
+if settings.REPOSITORY_BACKEND == 'sqlite':
+    secret_share_repository = SQLiteRepository(
+        settings.SQLITE_PATH,
+        session_ttl=settings.SESSION_TTL,
+        on_evict=blob_storage.delete
+    )
+elif settings.REPOSITORY_BACKEND == 'sharded':
+    secret_share_repository = ShardedVolatileRepository(
+        shards=settings.REPOSITORY_SHARDS,
+        session_ttl=settings.SESSION_TTL,
+        on_evict=blob_storage.delete,
+        codec=settings.REPOSITORY_MEMORY_CODEC and codec or None
+    )
+elif settings.REPOSITORY_BACKEND == 'log':
+    secret_share_repository = LogRepository(
+        settings.LOG_PATH,
+        session_ttl=settings.SESSION_TTL,
+        on_evict=blob_storage.delete,
+        compact_ratio=settings.LOG_COMPACT_RATIO,
+        compact_min_size=settings.LOG_COMPACT_MIN_SIZE,
+        sync=settings.LOG_SYNC
+    )
+elif settings.REPOSITORY_BACKEND == 'shm':
+    secret_share_repository = SharedMemoryRepository(
+        settings.SHM_PATH,
+        buckets=settings.SHM_BUCKETS,
+        bucket_slots=settings.SHM_BUCKET_SLOTS,
+        slot_size=settings.SHM_SLOT_SIZE,
+        probes=settings.SHM_BUCKET_PROBES,
+        session_ttl=settings.SESSION_TTL,
+        on_evict=blob_storage.delete
+    )
+else:
+    secret_share_repository = VolatileRepository(
+        storage=dict(),
+        session_ttl=settings.SESSION_TTL,
+        on_evict=blob_storage.delete,
+        codec=settings.REPOSITORY_MEMORY_CODEC and codec or None
+    )
+secret_share_repository.start_sweeper(settings.SESSION_SWEEP_INTERVAL)
+fxc_web_api_service = FXCWebApiService(
+    settings.FXC_API_URL,
+    pool_size=settings.FXC_POOL_SIZE,
+    connect_timeout=settings.FXC_CONNECT_TIMEOUT,
+    read_timeout=settings.FXC_READ_TIMEOUT,
+    retries=settings.FXC_RETRIES,
+    retry_backoff=settings.FXC_RETRY_BACKOFF
+)
+native_shamir_service = ShamirService(
+    parallel=settings.SHAMIR_PARALLEL_WORKERS and ProcessPoolShamir(
+        settings.SHAMIR_PARALLEL_WORKERS,
+        min_size=settings.SHAMIR_PARALLEL_MIN_SIZE,
+        chunk_size=settings.SHAMIR_PARALLEL_CHUNK_SIZE
+    ) or None
+)
+identity_map = IdentityMap(settings.IDENTITY_MAP_SIZE)
+session_notifier = SessionNotifier()
+job_runner = JobRunner(settings.JOBS_WORKERS, settings.JOBS_QUEUE_SIZE)
+tracing.instrument(secret_share_repository, secret_share_repository.OPERATIONS, 'repository.')
+if settings.TRACING_EXPORTER:
+    tracing.set_exporter(tracing.load_exporter(settings.TRACING_EXPORTER))
+
+if settings.METRICS_ENABLED:
+    metrics.instrument_repository(secret_share_repository)
+    metrics.instrument_service(fxc_web_api_service, 'fxc1')
+    metrics.instrument_service(native_shamir_service, 'native1')
+    metrics.registry.register(metrics.Collected(
+        'ssshare_sessions', 'Sessions in the repository.', lambda: len(secret_share_repository)
+    ))
+    metrics.registry.register(metrics.Collected(
+        'ssshare_repository_events_total', 'Repository evictions and expired reads.',
+        lambda: {(k,): v for k, v in secret_share_repository.counters.items()}, labels=('event',),
+        metric_type='counter'
+    ))
+    metrics.registry.register(metrics.Collected(
+        'ssshare_identity_map_lookups_total', 'Identity map lookups by result.',
+        lambda: {(k,): v for k, v in identity_map.counters.items()}, labels=('result',), metric_type='counter'
+    ))
+    metrics.registry.register(metrics.Collected(
+        'ssshare_event_listeners', 'Sessions with clients waiting for changes.', lambda: len(session_notifier)
+    ))
+    metrics.registry.register(metrics.Collected(
+        'ssshare_jobs', 'Split and combine jobs queued or running.', lambda: job_runner.pending
+    ))
+    metrics.registry.register(metrics.Collected(
+        'ssshare_jobs_total', 'Split and combine jobs by event.',
+        lambda: {(k,): v for k, v in job_runner.counters.items()}, labels=('event',), metric_type='counter'
+    ))
@@ -1,7 +1,18 @@
 import abc
+import uuid
+
+
+def uuid_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    return uuid.UUID(value).bytes
 
 
 class DomainObject(metaclass=abc.ABCMeta):
+    __slots__ = ()
+
     @abc.abstractproperty
     def uuid(self):
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+
+class IdentityMap():
+    """
+    Per-thread LRU of hydrated sessions keyed by repository key, so a hot session is not rebuilt
+    from its dict on every request. An entry is served only while its version matches the stored one
+    and is evicted on writes, or when the request that used it fails, since it may then hold changes
+    that were never written.
+    """
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self.counters = {'hits': 0, 'misses': 0}
+
+    @property
+    def _sessions(self) -> OrderedDict:
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = OrderedDict()
+            self._local.pending = set()
+        return sessions
+
+    def get(self, key: str, repo):
+        session = self._sessions.get(key)
+        if session is not None and session._repo is repo and repo.get_version(key) == session._version:
+            self._sessions.move_to_end(key)
+            self._local.pending.add(key)
+            self.counters['hits'] += 1
+            return session
+        self.counters['misses'] += 1
+
+    def put(self, key: str, session):
+        if not self._size:
+            return
+        sessions = self._sessions
+        sessions[key] = session
+        sessions.move_to_end(key)
+        self._local.pending.add(key)
+        while len(sessions) > self._size:
+            self._local.pending.discard(sessions.popitem(last=False)[0])
+
+    def discard(self, key: str):
+        self._sessions.pop(key, None)
+        self._local.pending.discard(key)
+
+    def release(self, commit: bool = True):
+        """
+        Ends the unit of work of the current thread: on failure the sessions it used are dropped.
+        """
+        sessions = self._sessions
+        if not commit:
+            for key in self._local.pending:
+                sessions.pop(key, None)
+        self._local.pending.clear()
+
+    def clear(self):
+        self._sessions.clear()
+        self._local.pending.clear()
+
+    def __len__(self):
+        return len(self._sessions)
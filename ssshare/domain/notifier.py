@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import threading
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Listeners():
+    __slots__ = ('condition', 'count', 'generation', 'futures')
+
+    def __init__(self, lock):
+        self.condition = threading.Condition(lock)
+        self.count = 0
+        self.generation = 0
+        self.futures = set()
+
+    def wait(self, seen: int, timeout: float) -> bool:
+        """
+        Blocks until a change notified after the `seen` generation, or timeout.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.generation != seen, timeout)
+
+    async def wait_async(self, seen: int, timeout: float) -> bool:
+        """
+        As wait, without holding a thread: the event loop is called back by the notifying thread.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self.condition:
+            if self.generation != seen:
+                return True
+            self.futures.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.condition:
+                self.futures.discard(waiter)
+
+    def notify(self):
+        self.generation += 1
+        self.condition.notify_all()
+        for loop, future in self.futures:
+            with contextlib.suppress(RuntimeError):  # the loop is closed
+                loop.call_soon_threadsafe(_wake, future)
+
+
+class SessionNotifier():
+    """
+    Wakes up the threads waiting on a session when it changes. Keys are tracked only while someone
+    listens, a listener reads the generation before checking the session so no change is lost.
+    Notifications are local to the process: listeners re-check the repository when their wait times out.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+
+    @contextlib.contextmanager
+    def listen(self, key: str):
+        with self._lock:
+            listeners = self._keys.get(key) or self._keys.setdefault(key, _Listeners(self._lock))
+            listeners.count += 1
+        try:
+            yield listeners
+        finally:
+            with self._lock:
+                listeners.count -= 1
+                if not listeners.count:
+                    del self._keys[key]
+
+    def notify(self, key: str):
+        with self._lock:
+            listeners = self._keys.get(key)
+            if listeners:
+                listeners.notify()
+
+    def __len__(self):
+        return len(self._keys)
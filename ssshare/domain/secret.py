@@ -1,14 +1,21 @@
+import time
+import uuid
+from collections import deque
 from enum import Enum
 from hashlib import sha256
 
-from ssshare import exceptions, settings
-from ssshare.domain import DomainObject
+from ssshare import exceptions, settings, tracing
+from ssshare.domain import DomainObject, uuid_bytes
 from ssshare.domain.combine import CombineSessionType
 from ssshare.domain.split import SplitSession, SplitSessionType
 from ssshare.domain.user import SharedSessionUser
 
+JOB_PENDING, JOB_DONE, JOB_FAILED = 'pending', 'done', 'failed'
+
 
 class Share():
+    __slots__ = ('user', 'value')
+
     def __init__(self, value: str, user=None):
         self.user = user
         self.value = value
@@ -24,50 +31,144 @@ class Share():
         return cls(user=data['user'], value=data['value'])
 
 
+class ShareTable():
+    """
+    Column oriented shares: values and owners (16 bytes uuids, None if unassigned) in parallel lists.
+    Iterating yields Share objects built on the fly. Owners are indexed and unassigned shares queued,
+    so lookups and assignments don't scan the table.
+    """
+    __slots__ = ('_values', '_users', '_owners', '_free')
+
+    def __init__(self, shares=()):
+        self._values = []
+        self._users = []
+        self._owners = {}
+        self._free = deque()
+        for share in shares:
+            self.append(share)
+
+    def _share(self, i: int) -> Share:
+        user = self._users[i]
+        return Share(self._values[i], user and str(uuid.UUID(bytes=user)))
+
+    def _index(self, i: int, user):
+        if user:
+            self._owners.setdefault(user, i)
+        else:
+            self._free.append(i)
+
+    def append(self, share: Share):
+        user = share.user and uuid_bytes(share.user)
+        self._values.append(share.value)
+        self._users.append(user)
+        self._index(len(self._users) - 1, user)
+
+    def index(self, user_id):
+        if user_id is None:
+            return self._free[0] if self._free else None
+        return self._owners.get(uuid_bytes(user_id))
+
+    def get(self, user_id):
+        i = self.index(user_id)
+        return i is not None and self._share(i) or None
+
+    def attach(self, user_id):
+        if self._free:
+            i = self._free.popleft()
+            self._users[i] = uuid_bytes(user_id)
+            self._owners.setdefault(self._users[i], i)
+            return self._share(i)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return (self._share(i) for i in range(len(self._values)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._share(i) for i in range(*index.indices(len(self._values)))]
+        return self._share(index)
+
+    def to_dict(self) -> dict:
+        return {'values': list(self._values), 'users': list(self._users)}
+
+    @classmethod
+    def from_dict(cls, data) -> 'ShareTable':
+        i = cls()
+        if isinstance(data, dict):
+            i._values, i._users = list(data['values']), list(data['users'])
+            for n, user in enumerate(i._users):
+                i._index(n, user)
+        else:
+            for share in data:
+                i.append(Share.from_dict(share))
+        return i
+
+
 class SecretProtocol(Enum):
     FXC1 = 'fxc1'
+    NATIVE1 = 'native1'
 
 
 class SharedSessionSecret(DomainObject):
+    __slots__ = (
+        '_session', '_shares', '_quorum', '_secret', '_splitted', '_protocol', '_streamed', '_digest', '_job',
+        '_job_scheduled'
+    )
+
     def __init__(self):
         self._session = None
         self._shares = None
         self._quorum = None
         self._secret = None
-        self._splitted = []
+        self._splitted = ShareTable()
         self._protocol = SecretProtocol(settings.DEFAULT_SSS_PROTOCOL)
+        self._streamed = False
+        self._digest = None
+        self._job = None
+        self._job_scheduled = False
 
     def user_have_share(self, user: SharedSessionUser):
-        for share in self._splitted:
-            if str(user.uuid) == share.user:
-                return True
+        return self._splitted.index(user.uuid) is not None
 
     @property
     def split_service(self):
-        from ssshare.control import fxc_web_api_service
+        from ssshare.control import fxc_web_api_service, native_shamir_service
         return {
-            SecretProtocol.FXC1: fxc_web_api_service
+            SecretProtocol.FXC1: fxc_web_api_service,
+            SecretProtocol.NATIVE1: native_shamir_service
         }
 
     @property
     def combine_service(self):
-        from ssshare.control import fxc_web_api_service
+        from ssshare.control import fxc_web_api_service, native_shamir_service
         return {
-            SecretProtocol.FXC1: fxc_web_api_service
+            SecretProtocol.FXC1: fxc_web_api_service,
+            SecretProtocol.NATIVE1: native_shamir_service
         }
 
-    def edit_secret(self, value: dict):
-        value.get('value') and self._set_secret(value['value'])
+    def edit_secret(self, value: dict, split=True):
+        value.get('protocol') and self._set_protocol(value['protocol'])
+        value.get('value') and self._set_secret(value['value'], split=split)
         value.get('shares') and self._set_shares(value['shares'])
         value.get('quorum') and self._set_quorum(value['quorum'])
-        value.get('protocol') and SecretProtocol(value.get('protocol', 'fxc1'))
         return self
 
-    def _set_secret(self, secret: str):
+    def _set_protocol(self, protocol: str):
         if self._secret:
             raise exceptions.ObjectDeniedException
+        self._protocol = SecretProtocol(protocol)
+
+    def _set_secret(self, secret: str, split=True):
+        if self._secret and self.job_state != JOB_FAILED:
+            raise exceptions.ObjectDeniedException
         self._secret = secret
-        self._split()
+        self._job = None
+        if split and settings.JOBS_ENABLED:
+            self._schedule_job()
+        elif split:
+            self._split()
 
     def _set_shares(self, shares: int):
         if shares < len(self._session.users):
@@ -112,7 +213,10 @@ class SharedSessionSecret(DomainObject):
             shares=self.shares,
             quorum=self.quorum,
             protocol=self._protocol and self._protocol.value,
-            splitted=[s.to_dict() for s in self._splitted]
+            splitted=self._splitted.to_dict(),
+            streamed=self._streamed,
+            digest=self._digest,
+            job=self._job
         )
 
     @classmethod
@@ -122,17 +226,24 @@ class SharedSessionSecret(DomainObject):
         i._quorum = data['quorum']
         i._shares = data['shares']
         i._protocol = SecretProtocol(data['protocol'])
-        i._splitted = [Share(value=x['value'], user=x['user']) for x in data['splitted']]
+        i._splitted = ShareTable.from_dict(data['splitted'])
+        i._streamed = data.get('streamed', False)
+        i._digest = data.get('digest')
+        i._job = data.get('job')
         return i
 
     @property
     def sha256(self) -> str:
-        return self._secret and sha256(self._secret.encode()).hexdigest()
+        return self._digest or self._secret and sha256(self._secret.encode()).hexdigest()
+
+    @property
+    def streamed(self) -> bool:
+        return self._streamed
 
     @property
     def splitted(self):
-        if not self._secret and not self._splitted:
-            return []
+        if not self._secret and not self._splitted or self._job and self._job['state'] != JOB_DONE:
+            return self._splitted
         return self._splitted or self._split()
 
     @property
@@ -143,7 +254,7 @@ class SharedSessionSecret(DomainObject):
         assert not self.secret
         raise NotImplementedError
 
-    def _is_auth_for_secret(self, auth):
+    def is_auth_for_secret(self, auth):
         return (
             (
                 (self._session.master and auth == str(self._session.master.uuid)) or
@@ -157,44 +268,179 @@ class SharedSessionSecret(DomainObject):
             'shares': self._shares,
             'protocol': self._protocol.value
         }
-        if self._secret:
+        if self._secret or self._digest:
             res['sha256'] = self.sha256
-            if self._session and auth and self._is_auth_for_secret(auth):
+            if self._session and auth and self._secret and self.is_auth_for_secret(auth):
                 res['secret'] = self._secret
+        if self._streamed:
+            res['streamed'] = True
+        if self._job:
+            res['job'] = {'state': self.job_state}
+            if res['job']['state'] == JOB_FAILED:
+                res['job']['error'] = self._job['error'] or 'timeout'
         return res
 
+    @tracing.traced('secret.split')
     def _split(self):
         assert self._secret
-        shares = self.split_service[self._protocol].split(self)
+        return self._set_splitted(self.split_service[self._protocol].split(self))
+
+    def _set_splitted(self, shares: list):
         for i, user in enumerate(self._session.users):
             shares[i].user = str(user.uuid)
-        self._splitted = shares
+        self._splitted = ShareTable(shares)
         return self._splitted
 
+    @classmethod
+    def split_many(cls, secrets: list):
+        by_protocol = {}
+        for secret in secrets:
+            assert secret.secret and not secret._splitted
+            by_protocol.setdefault(secret._protocol, []).append(secret)
+        for protocol, group in by_protocol.items():
+            service = group[0].split_service[protocol]
+            for secret, shares in zip(group, service.split_many(group)):
+                secret._set_splitted(shares)
+        return secrets
+
     def attach_user_to_share(self, user: SharedSessionUser):
-        for share in self._splitted:
-            if not share.user:
-                share.user = str(user.uuid)
-                _s = share
-                return _s
-        raise exceptions.ObjectDeniedException
+        share = self._splitted.attach(user.uuid)
+        if not share:
+            raise exceptions.ObjectDeniedException
+        return share
 
     def get_share(self, user: SharedSessionUser):
         assert self._splitted
-        for share in self._splitted:
-            if share.user == str(user.uuid):
-                return share
+        return self._splitted.get(user.uuid)
 
     def add_share(self, share: Share):
         if len(self.splitted) > self.shares:
             raise exceptions.DomainObjectBusyException
         self._splitted.append(share)
-        if len(self.splitted) >= self.quorum:
+        if len(self._splitted) >= self.quorum and settings.JOBS_ENABLED:
+            self._schedule_job()
+        elif len(self._splitted) >= self.quorum:
             self.build_secret()
         return self
 
+    @tracing.traced('secret.build')
     def build_secret(self):
         if len(self._splitted) >= self._quorum:
+            if self._streamed:
+                self._digest = self._combine_stream()
+                return
             self._secret = self.combine_service[self._protocol].combine(self)
             return
         raise exceptions.ObjectNotFoundException
+
+    @property
+    def job_state(self):
+        if self._job and self._job['state'] == JOB_PENDING and self._job['deadline'] < time.time():
+            return JOB_FAILED
+        return self._job and self._job['state']
+
+    def _schedule_job(self):
+        from ssshare.control import job_runner
+        job_runner.admit()
+        self._job = dict(
+            id=uuid.uuid4().hex, state=JOB_PENDING, deadline=time.time() + settings.JOBS_TIMEOUT, error=None
+        )
+        self._job_scheduled = True
+
+    def retry_job(self):
+        if self.job_state == JOB_FAILED:
+            self._schedule_job()
+
+    def submit_job(self):
+        from ssshare.control import job_runner
+        if self._job_scheduled:
+            self._job_scheduled = False
+            job_runner.submit(type(self._session).run_job, str(self._session.uuid), self._job['id'])
+
+    def is_job_pending(self, job_id: str) -> bool:
+        return bool(self._job) and self._job['id'] == job_id and self._job['state'] == JOB_PENDING
+
+    def run_job(self):
+        # the session is left untouched, the result is applied with finish_job
+        if self._session.TYPE == SplitSession.TYPE:
+            return self.split_service[self._protocol].split(self)
+        if len(self._splitted) < self._quorum:
+            raise exceptions.ObjectNotFoundException
+        if self._streamed:
+            return self._combine_stream()
+        return self.combine_service[self._protocol].combine(self)
+
+    def finish_job(self, result=None, error: str = None):
+        if not error and self._job['deadline'] < time.time():
+            error = 'timeout'
+        if error:
+            self._job = dict(self._job, state=JOB_FAILED, error=error)
+            return
+        if self._session.TYPE == SplitSession.TYPE:
+            self._set_splitted(result)
+        elif self._streamed:
+            self._digest = result
+        else:
+            self._secret = result
+        self._job = dict(self._job, state=JOB_DONE)
+
+    def _blob_key(self, name: str) -> str:
+        return '{}/{}/{}'.format(self._session.TYPE, self._session.uuid, name)
+
+    def _stream_service(self, services: dict, method: str):
+        service = services[self._protocol]
+        if not hasattr(service, method):
+            raise exceptions.WrongParametersException('protocol does not support streaming')
+        return getattr(service, method)
+
+    def stream_secret(self, read):
+        from ssshare.control import blob_storage
+        if self._secret or self._digest or self._splitted:
+            raise exceptions.ObjectDeniedException
+        split_stream = self._stream_service(self.split_service, 'split_stream')
+        keys = [self._blob_key('{:02x}'.format(x)) for x in range(1, self._shares + 1)]
+        with blob_storage.writers(keys) as writers:
+            self._digest, _ = split_stream(
+                read, writers, self._quorum, settings.STREAM_CHUNK_SIZE, settings.STREAM_MAX_SECRET_SIZE
+            )
+        self._streamed = True
+        self._set_splitted([Share(key) for key in keys])
+        return self
+
+    def add_share_stream(self, read, user: SharedSessionUser):
+        from ssshare.control import blob_storage
+        if self._splitted and not self._streamed:
+            raise exceptions.ObjectDeniedException
+        if self._digest or len(self._splitted) >= self._shares:
+            raise exceptions.DomainObjectBusyException
+        self._stream_service(self.combine_service, 'combine_stream')
+        key = self._blob_key(str(user.uuid))
+        with blob_storage.writer(key) as writer:
+            chunk = read(settings.STREAM_CHUNK_SIZE)
+            while chunk:
+                writer.write(chunk)
+                chunk = read(settings.STREAM_CHUNK_SIZE)
+        self._streamed = True
+        return self.add_share(Share(key, str(user.uuid)))
+
+    def _combine_stream(self):
+        from ssshare.control import blob_storage
+        combine_stream = self._stream_service(self.combine_service, 'combine_stream')
+        keys = [share.value for share in self._splitted[:self._quorum]]
+        with blob_storage.readers(keys) as readers, blob_storage.writer(self._blob_key('secret')) as writer:
+            digest, _ = combine_stream(readers, writer, settings.STREAM_CHUNK_SIZE)
+        return digest
+
+    def iter_share(self, user: SharedSessionUser):
+        from ssshare.control import blob_storage
+        share = self._streamed and self._splitted and self.get_share(user)
+        if not share:
+            raise exceptions.ObjectNotFoundException
+        return blob_storage.iter_chunks(share.value, settings.STREAM_CHUNK_SIZE)
+
+    def iter_secret(self):
+        from ssshare.control import blob_storage
+        key = self._blob_key('secret')
+        if not self._streamed or not self._digest or not blob_storage.exists(key):
+            raise exceptions.ObjectNotFoundException
+        return blob_storage.iter_chunks(key, settings.STREAM_CHUNK_SIZE)
@@ -1,9 +1,9 @@
 import abc
 import time
 import uuid
-from ssshare import exceptions, settings
-from ssshare.control import secret_share_repository
-from ssshare.domain import DomainObject
+from ssshare import exceptions, profiling, settings, tracing
+from ssshare.control import identity_map, secret_share_repository, session_notifier
+from ssshare.domain import DomainObject, uuid_bytes
 from ssshare.domain.user import SharedSessionUser
 
 
@@ -16,9 +16,12 @@ class SharedSession(DomainObject, metaclass=abc.ABCMeta):
         self.current_user = None
         self._uuid = None
         self._users = []
+        self._users_by_uuid = {}
+        self._users_by_alias = {}
         self._secret = None
         self._alias = alias
         self._last_update = None
+        self._version = None
         self._session_ttl = settings.SESSION_TTL
         self._shares = None
 
@@ -31,13 +34,17 @@ class SharedSession(DomainObject, metaclass=abc.ABCMeta):
     def master(self):
         return self._master
 
+    def _set_users(self, users: list):
+        self._users = users
+        self._users_by_uuid = {user._uuid: user for user in users}
+        self._users_by_alias = {user.alias: user for user in users}
+
     def _get_user(self, user_id):
-        for user in self._users:
-            if user_id == isinstance(user_id, uuid.UUID) and str(user.uuid) or user.uuid:
-                return user
+        return self._users_by_uuid.get(uuid_bytes(user_id))
 
     def get_user(self, user_id: str, alias: str = None):
-        user = uuid.UUID(user_id) == self.master.uuid and self.master or self._get_user(user_id)
+        key = uuid_bytes(user_id)
+        user = self.master and key == self.master._uuid and self.master or self._users_by_uuid.get(key)
         return alias is not None and user and user.alias == alias and user or user
 
     @abc.abstractclassmethod
@@ -55,18 +62,61 @@ class SharedSession(DomainObject, metaclass=abc.ABCMeta):
         rem = self._session_ttl - (int(time.time()) - self._last_update)
         return self._session_ttl if self._session_ttl == -1 else rem > 0 and rem or 0
 
+    @property
+    def key(self) -> str:
+        return '{}/{}'.format(self.TYPE, self._uuid)
+
     @classmethod
+    @tracing.traced('session.get')
     def get(cls, session_id: str, auth: str=None, repo=secret_share_repository) -> 'SharedSession':
-        session = repo.get_session('{}/{}'.format(cls.TYPE, session_id))
-        if not session:
-            raise exceptions.ObjectNotFoundException
-        i = cls.from_dict(session, repo=repo)
+        key = '{}/{}'.format(cls.TYPE, session_id)
+        i = identity_map.get(key, repo)
+        if not i:
+            session = repo.get_session(key)
+            if not session:
+                raise exceptions.ObjectNotFoundException
+            with tracing.span('session.from_dict'):
+                i = cls.from_dict(session, repo=repo)
+            identity_map.put(key, i)
+        i.current_user = None
+        i._annotate_profile()
         if auth:
-            if not i.get_user(auth):
+            user = i.get_user(auth)
+            if not user:
                 raise exceptions.ObjectDeniedException
-            i.current_user = i.get_user(auth)
+            i.current_user = user
         return i
 
+    @property
+    def etag(self) -> str:
+        """
+        Weak validator of the API representation: the version changes on every write, the ttl drifts.
+        """
+        return '{}-{}'.format(self._version, self._last_update)
+
+    @classmethod
+    @tracing.traced('session.match_etag')
+    def match_etag(cls, session_id: str, auth: str, etags, repo=secret_share_repository) -> (None, str):
+        """
+        The current etag of the session if it is among the client ones and auth is a user of the session.
+        Checked on the identity map or on the stored dict, so a not modified session is never rehydrated.
+        """
+        key = '{}/{}'.format(cls.TYPE, session_id)
+        i = identity_map.get(key, repo)
+        if i:
+            return etags.contains_weak(i.etag) and i.get_user(auth) and i.etag or None
+        version = repo.get_version(key)
+        if not version or not etags.star_tag and \
+                not any(tag.partition('-')[0] == str(version) for tag in etags.as_set(True)):
+            return
+        session = repo.get_session(key)
+        etag = session and '{}-{}'.format(session['version'], session['last_update'])
+        if not etag or not etags.contains_weak(etag):
+            return
+        user_id = uuid_bytes(auth)
+        users = session['users'] + (session.get('master') and [session['master']] or [])
+        return any(uuid_bytes(user['uuid']) == user_id for user in users) and etag or None
+
     @abc.abstractclassmethod
     def from_dict(self, session, repo=None) -> 'SharedSession':
         pass
@@ -79,40 +129,85 @@ class SharedSession(DomainObject, metaclass=abc.ABCMeta):
     def uuid(self) -> (None, uuid.UUID):
         return self._uuid
 
+    @property
+    def version(self) -> (None, int):
+        return self._version
+
     def store(self) -> 'SharedSession':
         self._last_update = int(time.time())
         res = self._repo.store_session(self.to_dict())
         self._uuid = res['uuid']
+        self._version = res['version']
         return self
 
+    @classmethod
+    def store_many(cls, sessions: list, repo=secret_share_repository) -> list:
+        now = int(time.time())
+        for session in sessions:
+            session._last_update = now
+        for session, res in zip(sessions, repo.store_sessions([s.to_dict() for s in sessions])):
+            session._uuid = res['uuid']
+            session._version = res['version']
+        return sessions
+
+    def _annotate_profile(self):
+        profiling.annotate(users=len(self._users), secret=self._secret and len(self._secret.secret or ''))
+
     def update(self) -> 'SharedSession':
+        self._annotate_profile()
         self._last_update = int(time.time())
-        self._repo.update_session(self.to_dict())
+        identity_map.discard(self.key)
+        self._version = self._repo.update_session(self.to_dict())['version']
+        session_notifier.notify(self.key)
+        self._secret and self._secret.submit_job()
         return self
 
+    @classmethod
+    def run_job(cls, session_id: str, job_id: str, repo=secret_share_repository):
+        commit = False
+        try:
+            session = cls.get(session_id, repo=repo)
+            if not session.secret.is_job_pending(job_id):
+                return
+            try:
+                result, error = session.secret.run_job(), None
+            except Exception as e:
+                result, error = None, type(e).__name__
+            for attempt in range(settings.SESSION_UPDATE_RETRIES):
+                session = attempt and cls.get(session_id, repo=repo) or session
+                if not session.secret.is_job_pending(job_id):
+                    return
+                session.secret.finish_job(result, error)
+                try:
+                    session.update()
+                    commit = True
+                    return
+                except exceptions.ObjectConflictException:
+                    if attempt == settings.SESSION_UPDATE_RETRIES - 1:
+                        raise
+        finally:
+            identity_map.release(commit)
+
     def delete(self) -> bool:
         assert self._uuid
         self._repo.delete_session(self.to_dict())
+        identity_map.discard(self.key)
+        session_notifier.notify(self.key)
         return True
 
     @abc.abstractmethod
     def to_api(self, auth=None):
         pass
 
-    def _get_users_aliases(self) -> dict:
-        users = {
-            user.alias: [user.ROLE, user.uuid] for user in self._users
-        }
-        return users
-
     def join(self, alias: str):
-        users = self._get_users_aliases()
-        if self._secret and len(users) >= self._secret.shares:
+        if self._secret and len(self._users) >= self._secret.shares:
             raise exceptions.DomainObjectBusyException
-        if alias in users:
+        if alias in self._users_by_alias:
             raise exceptions.ObjectDeniedException
         user = SharedSessionUser(user_id=uuid.uuid4(), alias=alias)
         self._users.append(user)
+        self._users_by_uuid[user._uuid] = user
+        self._users_by_alias[alias] = user
         return user
 
     @property
@@ -1,5 +1,6 @@
 from enum import Enum
 
+from ssshare import tracing
 from ssshare.domain.master import SharedSessionMaster
 from ssshare.domain.session import SharedSession
 from ssshare.control import secret_share_repository
@@ -32,6 +33,7 @@ class SplitSession(SharedSession):
     def to_dict(self) -> dict:
         return dict(
             uuid=self._uuid,
+            version=self._version,
             master=self._master.to_dict(),
             last_update=self._last_update,
             alias=self._alias,
@@ -50,13 +52,15 @@ class SplitSession(SharedSession):
         i._uuid = data['uuid']
         i._master = data.get('master') and SharedSessionMaster.from_dict(data['master'], session=i)
         i._last_update = data['last_update']
+        i._version = data.get('version')
         i._alias = data['alias']
         i._subtype = data['subtype']
-        i._users = [SharedSessionUser.from_dict(u, session=i) for u in data['users']]
+        i._set_users([SharedSessionUser.from_dict(u, session=i) for u in data['users']])
         i._secret = data['secret'] and SharedSessionSecret.from_dict(data['secret'])
         i._secret._session = i._secret and i
         return i
 
+    @tracing.traced('session.to_api')
     def to_api(self, auth=None):
         users = [self.master.to_api(auth=auth)] + [user.to_api(auth=auth) for user in self.users]
         return {
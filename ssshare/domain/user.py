@@ -1,12 +1,13 @@
 import uuid
-from ssshare.domain import DomainObject
+from ssshare.domain import DomainObject, uuid_bytes
 
 
 class SharedSessionUser(DomainObject):
     ROLE = 'user'
+    __slots__ = ('_uuid', '_alias', '_session', '_shareholder')
 
     def __init__(self, user_id: uuid.UUID = None, alias: str = None, session=None):
-        self._uuid = user_id
+        self._uuid = user_id and uuid_bytes(user_id)
         self._alias = alias
         self._session = session
         self._shareholder = True
@@ -21,7 +22,7 @@ class SharedSessionUser(DomainObject):
 
     @property
     def uuid(self):
-        return self._uuid
+        return self._uuid and uuid.UUID(bytes=self._uuid)
 
     @property
     def session(self):
@@ -38,7 +39,7 @@ class SharedSessionUser(DomainObject):
 
     def to_dict(self) -> dict:
         return dict(
-            uuid=str(self._uuid),
+            uuid=self._uuid,
             alias=self._alias,
             shareholder=self._shareholder
         )
@@ -46,7 +47,7 @@ class SharedSessionUser(DomainObject):
     @classmethod
     def from_dict(cls, data: dict, session=None) -> 'SharedSessionUser':
         i = cls(session=session)
-        i._uuid = uuid.UUID(data['uuid'])
+        i._uuid = uuid_bytes(data['uuid'])
         i._alias = data['alias']
         i._shareholder = data['shareholder']
         return i
@@ -64,12 +65,14 @@ class SharedSessionUser(DomainObject):
             secret = self.session and self.session.secret or None
             if secret and secret.splitted:
                 share = secret.get_share(self)
-                if share:
+                if share and secret.streamed:
+                    res['streamed'] = True  # the share value is a storage key, the share is read on /share
+                elif share:
                     res['share'] = share.value
         return res
 
     def _is_auth_valid(self, auth: str):
-        if auth == str(self._uuid):
+        if str(auth) == str(self.uuid):
             return True
-        if self.session and self.session.master and str(self.session.master.uuid) == auth:
+        if self.session and self.session.master and str(self.session.master.uuid) == str(auth):
             return True
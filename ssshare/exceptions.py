@@ -19,4 +19,12 @@ class ObjectDeniedException(Exception):
 
 
 class DomainObjectBusyException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class ObjectConflictException(Exception):
+    pass
+
+
+class BackendUnavailableException(Exception):
+    pass
@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ssshare import exceptions
+
+
+class JobRunner():
+    def __init__(self, workers: int, queue_size: int):
+        self._workers = workers
+        self._capacity = workers + queue_size
+        self._executor = None
+        self._pending = 0
+        self._reserved = 0
+        self._local = threading.local()
+        self._condition = threading.Condition()
+        self.counters = {'submitted': 0, 'rejected': 0, 'errors': 0}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def admit(self):
+        # held by the calling thread until submit or release
+        with self._condition:
+            if self._pending + self._reserved >= self._capacity:
+                self.counters['rejected'] += 1
+                raise exceptions.BackendUnavailableException('job queue full')
+            self._reserved += 1
+        self._local.reserved = getattr(self._local, 'reserved', 0) + 1
+
+    def release(self):
+        reserved, self._local.reserved = getattr(self._local, 'reserved', 0), 0
+        if reserved:
+            with self._condition:
+                self._reserved -= reserved
+
+    def submit(self, fun, *args):
+        assert getattr(self._local, 'reserved', 0)
+        self._local.reserved -= 1
+        with self._condition:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='ssshare-job')
+            self._reserved -= 1
+            self._pending += 1
+            self.counters['submitted'] += 1
+        self._executor.submit(self._run, fun, *args)
+
+    def _run(self, fun, *args):
+        try:
+            fun(*args)
+        except Exception:
+            self.counters['errors'] += 1
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def wait(self, timeout: float = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self):
+        self._executor and self._executor.shutdown(wait=True)
+        self._executor = None
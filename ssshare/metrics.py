@@ -0,0 +1,220 @@
+"""
+Process metrics in the Prometheus text exposition format, served at /metrics.
+
+Observations cost a bisect and a lock held for two increments. Counters kept elsewhere (repositories,
+identity map, notifier) are read only when the endpoint is scraped.
+"""
+import bisect
+import functools
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = tuple(4 ** x for x in range(2, 12))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric():
+    TYPE = NotImplemented
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _labels(self, values: tuple, extra=()) -> str:
+        pairs = list(zip(self.labels, values)) + list(extra)
+        return pairs and '{%s}' % ','.join('{}="{}"'.format(k, _escape(v)) for k, v in pairs) or ''
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} {}'.format(self.name, self.TYPE)]
+        lines.extend('{}{} {}'.format(name, labels, _number(value)) for name, labels, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            yield self.name, self._labels(labels), value
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # a count per bucket, the last one being +Inf, followed by the sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0]
+            counts[bucket] += 1
+            counts[-1] += value
+
+    def count(self, *labels) -> int:
+        counts = self._values.get(labels)
+        return counts and sum(counts[:-1]) or 0
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        for labels, counts in sorted(values):
+            cumulative = 0
+            for le, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield self.name + '_bucket', self._labels(labels, [('le', le)]), cumulative
+            yield self.name + '_sum', self._labels(labels), counts[-1]
+            yield self.name + '_count', self._labels(labels), cumulative
+
+
+class Collected(_Metric):
+    """
+    A metric read at scrape time: collect returns a number or a dict of label values tuples to numbers.
+    """
+    def __init__(self, name: str, documentation: str, collect, labels=(), metric_type='gauge'):
+        super().__init__(name, documentation, labels)
+        self.TYPE = metric_type
+        self._collect = collect
+
+    def samples(self):
+        values = self._collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            yield self.name, self._labels(labels), value
+
+
+class Registry():
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        assert metric.name not in self._metrics
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+registry = Registry()
+request_latency = registry.register(Histogram(
+    'ssshare_http_request_duration_seconds', 'Time spent in a view, by endpoint and method.',
+    labels=('endpoint', 'method')
+))
+responses = registry.register(Counter(
+    'ssshare_http_responses_total', 'Responses by endpoint and status code.', labels=('endpoint', 'status')
+))
+errors = registry.register(Counter(
+    'ssshare_http_errors_total', 'Exceptions mapped to an error response, by error handler.',
+    labels=('error', 'status')
+))
+repository_latency = registry.register(Histogram(
+    'ssshare_repository_operation_duration_seconds', 'Repository operations latency.', labels=('operation',)
+))
+repository_errors = registry.register(Counter(
+    'ssshare_repository_errors_total', 'Repository operations raising, by exception.', labels=('operation', 'error')
+))
+backend_latency = registry.register(Histogram(
+    'ssshare_backend_duration_seconds', 'Split and combine latency, by protocol.', labels=('protocol', 'operation')
+))
+backend_payload = registry.register(Histogram(
+    'ssshare_backend_payload_bytes', 'Size of the secrets split and combined, by protocol.',
+    labels=('protocol', 'operation'), buckets=SIZE_BUCKETS
+))
+backend_errors = registry.register(Counter(
+    'ssshare_backend_errors_total', 'Split and combine calls raising, by exception.',
+    labels=('protocol', 'operation', 'error')
+))
+
+
+def _timed(fun, histogram: Histogram, errors_counter: Counter, labels: tuple, size=None, payload=None):
+    @functools.wraps(fun)
+    def wrapper(*a, **kw):
+        start = time.perf_counter()
+        try:
+            res = fun(*a, **kw)
+        except Exception as e:
+            errors_counter.inc(*labels, type(e).__name__)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start, *labels)
+        if size:
+            payload.observe(size(a, res), *labels)
+        return res
+    return wrapper
+
+
+def instrument_repository(repository):
+    """
+    Times the repository operations on the instance.
+    """
+    for operation in repository.OPERATIONS:
+        method = _timed(getattr(repository, operation), repository_latency, repository_errors, (operation,))
+        setattr(repository, operation, method)
+    return repository
+
+
+def _secrets_size(a: tuple, res) -> int:
+    secrets = a[0] if isinstance(a[0], list) else [a[0]]
+    return sum(len(s.secret or '') for s in secrets)
+
+
+def _combined_size(a: tuple, res) -> int:
+    return len(res or '')
+
+
+def _streamed_size(a: tuple, res) -> int:
+    return res[1]
+
+
+BACKEND_OPERATIONS = (
+    ('split', _secrets_size),
+    ('split_many', _secrets_size),
+    ('combine', _combined_size),
+    ('split_stream', _streamed_size),
+    ('combine_stream', _streamed_size)
+)
+
+
+def instrument_service(service, protocol: str):
+    """
+    Times the split and combine calls of a service instance and records the secrets size.
+    """
+    for operation, size in BACKEND_OPERATIONS:
+        if not hasattr(service, operation):
+            continue
+        method = _timed(
+            getattr(service, operation), backend_latency, backend_errors, (protocol, operation),
+            size=size, payload=backend_payload
+        )
+        setattr(service, operation, method)
+    return service
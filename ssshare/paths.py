@@ -0,0 +1,15 @@
+"""
+Directories holding sessions, shares and diagnostics: created readable by the server user only, and refused
+when they already exist with a different owner, other permissions or as a symlink.
+"""
+import os
+import stat
+from ssshare import exceptions
+
+
+def private_directory(path: str) -> str:
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise exceptions.SystemException('{} must be a directory owned by this user with mode 0700'.format(path))
+    return path
@@ -0,0 +1,86 @@
+"""
+Per request profiling: a sampled fraction of requests, or the ones carrying the profile header set to
+PROFILE_TOKEN, run under cProfile and are dumped to PROFILE_PATH, named after the route and the size of
+the sessions they touched. Dumps are read with pstats or snakeviz.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from ssshare import settings
+from ssshare.paths import private_directory
+
+HEADER = 'X-Ssshare-Profile'
+_local = threading.local()
+_sequence = itertools.count()
+
+
+class _RequestProfile():
+    __slots__ = ('profile', 'tags', 'start')
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.tags = {}
+        self.start = time.perf_counter()
+
+
+def wanted(header: str = None) -> bool:
+    if header and settings.PROFILE_TOKEN and hmac.compare_digest(header.encode(), settings.PROFILE_TOKEN.encode()):
+        return True
+    return bool(settings.PROFILE_SAMPLE_RATE) and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def active() -> bool:
+    return getattr(_local, 'current', None) is not None
+
+
+def start():
+    assert not active()
+    _local.current = _RequestProfile()
+    _local.current.profile.enable()
+
+
+def annotate(**tags):
+    """
+    Sizes of what the profiled request is working on, the largest value seen for a tag is kept.
+    No-op when the current thread is not profiled.
+    """
+    current = getattr(_local, 'current', None)
+    if current:
+        for k, v in tags.items():
+            current.tags[k] = max(v or 0, current.tags.get(k, 0))
+
+
+def _filename(route: str, method: str, elapsed: float, tags: dict) -> str:
+    parts = [time.strftime('%Y%m%d-%H%M%S'), route, method]
+    parts.extend('{}{}'.format(k, v) for k, v in sorted(tags.items()) if v)
+    parts.append('{:.0f}ms'.format(elapsed * 1000))
+    parts.extend((os.getpid(), next(_sequence)))
+    return re.sub(r'[^\w.-]', '_', '-'.join(str(p) for p in parts)) + '.prof'
+
+
+def stop(route: str, method: str, **tags) -> str:
+    """
+    Ends the current profile and dumps it, returns the file path, None if the request was not profiled.
+    """
+    current = getattr(_local, 'current', None)
+    if not current:
+        return
+    current.profile.disable()
+    annotate(**tags)
+    _local.current = None
+    filename = _filename(route, method, time.perf_counter() - current.start, current.tags)
+    path = os.path.join(private_directory(settings.PROFILE_PATH), filename)
+    current.profile.dump_stats(path)
+    return path
+
+
+def discard():
+    current = getattr(_local, 'current', None)
+    if current:
+        current.profile.disable()
+        _local.current = None
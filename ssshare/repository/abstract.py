@@ -1,16 +1,48 @@
 import abc
+import threading
 
 
 class Repository(metaclass=abc.ABCMeta):
+    OPERATIONS = (
+        'get_session', 'get_version', 'store_session', 'store_sessions', 'update_session', 'delete_session', 'sweep'
+    )
+    _sweeper = None
 
     def get_session(self, data: dict) -> dict:
         pass
 
+    def get_version(self, key: str):
+        data = self.get_session(key)
+        return data and data['version']
+
     def store_session(self, data: dict) -> dict:
         pass
 
+    def store_sessions(self, data: list) -> list:
+        return [self.store_session(d) for d in data]
+
     def update_session(self, data: dict) -> dict:
+        """
+        Compare and swap: data['version'] must match the stored version, otherwise
+        ObjectConflictException is raised. The stored and returned data have the version incremented.
+        """
         pass
 
     def delete_session(self, data: dict) -> dict:
         pass
+
+    def sweep(self, now=None) -> int:
+        return 0
+
+    def start_sweeper(self, interval: float):
+        assert not self._sweeper
+        self._sweeper = threading.Event()
+
+        def _run(stop):
+            while not stop.wait(interval):
+                self.sweep()
+        threading.Thread(target=_run, args=(self._sweeper,), daemon=True, name='session-sweeper').start()
+
+    def stop_sweeper(self):
+        self._sweeper and self._sweeper.set()
+        self._sweeper = None
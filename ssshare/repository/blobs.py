@@ -0,0 +1,107 @@
+import contextlib
+import os
+import shutil
+import uuid
+from ssshare import exceptions
+from ssshare.paths import private_directory
+
+
+class FileBlobStorage():
+    """
+    Streamed shares and secrets, in plaintext: the root must be configured, it is kept private to the server user.
+    """
+    def __init__(self, path: str = None):
+        self._path = path
+        self._checked = False
+
+    def _root(self) -> str:
+        if not self._path:
+            raise exceptions.BackendUnavailableException('STREAM_STORAGE_PATH is not configured')
+        if not self._checked:
+            private_directory(self._path)
+            self._checked = True
+        return self._path
+
+    def _file(self, key: str) -> str:
+        parts = key.split('/')
+        if any(part in ('', '.', '..') for part in parts):
+            raise exceptions.WrongParametersException('invalid blob key')
+        return os.path.join(self._root(), *parts)
+
+    def _open(self, key: str):
+        try:
+            return open(self._file(key), 'rb')
+        except FileNotFoundError:
+            raise exceptions.ObjectNotFoundException
+
+    def _makedirs(self, key: str):
+        path = self._root()
+        for part in key.split('/')[:-1]:
+            path = os.path.join(path, part)
+            try:
+                os.mkdir(path, 0o700)
+            except FileExistsError:
+                pass
+
+    @contextlib.contextmanager
+    def writers(self, keys: list):
+        files = []
+        try:
+            for key in keys:
+                path = self._file(key)
+                self._makedirs(key)
+                temp = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+                fd = os.open(temp, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+                files.append((os.fdopen(fd, 'wb'), temp, path))
+            yield [f for f, _, _ in files]
+        except BaseException:
+            for f, temp, _ in files:
+                f.close()
+                os.remove(temp)
+            raise
+        for f, temp, path in files:
+            f.close()
+            os.replace(temp, path)
+
+    def writer(self, key: str):
+        return _single(self.writers([key]))
+
+    @contextlib.contextmanager
+    def readers(self, keys: list):
+        files = []
+        try:
+            for key in keys:
+                files.append(self._open(key))
+            yield files
+        finally:
+            for f in files:
+                f.close()
+
+    def iter_chunks(self, key: str, chunk_size: int):
+        return _chunks(self._open(key), chunk_size)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._file(key))
+
+    def delete(self, prefix: str):
+        if not self._path:
+            return
+        path = self._file(prefix)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isfile(path):
+            os.remove(path)
+
+
+def _chunks(f, chunk_size: int):
+    with f:
+        chunk = f.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = f.read(chunk_size)
+
+
+@contextlib.contextmanager
+def _single(writers):
+    with writers as files:
+        yield files[0]
@@ -0,0 +1,198 @@
+"""
+Binary session codec: a format version byte followed by a tagged value. Strings, bytes and containers
+are length prefixed (varints), uuids are stored as 16 raw bytes and lowercase hex strings, the shares,
+as packed bytes. Lists of dicts sharing their keys, the users, are written as a table holding the keys
+once. Payloads of the former pickle codec are refused, not to unpickle what could be written to the stores.
+
+The tagged format is about a third smaller than pickle and an order of magnitude slower, in pure Python:
+it is meant for the stores whose capacity is bound by the session size, the shm slots and the encoded memory
+repositories. Stores bound by requests rather than bytes write marshal payloads, as fast as pickle and, as the
+tagged format, only ever building plain values (python -m benchmarks.codec).
+"""
+import marshal
+import re
+import struct
+import uuid
+
+FORMAT_VERSION = 1
+MARSHAL = 2
+MARSHAL_VERSION = 4
+PICKLE = 0x80
+NONE, TRUE, FALSE, INT, FLOAT, STR, BYTES, LIST, DICT, UUID_STR, UUID, HEX, TABLE = range(13)
+UUID_RE = re.compile('[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+HEX_RE = re.compile('(?:[0-9a-f]{2})+')
+DOUBLE = struct.Struct('<d')
+
+
+def _varint(out: bytearray, n: int):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _keys(out: bytearray, keys):
+    _varint(out, len(keys))
+    for k in keys:
+        k = k.encode()
+        _varint(out, len(k))
+        out += k
+
+
+def _is_table(value) -> bool:
+    if len(value) < 2 or type(value[0]) is not dict:
+        return False
+    keys = list(value[0])
+    return all(type(v) is dict and list(v) == keys for v in value)
+
+
+def _encode(out: bytearray, value):
+    t = type(value)
+    if t is str:
+        if len(value) == 36 and UUID_RE.fullmatch(value):
+            out.append(UUID_STR)
+            out += bytes.fromhex(value.replace('-', ''))
+        elif HEX_RE.fullmatch(value):
+            out.append(HEX)
+            _varint(out, len(value) // 2)
+            out += bytes.fromhex(value)
+        else:
+            data = value.encode()
+            out.append(STR)
+            _varint(out, len(data))
+            out += data
+    elif value is None:
+        out.append(NONE)
+    elif t is bool:
+        out.append(value and TRUE or FALSE)
+    elif t is int:
+        out.append(INT)
+        _varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif t is dict:
+        out.append(DICT)
+        _varint(out, len(value))
+        for k, v in value.items():
+            k = k.encode()
+            _varint(out, len(k))
+            out += k
+            _encode(out, v)
+    elif (t is list or t is tuple) and _is_table(value):
+        out.append(TABLE)
+        _varint(out, len(value))
+        _keys(out, value[0])
+        for row in value:
+            for v in row.values():
+                _encode(out, v)
+    elif t is list or t is tuple:
+        out.append(LIST)
+        _varint(out, len(value))
+        for v in value:
+            _encode(out, v)
+    elif t is bytes:
+        out.append(BYTES)
+        _varint(out, len(value))
+        out += value
+    elif t is uuid.UUID:
+        out.append(UUID)
+        out += value.bytes
+    elif t is float:
+        out.append(FLOAT)
+        out += DOUBLE.pack(value)
+    else:
+        raise TypeError('cannot encode %s' % t.__name__)
+
+
+def _read_varint(data, pos: int) -> tuple:
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _read_keys(data, pos: int) -> tuple:
+    n, pos = _read_varint(data, pos)
+    keys = []
+    for _ in range(n):
+        k, pos = _read_varint(data, pos)
+        keys.append(str(data[pos:pos + k], 'utf-8'))
+        pos += k
+    return keys, pos
+
+
+def _decode(data, pos: int) -> tuple:
+    tag = data[pos]
+    pos += 1
+    if tag == STR:
+        n, pos = _read_varint(data, pos)
+        return str(data[pos:pos + n], 'utf-8'), pos + n
+    if tag == DICT:
+        n, pos = _read_varint(data, pos)
+        res = {}
+        for _ in range(n):
+            k, pos = _read_varint(data, pos)
+            key = str(data[pos:pos + k], 'utf-8')
+            res[key], pos = _decode(data, pos + k)
+        return res, pos
+    if tag == NONE:
+        return None, pos
+    if tag == INT:
+        n, pos = _read_varint(data, pos)
+        return (n >> 1 if not n & 1 else -((n + 1) >> 1)), pos
+    if tag == UUID_STR:
+        h = data[pos:pos + 16].hex()
+        return '{}-{}-{}-{}-{}'.format(h[:8], h[8:12], h[12:16], h[16:20], h[20:]), pos + 16
+    if tag == TABLE:
+        n, pos = _read_varint(data, pos)
+        keys, pos = _read_keys(data, pos)
+        res = []
+        for _ in range(n):
+            row = {}
+            for k in keys:
+                row[k], pos = _decode(data, pos)
+            res.append(row)
+        return res, pos
+    if tag == HEX:
+        n, pos = _read_varint(data, pos)
+        return data[pos:pos + n].hex(), pos + n
+    if tag == LIST:
+        n, pos = _read_varint(data, pos)
+        res = []
+        for _ in range(n):
+            v, pos = _decode(data, pos)
+            res.append(v)
+        return res, pos
+    if tag == BYTES:
+        n, pos = _read_varint(data, pos)
+        return bytes(data[pos:pos + n]), pos + n
+    if tag == TRUE:
+        return True, pos
+    if tag == FALSE:
+        return False, pos
+    if tag == UUID:
+        return uuid.UUID(bytes=bytes(data[pos:pos + 16])), pos + 16
+    if tag == FLOAT:
+        return DOUBLE.unpack_from(data, pos)[0], pos + DOUBLE.size
+    raise ValueError('unknown tag %s' % tag)
+
+
+def encode(data: dict, compact=True) -> bytes:
+    if not compact:
+        return bytes((MARSHAL,)) + marshal.dumps(data, MARSHAL_VERSION)
+    out = bytearray((FORMAT_VERSION,))
+    _encode(out, data)
+    return bytes(out)
+
+
+def decode(payload) -> dict:
+    data = memoryview(payload)
+    if data[0] == MARSHAL:
+        return marshal.loads(data[1:])
+    if data[0] == PICKLE:
+        raise ValueError('pickled sessions are not decoded, the store must be recreated')
+    if data[0] != FORMAT_VERSION:
+        raise ValueError('unknown session format %s' % data[0])
+    return _decode(data, 1)[0]
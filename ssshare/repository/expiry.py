@@ -0,0 +1,35 @@
+import heapq
+
+
+class ExpiryIndex():
+    """
+    Min-heap of (expires_at, key): entries made stale by a later push or a discard are skipped on pop.
+    """
+    def __init__(self):
+        self._heap = []
+        self._expires = {}
+
+    def push(self, key: str, expires_at):
+        if expires_at is None:
+            self._expires.pop(key, None)
+        elif self._expires.get(key) != expires_at:
+            self._expires[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+
+    def get(self, key: str):
+        return self._expires.get(key)
+
+    def discard(self, key: str):
+        self._expires.pop(key, None)
+
+    def pop_expired(self, now) -> list:
+        res = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+                res.append(key)
+        return res
+
+    def __len__(self):
+        return len(self._heap)
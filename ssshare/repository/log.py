@@ -0,0 +1,272 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from uuid import uuid4
+from ssshare import exceptions
+from ssshare.paths import private_directory
+from ssshare.repository.abstract import Repository
+from ssshare.repository.codec import encode, decode
+from ssshare.repository.expiry import ExpiryIndex
+
+# record: crc32 | op | key length | expires at (0: never) | version | payload length | key | payload
+# the crc covers everything after itself, a torn tail is detected and truncated on replay
+HEADER = struct.Struct('<IBHqII')
+PUT, DELETE = 1, 2
+SNAPSHOT, LOG = 0, 1
+
+
+class _MappedFile():
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a+b')
+        self._map = None
+        self._mapped = 0
+
+    @property
+    def size(self) -> int:
+        return self._file.tell()
+
+    def append(self, data: bytes) -> int:
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+        return offset
+
+    def _remap(self):
+        # the previous mapping is left to the garbage collector, views on it may still be alive
+        self._map = self.size and mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) or None
+        self._mapped = self._map and len(self._map) or 0
+
+    def view(self, offset: int, length: int) -> memoryview:
+        if offset + length > self._mapped:
+            self._remap()
+        return memoryview(self._map)[offset:offset + length]
+
+    def records(self):
+        self._remap()
+        offset = 0
+        while offset + HEADER.size <= self._mapped:
+            crc, op, key_length, expires_at, version, length = HEADER.unpack(self.view(offset, HEADER.size))
+            body = offset + HEADER.size
+            end = body + key_length + length
+            if end > self._mapped or zlib.crc32(self.view(offset + 4, end - offset - 4)) != crc:
+                return
+            key = bytes(self.view(body, key_length)).decode()
+            yield op, key, expires_at or None, version, body + key_length, length, end - offset
+            offset = end
+
+    def truncate(self, size: int = 0):
+        self._map = None
+        self._mapped = 0
+        self._file.truncate(size)
+        self._file.seek(size)
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._map = None
+        self._file.close()
+
+
+def _record(op: int, key: str, expires_at, version: int = 0, payload: bytes = b'') -> bytes:
+    key = key.encode()
+    body = HEADER.pack(0, op, len(key), expires_at or 0, version, len(payload))[4:] + key + payload
+    return struct.pack('<I', zlib.crc32(body)) + body
+
+
+class LogRepository(Repository):
+    """
+    Sessions are appended to a log file, reads are slices of its memory mapping located by an in-memory
+    offset index. A snapshot rewrites the live sessions and resets the log, bounding both the file size
+    and the replay time at restart.
+
+    With sync, every write is fsynced before it returns. Without, writes reach the OS page cache only:
+    they survive a crash of the process, not of the host, which can lose the last ones.
+    """
+    def __init__(
+        self, path: str, session_ttl=-1, on_evict=None, compact_ratio=2.0, compact_min_size=4 * 1024 ** 2, sync=True
+    ):
+        self._path = path
+        self._directory = private_directory(os.path.dirname(os.path.abspath(path)))
+        self._sync = sync
+        self._session_ttl = session_ttl
+        self._on_evict = on_evict
+        self._compact_ratio = compact_ratio
+        self._compact_min_size = compact_min_size
+        self._lock = threading.RLock()
+        self._index = {}  # key: (file, payload offset, payload length, record size, version)
+        self._expiry_index = ExpiryIndex()
+        self._live = 0
+        self.counters = {'evicted': 0, 'expired_rejected': 0, 'snapshots': 0}
+        self._files = [_MappedFile(path + '.snapshot'), _MappedFile(path + '.log')]
+        self._recover()
+
+    def _recover(self):
+        for i, f in enumerate(self._files):
+            end = 0
+            for op, key, expires_at, version, offset, length, size in f.records():
+                if op == PUT:
+                    self._index_put(key, (i, offset, length, size, version), expires_at)
+                else:
+                    self._index_delete(key)
+                end = offset + length
+            if end != f.size:
+                f.truncate(end)
+
+    def _index_put(self, key: str, entry: tuple, expires_at):
+        self._index_delete(key)
+        self._index[key] = entry
+        self._live += entry[3]
+        self._expiry_index.push(key, expires_at)
+
+    def _index_delete(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._live -= entry[3]
+            self._expiry_index.discard(key)
+        return entry
+
+    def _expires_at(self, data: dict):
+        if self._session_ttl == -1 or not data.get('last_update'):
+            return
+        return data['last_update'] + self._session_ttl
+
+    def _append(self, key: str, data: dict):
+        expires_at = self._expires_at(data)
+        payload = encode(data, compact=False)
+        record = _record(PUT, key, expires_at, data['version'], payload)
+        offset = self._files[LOG].append(record) + len(record) - len(payload)
+        self._index_put(key, (LOG, offset, len(payload), len(record), data['version']), expires_at)
+
+    def _commit(self):
+        self._sync and self._files[LOG].sync()
+
+    def _maybe_snapshot(self):
+        size = self._files[SNAPSHOT].size + self._files[LOG].size
+        if size > self._compact_min_size and size > self._live * self._compact_ratio:
+            self.snapshot()
+
+    def _entry(self, key: str):
+        entry = self._index.get(key)
+        expires_at = entry and self._expiry_index.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.counters['expired_rejected'] += 1
+            raise exceptions.ObjectExpiredException
+        return entry
+
+    def get_session(self, key: str):
+        with self._lock:
+            entry = self._entry(key)
+            if not entry:
+                return
+            i, offset, length, _, _ = entry
+            with self._files[i].view(offset, length) as payload:
+                return decode(payload)
+
+    def get_version(self, key: str):
+        with self._lock:
+            entry = self._entry(key)
+            return entry and entry[4]
+
+    def store_session(self, data: dict):
+        session_id = data.get('session_id', str(uuid4()))
+        k = '{}/{}'.format(data['type'], session_id)
+        with self._lock:
+            assert k not in self._index
+            data['uuid'] = session_id
+            data['version'] = 1
+            self._append(k, data)
+            self._commit()
+            self._maybe_snapshot()
+        return data
+
+    def store_sessions(self, data: list):
+        batch = {}
+        for d in data:
+            session_id = d.get('session_id', str(uuid4()))
+            d['uuid'] = session_id
+            batch['{}/{}'.format(d['type'], session_id)] = d
+        with self._lock:
+            assert len(batch) == len(data) and not any(k in self._index for k in batch)
+            for k, d in batch.items():
+                d['version'] = 1
+                self._append(k, d)
+            self._commit()
+            self._maybe_snapshot()
+        return data
+
+    def update_session(self, data: dict):
+        k = '{}/{}'.format(data['type'], data['uuid'])
+        with self._lock:
+            assert k in self._index
+            version = self._index[k][4]
+            if data.get('version') != version:
+                raise exceptions.ObjectConflictException
+            data['version'] = version + 1
+            self._append(k, data)
+            self._commit()
+            self._maybe_snapshot()
+        return data
+
+    def delete_session(self, data: dict):
+        k = '{}/{}'.format(data['type'], data['uuid'])
+        with self._lock:
+            self._delete(k) and self._commit()
+
+    def _delete(self, k: str) -> bool:
+        if self._index_delete(k):
+            self._files[LOG].append(_record(DELETE, k, None))
+            return True
+        return False
+
+    def sweep(self, now=None) -> int:
+        now = now or time.time()
+        with self._lock:
+            evicted = self._expiry_index.pop_expired(now)
+            for k in evicted:
+                self._delete(k)
+            evicted and self._commit()
+            self.counters['evicted'] += len(evicted)
+            self._maybe_snapshot()
+        if self._on_evict:
+            for k in evicted:
+                self._on_evict(k)
+        return len(evicted)
+
+    def snapshot(self):
+        with self._lock:
+            temp = _MappedFile(self._path + '.snapshot.tmp')
+            temp.truncate()
+            index = {}
+            for k, (i, offset, length, size, version) in self._index.items():
+                with self._files[i].view(offset, length) as payload:
+                    record = _record(PUT, k, self._expiry_index.get(k), version, bytes(payload))
+                index[k] = (SNAPSHOT, temp.append(record) + len(record) - length, length, size, version)
+            temp.sync()
+            temp.close()
+            self._files[SNAPSHOT].close()
+            os.replace(temp.path, self._files[SNAPSHOT].path)
+            self._sync and self._sync_directory()
+            self._files[SNAPSHOT] = _MappedFile(self._files[SNAPSHOT].path)
+            self._files[LOG].truncate()
+            self._index = index
+            self.counters['snapshots'] += 1
+
+    def _sync_directory(self):
+        fd = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        with self._lock:
+            for f in self._files:
+                f.close()
+
+    def __len__(self):
+        return len(self._index)
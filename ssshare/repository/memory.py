@@ -1,30 +1,178 @@
+import threading
+import time
+import zlib
 from uuid import uuid4
+from ssshare import exceptions
 from ssshare.repository.abstract import Repository
+from ssshare.repository.expiry import ExpiryIndex
+
+
+def _batch(data: list) -> dict:
+    batch = {}
+    for d in data:
+        session_id = d.get('session_id', str(uuid4()))
+        batch['{}/{}'.format(d['type'], session_id)] = (session_id, d)
+    assert len(batch) == len(data)
+    return batch
 
 
 class VolatileRepository(Repository):
-    def __init__(self, storage):
+    """
+    Sessions are kept as dicts or, with a codec, as (version, payload) tuples.
+    """
+    def __init__(self, storage, session_ttl=-1, on_evict=None, codec=None):
         self._storage = storage
+        self._codec = codec
+        self._session_ttl = session_ttl
+        self._on_evict = on_evict
+        self._lock = threading.RLock()
+        self._expiry_index = ExpiryIndex()
+        self.counters = {'evicted': 0, 'expired_rejected': 0}
+
+    def _expires_at(self, data: dict):
+        if self._session_ttl == -1 or not data.get('last_update'):
+            return
+        return data['last_update'] + self._session_ttl
+
+    def _write(self, k: str, data: dict):
+        self._storage[k] = self._codec and (data['version'], self._codec.encode(data)) or data
+        self._expiry_index.push(k, self._expires_at(data))
+
+    def _version(self, value) -> int:
+        return value[0] if self._codec else value.get('version')
+
+    def _get(self, key: str):
+        value = self._storage.get(key)
+        if value:
+            expires_at = self._expiry_index.get(key)
+            if expires_at is not None and expires_at <= time.time():
+                self.counters['expired_rejected'] += 1
+                raise exceptions.ObjectExpiredException
+        return value or None
 
     def get_session(self, key: str):
-        data = self._storage.get(key)
-        return data or None
+        value = self._get(key)
+        return self._codec.decode(value[1]) if value and self._codec else value
+
+    def get_version(self, key: str):
+        value = self._get(key)
+        return value and self._version(value)
+
+    def _insert(self, batch: dict):
+        with self._lock:
+            assert not any(k in self._storage for k in batch)
+            for k, (session_id, data) in batch.items():
+                data['uuid'] = session_id
+                data['version'] = 1
+                self._write(k, data)
+
+    def _remove(self, batch: dict):
+        with self._lock:
+            for k in batch:
+                del self._storage[k]
+                self._expiry_index.discard(k)
 
     def store_session(self, data: dict):
-        session_id = data.get('session_id', str(uuid4()))
-        k = '{}/{}'.format(data['type'], session_id)
-        assert not self.get_session(k)
-        data['uuid'] = session_id
-        self._storage[k] = data
+        self._insert(_batch([data]))
+        return data
+
+    def store_sessions(self, data: list):
+        self._insert(_batch(data))
         return data
 
     def update_session(self, data: dict):
         k = '{}/{}'.format(data['type'], data['uuid'])
-        assert self.get_session(k)
-        self._storage[k] = data
+        with self._lock:
+            current = self._storage.get(k)
+            assert current
+            version = self._version(current)
+            if version != data.get('version'):
+                raise exceptions.ObjectConflictException
+            data['version'] = version + 1
+            self._write(k, data)
         return data
 
     def delete_session(self, data: dict):
         k = '{}/{}'.format(data['type'], data['uuid'])
-        self.get_session(k)
-        del self._storage[k]
+        with self._lock:
+            del self._storage[k]
+            self._expiry_index.discard(k)
+
+    def sweep(self, now=None) -> int:
+        now = now or time.time()
+        with self._lock:
+            evicted = self._expiry_index.pop_expired(now)
+            for k in evicted:
+                del self._storage[k]
+            self.counters['evicted'] += len(evicted)
+        if self._on_evict:
+            for k in evicted:
+                self._on_evict(k)
+        return len(evicted)
+
+    def __len__(self):
+        return len(self._storage)
+
+
+class ShardedVolatileRepository(Repository):
+    """
+    Sessions are hashed by key on independent VolatileRepository shards, each one with its own lock,
+    so concurrent requests on different sessions rarely contend.
+    """
+    def __init__(self, shards=16, session_ttl=-1, on_evict=None, codec=None):
+        self._shards = [
+            VolatileRepository(storage=dict(), session_ttl=session_ttl, on_evict=on_evict, codec=codec)
+            for _ in range(shards)
+        ]
+
+    def _shard(self, key: str) -> VolatileRepository:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    @property
+    def counters(self) -> dict:
+        res = {}
+        for shard in self._shards:
+            for k, v in shard.counters.items():
+                res[k] = res.get(k, 0) + v
+        return res
+
+    def get_session(self, key: str):
+        return self._shard(key).get_session(key)
+
+    def get_version(self, key: str):
+        return self._shard(key).get_version(key)
+
+    def store_session(self, data: dict):
+        self.store_sessions([data])
+        return data
+
+    def store_sessions(self, data: list):
+        """
+        All or nothing: when a shard refuses its part of the batch, the parts already stored are removed.
+        The sessions of a batch are visible on their shard as soon as it is written.
+        """
+        by_shard = {}
+        for k, entry in _batch(data).items():
+            by_shard.setdefault(self._shard(k), {})[k] = entry
+        stored = []
+        try:
+            for shard, batch in by_shard.items():
+                shard._insert(batch)
+                stored.append((shard, batch))
+        except BaseException:
+            for shard, batch in stored:
+                shard._remove(batch)
+            raise
+        return data
+
+    def update_session(self, data: dict):
+        return self._shard('{}/{}'.format(data['type'], data['uuid'])).update_session(data)
+
+    def delete_session(self, data: dict):
+        return self._shard('{}/{}'.format(data['type'], data['uuid'])).delete_session(data)
+
+    def sweep(self, now=None) -> int:
+        return sum(shard.sweep(now) for shard in self._shards)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
@@ -0,0 +1,294 @@
+import contextlib
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from uuid import uuid4
+from ssshare import exceptions
+from ssshare.paths import private_directory
+from ssshare.repository.abstract import Repository
+from ssshare.repository.codec import encode, decode
+
+# file: header | slot headers, bucket after bucket | slots, bucket after bucket
+# a session is a chain of fixed size slots in the probes buckets from the one its key hashes to, its home, the
+# head slot header holds key, version and expiry. New sessions go to the bucket of the window with most free slots.
+# A bucket is locked by a thread lock and an fcntl lock on its byte of the slot headers area, the buckets of a
+# window in ascending order, so neighbouring windows overlapping on a wrap do not deadlock.
+MAGIC = b'SSSHM002'
+HEADER = struct.Struct('<8sIIII')  # magic | buckets | bucket slots | slot size | probes
+SLOT = struct.Struct('<BiIQd64s')  # state | next slot (-1: last) | length | version | expires at (0: never) | key
+KEY_OFFSET = SLOT.size - 64
+FREE, HEAD, CHAIN = 0, 1, 2
+SWEEP_BUCKETS = 32  # buckets swept under one lock
+
+
+def _runs(buckets) -> list:
+    """
+    [first, count] runs of consecutive buckets, ascending.
+    """
+    runs = []
+    for bucket in sorted(set(buckets)):
+        if runs and sum(runs[-1]) == bucket:
+            runs[-1][1] += 1
+        else:
+            runs.append([bucket, 1])
+    return runs
+
+
+class SharedMemoryRepository(Repository):
+    """
+    Sessions are kept in a file mapped in memory, on /dev/shm by default, so every worker process of
+    a pre-fork server on the same host shares them. The file outlives the processes: it is reused
+    at restart if the geometry matches.
+    """
+    def __init__(
+        self, path: str, buckets=1024, bucket_slots=16, slot_size=4096, probes=8, session_ttl=-1, on_evict=None
+    ):
+        self._path = path
+        self._buckets = buckets
+        self._bucket_slots = bucket_slots
+        self._slot_size = slot_size
+        self._probes = min(probes, buckets)
+        self._session_ttl = session_ttl
+        self._on_evict = on_evict
+        self._locks = [threading.Lock() for _ in range(buckets)]
+        self.counters = {'evicted': 0, 'expired_rejected': 0}
+        self._index = HEADER.size
+        self._data = self._index + buckets * bucket_slots * SLOT.size
+        size = self._data + buckets * bucket_slots * slot_size
+        private_directory(os.path.dirname(os.path.abspath(path)))
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, HEADER.size, 0)
+        try:
+            header = os.pread(self._fd, HEADER.size, 0)
+            if len(header) < HEADER.size or not any(header):
+                os.ftruncate(self._fd, size)
+                header = HEADER.pack(MAGIC, buckets, bucket_slots, slot_size, self._probes)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, HEADER.size, 0)
+        if HEADER.unpack(header) != (MAGIC, buckets, bucket_slots, slot_size, self._probes):
+            os.close(self._fd)
+            raise exceptions.SystemException('{} holds a session store of another geometry'.format(path))
+        self._map = mmap.mmap(self._fd, size)
+        os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        # a lock held by a thread of the parent at fork time would never be released in the child
+        self._locks = [threading.Lock() for _ in range(self._buckets)]
+
+    @contextlib.contextmanager
+    def _locked(self, buckets: list, shared=False):
+        runs = _runs(buckets)
+        with contextlib.ExitStack() as stack:
+            for first, count in runs:
+                for bucket in range(first, first + count):
+                    stack.enter_context(self._locks[bucket])
+            for first, count in runs:
+                fcntl.lockf(self._fd, shared and fcntl.LOCK_SH or fcntl.LOCK_EX, count, self._index + first)
+                stack.callback(fcntl.lockf, self._fd, fcntl.LOCK_UN, count, self._index + first)
+            yield
+
+    def _bucket(self, key: bytes) -> int:
+        return zlib.crc32(key) % self._buckets
+
+    def _window(self, key: bytes) -> list:
+        home = self._bucket(key)
+        return [(home + i) % self._buckets for i in range(self._probes)]
+
+    def _slots(self, bucket: int) -> range:
+        return range(bucket * self._bucket_slots, (bucket + 1) * self._bucket_slots)
+
+    def _states(self, bucket: int) -> bytes:
+        start = self._index + bucket * self._bucket_slots * SLOT.size
+        return self._map[start:start + self._bucket_slots * SLOT.size:SLOT.size]
+
+    def _header(self, slot: int) -> tuple:
+        return SLOT.unpack_from(self._map, self._index + slot * SLOT.size)
+
+    def _expires_at(self, data: dict):
+        if self._session_ttl == -1 or not data.get('last_update'):
+            return
+        return data['last_update'] + self._session_ttl
+
+    def _heads(self, key: bytes) -> list:
+        """
+        (slot, header) of the heads of a session in its window, a crashed writer may have left more than one.
+        """
+        field = key.ljust(64, b'\0')
+        heads = []
+        for first, count in _runs(self._window(key)):
+            start = self._index + first * self._bucket_slots * SLOT.size
+            end = start + count * self._bucket_slots * SLOT.size
+            position = self._map.find(field, start, end)
+            while position != -1:
+                slot, offset = divmod(position - self._index - KEY_OFFSET, SLOT.size)
+                header = not offset and self._header(slot)
+                if header and header[0] == HEAD:
+                    heads.append((slot, header))
+                position = self._map.find(field, position + 1, end)
+        return heads
+
+    def _find(self, key: bytes):
+        """
+        (slot, header) of the most recent head of a session.
+        """
+        heads = self._heads(key)
+        return heads and max(heads, key=lambda head: head[1][3]) or None
+
+    def _head(self, key: bytes):
+        found = self._find(key)
+        if found and found[1][4] and found[1][4] <= time.time():
+            self.counters['expired_rejected'] += 1
+            raise exceptions.ObjectExpiredException
+        return found
+
+    def _chain(self, slot: int) -> list:
+        res = []
+        while slot != -1:
+            res.append(slot)
+            slot = self._header(slot)[1]
+        return res
+
+    def _release(self, slots: list):
+        for slot in slots:
+            SLOT.pack_into(self._map, self._index + slot * SLOT.size, FREE, -1, 0, 0, 0, b'')
+
+    def _read(self, slot: int) -> bytes:
+        chunks = []
+        for slot in self._chain(slot):
+            offset = self._data + slot * self._slot_size
+            chunks.append(self._map[offset:offset + self._header(slot)[2]])
+        return b''.join(chunks)
+
+    def _write(self, key: bytes, version: int, expires_at, payload: bytes, replaced: int = None):
+        """
+        Writes the session in free slots of its window, the emptiest buckets first. The replaced chain is
+        released once the new head is written, or before when the window has no room for both.
+        """
+        assert len(key) <= 64
+        needed = max(1, -(-len(payload) // self._slot_size))
+        free = []
+        for bucket in sorted(self._window(key), key=lambda bucket: self._states(bucket).count(FREE), reverse=True):
+            free.extend(slot for slot, state in zip(self._slots(bucket), self._states(bucket)) if state == FREE)
+        old = replaced is not None and self._chain(replaced) or []
+        if len(free) < needed:
+            if len(free) + len(old) < needed:
+                raise exceptions.BackendUnavailableException('no room left in the session store buckets')
+            self._release(old)
+            free, old = old + free, []
+        slots = free[:needed]
+        for i in reversed(range(needed)):
+            chunk = payload[i * self._slot_size:(i + 1) * self._slot_size]
+            offset = self._data + slots[i] * self._slot_size
+            self._map[offset:offset + len(chunk)] = chunk
+            next_slot = slots[i + 1] if i + 1 < needed else -1
+            header = i and (CHAIN, next_slot, len(chunk), 0, 0, b'') or \
+                (HEAD, next_slot, len(chunk), version, expires_at or 0, key)
+            SLOT.pack_into(self._map, self._index + slots[i] * SLOT.size, *header)
+        self._release(old)
+
+    def get_session(self, key: str):
+        key = key.encode()
+        with self._locked(self._window(key), shared=True):
+            found = self._head(key)
+            payload = found and self._read(found[0])
+        return payload and decode(payload) or None
+
+    def get_version(self, key: str):
+        key = key.encode()
+        with self._locked(self._window(key), shared=True):
+            found = self._head(key)
+        return found and found[1][3] or None
+
+    def store_session(self, data: dict):
+        session_id = data.get('session_id', str(uuid4()))
+        k = '{}/{}'.format(data['type'], session_id).encode()
+        data['uuid'] = session_id
+        data['version'] = 1
+        payload = encode(data)
+        with self._locked(self._window(k)):
+            assert not self._find(k)
+            self._write(k, 1, self._expires_at(data), payload)
+        return data
+
+    def update_session(self, data: dict):
+        k = '{}/{}'.format(data['type'], data['uuid']).encode()
+        version = data.get('version')
+        data['version'] = (version or 0) + 1
+        payload = encode(data)
+        with self._locked(self._window(k)):
+            found = self._find(k)
+            try:
+                assert found
+                if found[1][3] != version:
+                    raise exceptions.ObjectConflictException
+                self._write(k, data['version'], self._expires_at(data), payload, replaced=found[0])
+            except BaseException:
+                data['version'] = version
+                raise
+        return data
+
+    def delete_session(self, data: dict):
+        k = '{}/{}'.format(data['type'], data['uuid']).encode()
+        with self._locked(self._window(k)):
+            for slot, _ in self._heads(k):
+                self._release(self._chain(slot))
+
+    def _neighbourhood(self, first: int, count: int, margin: int) -> set:
+        return {(first - margin + i) % self._buckets for i in range(count + 2 * margin)}
+
+    def _sweep_buckets(self, first: int, count: int, now: float) -> list:
+        """
+        Releases the expired sessions homed in count buckets from first, and the slots of these buckets
+        a crashed writer left behind. The sessions reaching these buckets are homed up to probes - 1 buckets
+        before, their windows end up to probes - 1 buckets after: all of them must be locked.
+        """
+        targets = self._neighbourhood(first, count, 0)
+        homes = {(first - self._probes + 1 + i) % self._buckets for i in range(count + self._probes - 1)}
+        heads = {}
+        for bucket in self._neighbourhood(first, count, self._probes - 1):
+            for slot in self._slots(bucket):
+                header = self._header(slot)
+                if header[0] == HEAD:
+                    heads.setdefault(header[5].rstrip(b'\0'), []).append((header[3], slot, header[4]))
+        evicted, dead, live = [], [], set()
+        for key, versions in heads.items():
+            home = self._bucket(key)
+            if home not in homes:
+                continue
+            _, slot, expires_at = max(versions)
+            if expires_at and expires_at <= now and home in targets:
+                evicted.append(key.decode())
+                dead.extend(s for _, head, _ in versions for s in self._chain(head))
+            else:
+                live.update(self._chain(slot))
+        self._release(dead)
+        self._release([
+            slot for bucket in targets for slot, state in zip(self._slots(bucket), self._states(bucket))
+            if state != FREE and slot not in live
+        ])
+        return evicted
+
+    def sweep(self, now=None) -> int:
+        now = now or time.time()
+        evicted = []
+        for first in range(0, self._buckets, SWEEP_BUCKETS):
+            count = min(SWEEP_BUCKETS, self._buckets - first)
+            with self._locked(self._neighbourhood(first, count, self._probes - 1)):
+                evicted.extend(self._sweep_buckets(first, count, now))
+        self.counters['evicted'] += len(evicted)
+        if self._on_evict:
+            for k in evicted:
+                self._on_evict(k)
+        return len(evicted)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    def __len__(self):
+        return self._map[self._index:self._data:SLOT.size].count(HEAD)
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+from ssshare import exceptions
+from ssshare.paths import private_directory
+from ssshare.repository.abstract import Repository
+from ssshare.repository.codec import encode, decode
+
+# Statements are kept as constants: sqlite3 caches the compiled statement per connection
+# keyed by the SQL text, so every call after the first one reuses the prepared statement.
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS sessions ('
+    ' key TEXT PRIMARY KEY,'
+    ' type TEXT NOT NULL,'
+    ' expires_at INTEGER,'
+    ' version INTEGER NOT NULL,'
+    ' payload BLOB NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS sessions_type_expiry ON sessions (type, expires_at)'
+)
+GET = 'SELECT payload, expires_at FROM sessions WHERE key = ?'
+VERSION = 'SELECT version, expires_at FROM sessions WHERE key = ?'
+INSERT = 'INSERT OR IGNORE INTO sessions (key, type, expires_at, version, payload) VALUES (?, ?, ?, ?, ?)'
+UPDATE = 'UPDATE sessions SET expires_at = ?, version = version + 1, payload = ? WHERE key = ? AND version = ?'
+EXISTS = 'SELECT 1 FROM sessions WHERE key = ?'
+DELETE = 'DELETE FROM sessions WHERE key = ?'
+TYPES = 'SELECT DISTINCT type FROM sessions'
+EXPIRED = 'SELECT key FROM sessions WHERE type = ? AND expires_at <= ?'
+COUNT = 'SELECT COUNT(*) FROM sessions'
+
+
+class SQLiteRepository(Repository):
+    def __init__(self, path: str, session_ttl=-1, on_evict=None):
+        self._path = path
+        private_directory(os.path.dirname(os.path.abspath(path)))
+        self._session_ttl = session_ttl
+        self._on_evict = on_evict
+        self._local = threading.local()
+        self.counters = {'evicted': 0, 'expired_rejected': 0}
+        connection = self._connection
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if not connection:
+            connection = sqlite3.connect(self._path, isolation_level=None, cached_statements=32)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute('PRAGMA busy_timeout = 5000')
+            self._local.connection = connection
+        return connection
+
+    def _expires_at(self, data: dict):
+        if self._session_ttl == -1 or not data.get('last_update'):
+            return
+        return data['last_update'] + self._session_ttl
+
+    def _row(self, k: str, data: dict) -> tuple:
+        return k, data['type'], self._expires_at(data), data['version'], encode(data, compact=False)
+
+    def _fetch(self, statement: str, key: str):
+        row = self._connection.execute(statement, (key,)).fetchone()
+        if not row:
+            return
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.counters['expired_rejected'] += 1
+            raise exceptions.ObjectExpiredException
+        return value
+
+    def get_session(self, key: str):
+        payload = self._fetch(GET, key)
+        return payload and decode(payload)
+
+    def get_version(self, key: str):
+        return self._fetch(VERSION, key)
+
+    def store_session(self, data: dict):
+        session_id = data.get('session_id', str(uuid4()))
+        data['uuid'] = session_id
+        data['version'] = 1
+        cursor = self._connection.execute(INSERT, self._row('{}/{}'.format(data['type'], session_id), data))
+        assert cursor.rowcount == 1
+        return data
+
+    def store_sessions(self, data: list):
+        rows = []
+        for d in data:
+            session_id = d.get('session_id', str(uuid4()))
+            d['uuid'] = session_id
+            d['version'] = 1
+            rows.append(self._row('{}/{}'.format(d['type'], session_id), d))
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.executemany(INSERT, rows)
+            assert cursor.rowcount == len(rows)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return data
+
+    def update_session(self, data: dict):
+        version = data.get('version')
+        data['version'] = (version or 0) + 1
+        k, _, expires_at, _, payload = self._row('{}/{}'.format(data['type'], data['uuid']), data)
+        cursor = self._connection.execute(UPDATE, (expires_at, payload, k, version))
+        if not cursor.rowcount:
+            data['version'] = version
+            assert self._connection.execute(EXISTS, (k,)).fetchone()
+            raise exceptions.ObjectConflictException
+        return data
+
+    def delete_session(self, data: dict):
+        self._connection.execute(DELETE, ('{}/{}'.format(data['type'], data['uuid']),))
+
+    def sweep(self, now=None) -> int:
+        now = now or time.time()
+        connection = self._connection
+        evicted = []
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for _type, in connection.execute(TYPES).fetchall():
+                keys = connection.execute(EXPIRED, (_type, now)).fetchall()
+                connection.executemany(DELETE, keys)
+                evicted.extend(k for k, in keys)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self.counters['evicted'] += len(evicted)
+        if self._on_evict:
+            for k in evicted:
+                self._on_evict(k)
+        return len(evicted)
+
+    def __len__(self):
+        return self._connection.execute(COUNT).fetchone()[0]
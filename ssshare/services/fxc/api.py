@@ -1,5 +1,24 @@
+import contextvars
+import random
+from concurrent.futures import ThreadPoolExecutor
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from ssshare import exceptions, tracing
+
+
 class FXCWebApiService():
-    def __init__(self, fxc_webapi_url: str, max_secret_size=1024000):
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self,
+                 fxc_webapi_url: str,
+                 max_secret_size=1024000,
+                 pool_size=10,
+                 connect_timeout=3.05,
+                 read_timeout=10,
+                 retries=3,
+                 retry_backoff=0.1
+                 ):
         self._fxc_webapi_url = fxc_webapi_url
         self._max = max_secret_size
         self._protocol = 'FXC1'
@@ -7,9 +26,66 @@ class FXCWebApiService():
         self._type = 'WEB'
         self._entropy = 3.1
         self._length = 6
+        self._pool_size = pool_size
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = retries
+        self._retry_backoff = retry_backoff
+        self._http = requests.Session()
+        self._http.mount(
+            'http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        )
+        self._http.mount(
+            'https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        )
+
+    def _config(self, secret: 'SharedSessionSecret') -> dict:
+        return {
+            'protocol': self._protocol,
+            'alphabet': self._alphabet,
+            'type': self._type,
+            'entropy': self._entropy,
+            'length': self._length,
+            'max': self._max,
+            'total': secret.shares,
+            'quorum': secret.quorum
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        # exponential backoff with full jitter
+        return random.uniform(0, self._retry_backoff * 2 ** attempt)
+
+    def _post(self, path: str, payload: dict) -> dict:
+        url = '{}/{}'.format(str(self._fxc_webapi_url).rstrip('/'), path)
+        for attempt in range(self._retries + 1):
+            try:
+                with tracing.span('fxc.' + path, attempt=attempt):
+                    response = self._http.post(url, json=payload, timeout=self._timeout, headers=tracing.headers())
+                if 400 <= response.status_code < 500:
+                    raise exceptions.WrongParametersException(response.text)
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            except (requests.HTTPError, ValueError):
+                raise exceptions.BackendUnavailableException
+            if attempt < self._retries:
+                time.sleep(self._backoff(attempt))
+        raise exceptions.BackendUnavailableException
 
     def split(self, secret: 'SharedSessionSecret') -> 'Shares':
-        raise NotImplementedError
+        from ssshare.domain.secret import Share
+        if len(secret.secret.encode()) > self._max:
+            raise exceptions.WrongParametersException('secret too big')
+        payload = dict(self._config(secret), secret=secret.secret)
+        return [Share(value) for value in self._post('split', payload)['shares']]
+
+    def split_many(self, secrets: list) -> list:
+        # every call runs in a copy of the caller context, to keep the trace
+        contexts = [contextvars.copy_context() for _ in secrets]
+        with ThreadPoolExecutor(max_workers=self._pool_size) as executor:
+            return list(executor.map(lambda context, secret: context.run(self.split, secret), contexts, secrets))
 
-    def combine(self, shares) -> 'SharedSessionSecret':
-        raise NotImplementedError
+    def combine(self, secret: 'SharedSessionSecret') -> str:
+        payload = dict(self._config(secret), shares=[share.value for share in secret.splitted])
+        return self._post('combine', payload)['secret']
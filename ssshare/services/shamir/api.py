@@ -0,0 +1,165 @@
+import os
+from hashlib import sha256
+from ssshare import exceptions
+
+
+def _build_tables():
+    # GF(2^8) with the AES reduction polynomial x^8 + x^4 + x^3 + x + 1 and generator 0x03
+    exp, log = [0] * 510, [0] * 256
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x ^= (x << 1) ^ ((x << 1) & 0x100 and 0x11b)
+    for i in range(255, 510):
+        exp[i] = exp[i - 255]
+    return exp, log
+
+
+EXP, LOG = _build_tables()
+
+# MUL[c] is a 256 bytes translation table for the product by the constant c,
+# so a whole buffer is multiplied by c with a single bytes.translate
+MUL = [bytes(256)] + [
+    bytes([0] + [EXP[LOG[c] + LOG[v]] for v in range(1, 256)]) for c in range(1, 256)
+]
+
+
+def gf_div(a: int, b: int) -> int:
+    assert b
+    return a and EXP[LOG[a] + 255 - LOG[b]]
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+def split_bytes(data: bytes, shares: int, quorum: int) -> list:
+    if not 0 < quorum <= shares < 256:
+        raise exceptions.WrongParametersException('invalid shares / quorum')
+    size = len(data)
+    coefficients = [os.urandom(size) for _ in range(quorum - 1)]
+    res = []
+    for x in range(1, shares + 1):
+        mul = MUL[x]
+        acc = bytes(size)
+        for c in reversed(coefficients):
+            acc = _xor(acc, c).translate(mul)
+        res.append((x, _xor(acc, data)))
+    return res
+
+
+def lagrange_basis(xs: list) -> list:
+    if not xs or 0 in xs or len(set(xs)) != len(xs):
+        raise exceptions.WrongParametersException('invalid shares')
+    res = []
+    for i, xi in enumerate(xs):
+        basis = 1
+        for j, xj in enumerate(xs):
+            if i != j:
+                basis = MUL[basis][gf_div(xj, xj ^ xi)]
+        res.append(MUL[basis])
+    return res
+
+
+def _interpolate(basis: list, ys: list) -> bytes:
+    if len({len(y) for y in ys}) != 1:
+        raise exceptions.WrongParametersException('invalid shares')
+    res = bytes(len(ys[0]))
+    for table, y in zip(basis, ys):
+        res = _xor(res, y.translate(table))
+    return res
+
+
+def combine_bytes(points: list) -> bytes:
+    return _interpolate(lagrange_basis([x for x, _ in points]), [y for _, y in points])
+
+
+def encode_share(x: int, y: bytes) -> str:
+    return '{:02x}{}'.format(x, y.hex())
+
+
+def decode_share(value: str) -> tuple:
+    try:
+        return int(value[:2], 16), bytes.fromhex(value[2:])
+    except (TypeError, ValueError):
+        raise exceptions.WrongParametersException('invalid share')
+
+
+def split_stream(read, writers: list, quorum: int, chunk_size: int, max_size: int) -> tuple:
+    digest, size = sha256(), 0
+    for x, writer in enumerate(writers, 1):
+        writer.write(bytes([x]))
+    chunk = read(chunk_size)
+    while chunk:
+        size += len(chunk)
+        if size > max_size:
+            raise exceptions.WrongParametersException('secret too big')
+        digest.update(chunk)
+        for (_, y), writer in zip(split_bytes(chunk, len(writers), quorum), writers):
+            writer.write(y)
+        chunk = read(chunk_size)
+    if not size:
+        raise exceptions.WrongParametersException('empty secret')
+    return digest.hexdigest(), size
+
+
+def combine_stream(readers: list, writer, chunk_size: int) -> tuple:
+    digest, size = sha256(), 0
+    xs = [reader.read(1) for reader in readers]
+    if not all(xs):
+        raise exceptions.WrongParametersException('invalid shares')
+    basis = lagrange_basis([x[0] for x in xs])
+    ys = [reader.read(chunk_size) for reader in readers]
+    while any(ys):
+        chunk = _interpolate(basis, ys)
+        size += len(chunk)
+        digest.update(chunk)
+        writer.write(chunk)
+        ys = [reader.read(chunk_size) for reader in readers]
+    return digest.hexdigest(), size
+
+
+class ShamirService():
+    def __init__(self, max_secret_size=1024000, parallel=None):
+        self._max = max_secret_size
+        self._protocol = 'NATIVE1'
+        self._parallel = parallel
+
+    def _split_bytes(self, data: bytes, shares: int, quorum: int) -> list:
+        if self._parallel and len(data) >= self._parallel.min_size:
+            return self._parallel.split_bytes(data, shares, quorum)
+        return split_bytes(data, shares, quorum)
+
+    def _combine_bytes(self, points: list) -> bytes:
+        if self._parallel and len(points[0][1]) >= self._parallel.min_size:
+            return self._parallel.combine_bytes(points)
+        return combine_bytes(points)
+
+    def split(self, secret: 'SharedSessionSecret') -> 'Shares':
+        from ssshare.domain.secret import Share
+        data = secret.secret.encode()
+        if len(data) > self._max:
+            raise exceptions.WrongParametersException('secret too big')
+        return [Share(encode_share(x, y)) for x, y in self._split_bytes(data, secret.shares, secret.quorum)]
+
+    def split_many(self, secrets: list) -> list:
+        return [self.split(secret) for secret in secrets]
+
+    def split_stream(self, read, writers: list, quorum: int, chunk_size: int, max_size: int) -> tuple:
+        return split_stream(read, writers, quorum, chunk_size, max_size)
+
+    def combine_stream(self, readers: list, writer, chunk_size: int) -> tuple:
+        return combine_stream(readers, writer, chunk_size)
+
+    def combine(self, secret: 'SharedSessionSecret') -> str:
+        points = {}
+        for share in secret.splitted:
+            x, y = decode_share(share.value)
+            points[x] = y
+        if len(points) < secret.quorum:
+            raise exceptions.ObjectNotFoundException
+        try:
+            return self._combine_bytes(list(points.items())[:secret.quorum]).decode()
+        except UnicodeDecodeError:
+            raise exceptions.WrongParametersException('invalid shares')
@@ -0,0 +1,103 @@
+"""
+Split and combine of large secrets on a process pool. Shamir works byte by byte, so the secret is cut in
+ranges handled by different processes. The secret and the shares are exchanged through shared memory
+segments: the workers get their names and a range, no data goes through the pool pipes.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from ssshare import exceptions
+from ssshare.services.shamir.api import _interpolate, lagrange_basis, split_bytes
+
+
+def _split_range(source: str, target: str, size: int, start: int, end: int, shares: int, quorum: int):
+    inp, out = shared_memory.SharedMemory(source), shared_memory.SharedMemory(target)
+    try:
+        for x, y in split_bytes(bytes(inp.buf[start:end]), shares, quorum):
+            out.buf[(x - 1) * size + start:(x - 1) * size + end] = y
+    finally:
+        inp.close()
+        out.close()
+
+
+def _combine_range(source: str, target: str, size: int, start: int, end: int, xs: list):
+    inp, out = shared_memory.SharedMemory(source), shared_memory.SharedMemory(target)
+    try:
+        ys = [bytes(inp.buf[i * size + start:i * size + end]) for i in range(len(xs))]
+        out.buf[start:end] = _interpolate(lagrange_basis(xs), ys)
+    finally:
+        inp.close()
+        out.close()
+
+
+class ProcessPoolShamir():
+    """
+    Secrets of at least min_size bytes are cut in chunk_size ranges spread on the workers.
+    The pool is started on first use, by a fork server where available, not to fork a threaded server.
+    """
+    def __init__(self, workers: int, min_size=256 * 1024, chunk_size=64 * 1024):
+        self._workers = workers
+        self.min_size = min_size
+        self._chunk_size = chunk_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if not self._executor:
+                # the workers attach the segments: they must share the tracker of this process, which unlinks them
+                resource_tracker.ensure_running()
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' in methods and 'forkserver' or 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self._workers, mp_context=context)
+            return self._executor
+
+    def _ranges(self, size: int) -> list:
+        chunk = max(self._chunk_size, -(-size // (self._workers * 4)))
+        return [(start, min(start + chunk, size)) for start in range(0, size, chunk)]
+
+    def _run(self, fun, source: str, target: str, size: int, *args):
+        futures = [
+            self.executor.submit(fun, source, target, size, start, end, *args) for start, end in self._ranges(size)
+        ]
+        for future in futures:
+            future.result()
+
+    def split_bytes(self, data: bytes, shares: int, quorum: int) -> list:
+        if not 0 < quorum <= shares < 256:
+            raise exceptions.WrongParametersException('invalid shares / quorum')
+        size = len(data)
+        source = shared_memory.SharedMemory(create=True, size=size)
+        target = shared_memory.SharedMemory(create=True, size=size * shares)
+        try:
+            source.buf[:size] = data
+            self._run(_split_range, source.name, target.name, size, shares, quorum)
+            return [(x, bytes(target.buf[(x - 1) * size:x * size])) for x in range(1, shares + 1)]
+        finally:
+            for segment in (source, target):
+                segment.close()
+                segment.unlink()
+
+    def combine_bytes(self, points: list) -> bytes:
+        xs = [x for x, _ in points]
+        lagrange_basis(xs)
+        if len({len(y) for _, y in points}) != 1:
+            raise exceptions.WrongParametersException('invalid shares')
+        size = len(points[0][1])
+        source = shared_memory.SharedMemory(create=True, size=size * len(points))
+        target = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            for i, (_, y) in enumerate(points):
+                source.buf[i * size:(i + 1) * size] = y
+            self._run(_combine_range, source.name, target.name, size, xs)
+            return bytes(target.buf[:size])
+        finally:
+            for segment in (source, target):
+                segment.close()
+                segment.unlink()
+
+    def shutdown(self):
+        self._executor and self._executor.shutdown(wait=True)
+        self._executor = None
@@ -1,8 +1,57 @@
+import os
+
 DEBUG = True
 FLASK_SECRET_KEY = b'change_me'
 FXC_API_URL = NotImplementedError
+FXC_POOL_SIZE = 10
+FXC_CONNECT_TIMEOUT = 3.05
+FXC_READ_TIMEOUT = 10
+FXC_RETRIES = 3
+FXC_RETRY_BACKOFF = 0.1
 DEFAULT_SSS_PROTOCOL = 'fxc1'
 LISTEN_HOSTNAME = 'localhost'
 LISTEN_PORT = 5000
 
-SESSION_TTL = 600
\ No newline at end of file
+REPOSITORY_BACKEND = 'memory'  # memory, sharded, sqlite, log, shm
+REPOSITORY_SHARDS = 16
+REPOSITORY_MEMORY_CODEC = False  # keep memory / sharded sessions encoded instead of as dicts
+DATA_PATH = os.path.join(os.path.expanduser('~'), '.ssshare')  # store directories are created 0700, private
+SQLITE_PATH = os.path.join(DATA_PATH, 'sessions.sqlite')
+LOG_PATH = os.path.join(DATA_PATH, 'sessions')
+LOG_COMPACT_RATIO = 2.0
+LOG_COMPACT_MIN_SIZE = 4 * 1024 ** 2
+LOG_SYNC = True  # fsync every write, or leave it to the OS: a host crash can lose the last writes
+SHM_PATH = os.path.join(os.path.isdir('/dev/shm') and '/dev/shm/ssshare-%d' % os.getuid() or DATA_PATH, 'sessions')
+SHM_BUCKETS = 1024
+SHM_BUCKET_SLOTS = 16
+SHM_BUCKET_PROBES = 8  # a session lies in one of the probes buckets from the one its key hashes to
+SHM_SLOT_SIZE = 4096
+
+SESSION_TTL = 600
+SESSION_SWEEP_INTERVAL = 30
+SESSION_UPDATE_RETRIES = 5
+IDENTITY_MAP_SIZE = 1024
+EVENTS_MAX_TIMEOUT = 60
+EVENTS_HEARTBEAT = 15
+METRICS_ENABLED = True
+METRICS_TOKEN = None  # /metrics answers 'Authorization: Bearer <token>' requests only, none when unset
+PROFILE_SAMPLE_RATE = 0.0  # fraction of the requests profiled
+PROFILE_TOKEN = None  # requests with the X-Ssshare-Profile header set to this value are profiled
+PROFILE_PATH = os.path.join(DATA_PATH, 'profiles')
+TRACING_EXPORTER = None  # None, 'json' or the dotted path of an exporter class
+TRACING_SAMPLE_RATE = 1.0
+TRACING_PATH = os.path.join(DATA_PATH, 'traces.jsonl')
+ASGI_WORKERS = 32  # threads running the synchronous views under the ASGI server
+ASGI_SPOOL_SIZE = 1024 ** 2  # request bodies past this size are spooled to disk
+JOBS_ENABLED = False  # splits and combines run on a worker pool, the PUT returns a pending job
+JOBS_WORKERS = 4
+JOBS_QUEUE_SIZE = 64  # jobs waiting for a worker, past this new jobs are rejected with a 503
+JOBS_TIMEOUT = 30  # a job not done by then is failed and can be retried
+SHAMIR_PARALLEL_WORKERS = 0  # processes splitting and combining large native1 secrets, 0 to stay in process
+SHAMIR_PARALLEL_MIN_SIZE = 256 * 1024
+SHAMIR_PARALLEL_CHUNK_SIZE = 64 * 1024
+SPLIT_BATCH_MAX_SIZE = 1000
+
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_MAX_SECRET_SIZE = 1024 ** 3
+STREAM_STORAGE_PATH = None  # required by the stream endpoints: a directory private to the server user
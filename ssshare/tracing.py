@@ -0,0 +1,148 @@
+import contextlib
+import contextvars
+import functools
+import importlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from ssshare.paths import private_directory
+
+HEADER = 'traceparent'
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current = contextvars.ContextVar('ssshare_span', default=None)
+_exporter = None
+
+
+class Span():
+    __slots__ = ('spans', 'trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'start', '_started', 'duration',
+                 'error')
+
+    def __init__(self, spans: list, trace_id: str, parent_id: str, name: str, attributes: dict):
+        self.spans = spans
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+        self.spans.append(self)
+
+    @property
+    def traceparent(self) -> str:
+        return '00-{}-{}-01'.format(self.trace_id, self.span_id)
+
+    def to_dict(self) -> dict:
+        return dict(
+            trace_id=self.trace_id,
+            span_id=self.span_id,
+            parent_id=self.parent_id,
+            name=self.name,
+            start=self.start,
+            duration=self.duration,
+            attributes=self.attributes,
+            error=self.error
+        )
+
+
+class JsonFileExporter():
+    def __init__(self, path: str):
+        private_directory(os.path.dirname(os.path.abspath(path)))
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list):
+        line = json.dumps({'trace_id': spans[-1].trace_id, 'spans': [s.to_dict() for s in spans]})
+        with self._lock:
+            with open(os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'a') as f:
+                f.write(line + '\n')
+
+
+def load_exporter(name: str):
+    from ssshare import settings
+    if name == 'json':
+        return JsonFileExporter(settings.TRACING_PATH)
+    module, _, cls = name.rpartition('.')
+    return getattr(importlib.import_module(module), cls)()
+
+
+def set_exporter(exporter):
+    global _exporter
+    _exporter = exporter
+
+
+def start_trace(name: str, traceparent: str = None, sample_rate: float = 1.0, **attributes):
+    # sampled at sample_rate whatever the incoming traceparent asks
+    if not _exporter or random.random() >= sample_rate:
+        return
+    parent = traceparent and TRACEPARENT_RE.match(traceparent)
+    if parent and int(parent.group(3), 16) & 1:
+        trace_id, parent_id = parent.group(1), parent.group(2)
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+    return _current.set(Span([], trace_id, parent_id, name, attributes))
+
+
+def end_trace(token, error: str = None, **attributes):
+    root = _current.get()
+    _current.reset(token)
+    root.attributes.update(attributes)
+    root.error = root.error or error
+    root.finish()
+    exporter = _exporter
+    if exporter:
+        exporter.export(root.spans)
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    parent = _current.get()
+    if parent is None:
+        yield
+        return
+    child = Span(parent.spans, parent.trace_id, parent.span_id, name, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def traced(name: str):
+    def decorator(fun):
+        @functools.wraps(fun)
+        def wrapper(*a, **kw):
+            if _current.get() is None:
+                return fun(*a, **kw)
+            with span(name):
+                return fun(*a, **kw)
+        return wrapper
+    return decorator
+
+
+def instrument(instance, methods: tuple, prefix: str):
+    for method in methods:
+        setattr(instance, method, traced(prefix + method)(getattr(instance, method)))
+    return instance
+
+
+def headers() -> dict:
+    parent = _current.get()
+    return parent and {HEADER: parent.traceparent} or {}
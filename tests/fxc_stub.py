@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ssshare import exceptions
+from ssshare.services.shamir.api import split_bytes, combine_bytes, encode_share, decode_share
+
+
+class FXCStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *a):
+        pass
+
+    def _reply(self, status: int, payload: dict = None):
+        body = payload is not None and json.dumps(payload).encode() or b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        with self.server.lock:
+            self.server.requests.append((self.path, dict(self.headers)))
+            failing = self.server.failures > 0
+            self.server.failures -= failing
+        if failing:
+            return self._reply(503)
+        self.server.delay and time.sleep(self.server.delay)
+        try:
+            if self.path == '/split':
+                shares = split_bytes(data['secret'].encode(), data['total'], data['quorum'])
+                return self._reply(200, {'shares': [encode_share(x, y) for x, y in shares]})
+            elif self.path == '/combine':
+                points = dict(decode_share(v) for v in data['shares'])
+                secret = combine_bytes(list(points.items())[:data['quorum']])
+                return self._reply(200, {'secret': secret.decode()})
+        except exceptions.WrongParametersException:
+            return self._reply(400)
+        self._reply(404)
+
+
+class FXCStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), FXCStubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self.failures = 0
+        self.delay = 0
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def start(self) -> 'FXCStubServer':
+        threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
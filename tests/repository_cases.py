@@ -0,0 +1,116 @@
+import threading
+import time
+from ssshare import exceptions
+
+
+class RepositoryTestCases():
+    """
+    Behaviour shared by every Repository backend, mixed in a TestCase defining create_repository.
+    """
+    def create_repository(self, session_ttl=-1, on_evict=None):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.evicted = []
+        self.repo = self.create_repository(session_ttl=10, on_evict=self.evicted.append)
+
+    def _store(self, last_update=None, **kw):
+        return self.repo.store_session(dict(type='split', last_update=last_update or int(time.time()), **kw))
+
+    def test_store_get_update_delete(self):
+        print('{}: sessions are stored, updated and deleted'.format(type(self.repo).__name__))
+        session = self._store(alias='the alias', users=[{'alias': 'a user'}])
+        key = 'split/%s' % session['uuid']
+        self.assertEqual(self.repo.get_session(key)['users'], [{'alias': 'a user'}])
+        session = self.repo.get_session(key)
+        session['alias'] = 'another alias'
+        self.repo.update_session(session)
+        self.assertEqual(self.repo.get_session(key)['alias'], 'another alias')
+        self.repo.delete_session(session)
+        self.assertIsNone(self.repo.get_session(key))
+
+    def test_store_twice(self):
+        print('{}: a session id cannot be stored twice'.format(type(self.repo).__name__))
+        session = self._store()
+        with self.assertRaises(AssertionError):
+            self.repo.store_session(dict(session, session_id=session['uuid']))
+
+    def test_update_missing(self):
+        print('{}: a missing session cannot be updated'.format(type(self.repo).__name__))
+        with self.assertRaises(AssertionError):
+            self.repo.update_session({'type': 'split', 'uuid': 'missing', 'last_update': int(time.time())})
+
+    def test_update_conflict(self):
+        print('{}: an update on a stale version is rejected'.format(type(self.repo).__name__))
+        session = self._store(alias='first')
+        key = 'split/%s' % session['uuid']
+        self.assertEqual(session['version'], 1)
+        stale, fresh = dict(self.repo.get_session(key)), dict(self.repo.get_session(key))
+        fresh['alias'] = 'second'
+        self.assertEqual(self.repo.update_session(fresh)['version'], 2)
+        stale['alias'] = 'lost'
+        with self.assertRaises(exceptions.ObjectConflictException):
+            self.repo.update_session(stale)
+        self.assertEqual(self.repo.get_session(key)['alias'], 'second')
+        self.assertEqual(self.repo.get_session(key)['version'], 2)
+
+    def test_store_sessions(self):
+        print('{}: sessions are stored in bulk'.format(type(self.repo).__name__))
+        now = int(time.time())
+        stored = self.repo.store_sessions([{'type': 'split', 'last_update': now, 'alias': i} for i in range(50)])
+        self.assertEqual(50, len({s['uuid'] for s in stored}))
+        for s in stored:
+            self.assertEqual(self.repo.get_session('split/%s' % s['uuid'])['alias'], s['alias'])
+        self.assertEqual(50, len(self.repo))
+
+    def test_get_rejects_expired(self):
+        print('{}: expired sessions are rejected on get'.format(type(self.repo).__name__))
+        now = int(time.time())
+        fresh, expired = self._store(now), self._store(now - 11)
+        self.assertEqual(self.repo.get_session('split/%s' % fresh['uuid'])['uuid'], fresh['uuid'])
+        with self.assertRaises(exceptions.ObjectExpiredException):
+            self.repo.get_session('split/%s' % expired['uuid'])
+        self.assertEqual(self.repo.counters['expired_rejected'], 1)
+
+    def test_sweep(self):
+        print('{}: the sweeper evicts expired sessions'.format(type(self.repo).__name__))
+        sessions = [self._store(100 + i) for i in range(10)]
+        self.assertEqual(self.repo.sweep(now=100), 0)
+        self.assertEqual(self.repo.sweep(now=112), 3)
+        self.assertEqual(sorted(self.evicted), sorted('split/%s' % s['uuid'] for s in sessions[:3]))
+        self.assertEqual(self.repo.sweep(now=1000), 7)
+        self.assertEqual(self.repo.counters['evicted'], 10)
+        self.assertEqual(0, len(self.repo))
+
+    def test_update_postpones_expiry(self):
+        print('{}: an updated session expires later'.format(type(self.repo).__name__))
+        session = self._store(100)
+        session['last_update'] = 200
+        self.repo.update_session(session)
+        self.assertEqual(self.repo.sweep(now=150), 0)
+        self.assertEqual(self.repo.sweep(now=210), 1)
+
+    def test_concurrent_store_update(self, threads=8, sessions=200, updates=3):
+        print('{}: no store or update is lost under concurrency'.format(type(self.repo).__name__))
+        stored, errors = [[] for _ in range(threads)], []
+
+        def _worker(i):
+            try:
+                for n in range(sessions):
+                    stored[i].append(self._store(worker=i, n=n, updates=0))
+                for u in range(updates):
+                    for session in stored[i]:
+                        session = self.repo.get_session('split/%s' % session['uuid'])
+                        session['updates'] = u + 1
+                        self.repo.update_session(session)
+            except Exception as e:
+                errors.append(e)
+        workers = [threading.Thread(target=_worker, args=(i,)) for i in range(threads)]
+        [w.start() for w in workers]
+        [w.join() for w in workers]
+        self.assertEqual([], errors)
+        self.assertEqual(threads * sessions, len(self.repo))
+        for i in range(threads):
+            for session in stored[i]:
+                session = self.repo.get_session('split/%s' % session['uuid'])
+                self.assertEqual((session['worker'], session['updates']), (i, updates))
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from unittest import TestCase
+from ssshare.asgi import AsgiApp
+from ssshare.control import session_notifier
+
+
+class _Client():
+    """
+    Drives an ASGI app in process: requests are answered with (status, headers, body chunks).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, query='', body=None, headers=(), disconnect=None, events=None):
+        disconnect = disconnect or asyncio.Event()
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'root_path': '',
+            'scheme': 'http', 'query_string': query.encode(), 'server': ('testserver', 80),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers]
+        }
+        requests = [{'type': 'http.request', 'body': body and json.dumps(body).encode() or b''}]
+        response = {'chunks': []}
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response.update(status=message['status'], headers=dict(message['headers']))
+            else:
+                response['chunks'].append(message['body'])
+                if events:
+                    events.put_nowait(message['body'].decode())
+        await self.app(scope, receive, send)
+        return response
+
+    def stream(self, path: str, query: str):
+        """
+        Starts a server-sent events request, events are read from the returned queue.
+        """
+        disconnect, events = asyncio.Event(), asyncio.Queue()
+        task = asyncio.ensure_future(self.request(
+            'GET', path, query, headers=[('Accept', 'text/event-stream')], disconnect=disconnect, events=events
+        ))
+        return task, events, disconnect
+
+
+class TestAsgi(TestCase):
+    def setUp(self):
+        self.app = AsgiApp(workers=4)
+        self.client = _Client(self.app)
+
+    def _run(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+    async def _create(self):
+        response = await self.client.request('POST', '/split', body={
+            'client_alias': 'master',
+            'session_alias': 'asgi session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        })
+        data = json.loads(b''.join(response['chunks']))
+        return data['session_id'], data['session']['users'][0]['auth']
+
+    def _join(self, session_id: str, alias: str):
+        return self.client.request('PUT', '/split/%s' % session_id, body={'client_alias': alias})
+
+    def test_routes(self):
+        print('ASGI: the Flask routes, validators and error mapping are served over ASGI')
+
+        async def _test():
+            session_id, auth = await self._create()
+            response = await self.client.request(
+                'GET', '/split/%s' % session_id, 'auth=%s&client_alias=master' % auth
+            )
+            self.assertEqual(200, response['status'])
+            self.assertEqual(session_id, json.loads(b''.join(response['chunks']))['session_id'])
+            invalid = await self.client.request('GET', '/split/%s' % session_id, 'auth=%s' % auth)
+            self.assertEqual(400, invalid['status'])
+            response = await self.client.request('GET', '/split/%s/events' % session_id, 'auth=%s' % auth)
+            self.assertEqual((400, invalid['chunks']), (response['status'], response['chunks']))
+            response = await self.client.request(
+                'GET', '/split/00000000-0000-0000-0000-000000000000/events', 'auth=%s&client_alias=master' % auth
+            )
+            self.assertEqual(404, response['status'])
+            self.assertEqual(404, (await self.client.request('GET', '/nowhere'))['status'])
+        self._run(_test())
+
+    def test_long_polls(self, waiters=200):
+        print('ASGI: %s long-polls are held by the event loop and woken up by an update' % waiters)
+
+        async def _test():
+            session_id, auth = await self._create()
+            query = 'auth=%s&client_alias=master&version=1' % auth
+            path = '/split/%s/events' % session_id
+            response = await self.client.request('GET', path, query + '&timeout=0')
+            self.assertEqual(204, response['status'])
+            polls = [asyncio.ensure_future(self.client.request('GET', path, query)) for _ in range(waiters)]
+            key = 'split/%s' % session_id
+            while key not in session_notifier._keys or session_notifier._keys[key].count < waiters:
+                await asyncio.sleep(0.01)
+            self.assertFalse(any(p.done() for p in polls))
+            self.assertLessEqual(len(self.app.executor._threads), 4)
+            await self._join(session_id, 'a shareholder')
+            for response in await asyncio.gather(*polls):
+                self.assertEqual(200, response['status'])
+                self.assertEqual(2, json.loads(b''.join(response['chunks']))['version'])
+            self.assertEqual(0, len(session_notifier))
+        self._run(_test())
+
+    def test_event_stream(self):
+        print('ASGI: server sent events follow the session until the client disconnects')
+
+        async def _test():
+            session_id, auth = await self._create()
+            task, events, disconnect = self.client.stream(
+                '/split/%s/events' % session_id, 'auth=%s&client_alias=master' % auth
+            )
+            self.assertTrue((await events.get()).startswith('id: 1\nevent: session\n'))
+            await self._join(session_id, 'a shareholder')
+            second = await events.get()
+            self.assertTrue(second.startswith('id: 2\nevent: session\n'))
+            self.assertEqual(2, len(json.loads(second.split('data: ', 1)[1])['session']['users']))
+            disconnect.set()
+            response = await task
+            self.assertEqual(b'text/event-stream; charset=utf-8', response['headers'][b'content-type'])
+            self.assertEqual(0, len(session_notifier))
+        self._run(_test())
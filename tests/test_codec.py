@@ -0,0 +1,60 @@
+import json
+import pickle
+import uuid
+from unittest import TestCase
+from ssshare.repository import codec
+
+
+class TestCodec(TestCase):
+    def setUp(self):
+        self.session = dict(
+            uuid=str(uuid.uuid4()),
+            version=3,
+            master=dict(uuid=uuid.uuid4().bytes, alias='the session master', shareholder=False),
+            last_update=1500000000,
+            alias='the session alias',
+            users=[dict(uuid=uuid.uuid4().bytes, alias='user %s' % i, shareholder=True) for i in range(5)],
+            secret=dict(
+                secret=None, shares=5, quorum=3, protocol='native1', streamed=False, digest=None,
+                splitted={'values': ['01cafe', '02beef', '03f00d'], 'users': [uuid.uuid4().bytes, None, None]}
+            ),
+            type='combine',
+            subtype='transparent'
+        )
+
+    def test_roundtrip(self):
+        print('Codec: a session survives an encode / decode round trip')
+        payload = codec.encode(self.session)
+        self.assertEqual(codec.FORMAT_VERSION, payload[0])
+        self.assertEqual(self.session, codec.decode(payload))
+        self.assertEqual(self.session, codec.decode(memoryview(payload)))
+
+    def test_marshal(self):
+        print('Codec: the fast format round trips the sessions too')
+        payload = codec.encode(self.session, compact=False)
+        self.assertEqual(codec.MARSHAL, payload[0])
+        self.assertEqual(self.session, codec.decode(payload))
+        self.assertEqual(self.session, codec.decode(memoryview(payload)))
+
+    def test_types(self):
+        print('Codec: value types are preserved')
+        data = {
+            'negative': -2 ** 70, 'float': 0.25, 'uuid': uuid.uuid4(), 'upper': str(uuid.uuid4()).upper(),
+            'odd hex': 'abc', 'upper hex': 'CAFE', 'empty': '', 'unicode': 'àèìòù', 'list': [True, False, None]
+        }
+        self.assertEqual(data, codec.decode(codec.encode(data)))
+        with self.assertRaises(TypeError):
+            codec.encode({'set': {1}})
+
+    def test_size(self):
+        print('Codec: payloads are smaller than pickle and json')
+        payload = codec.encode(self.session)
+        self.assertLess(len(payload), len(pickle.dumps(self.session, protocol=pickle.HIGHEST_PROTOCOL)))
+        self.assertLess(len(payload), len(json.dumps(self.session, default=bytes.hex)))
+
+    def test_legacy(self):
+        print('Codec: pickled payloads and unknown formats are refused')
+        with self.assertRaises(ValueError):
+            codec.decode(pickle.dumps(self.session, protocol=pickle.HIGHEST_PROTOCOL))
+        with self.assertRaises(ValueError):
+            codec.decode(b'\x7f')
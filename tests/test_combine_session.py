@@ -1,4 +1,5 @@
 import json
+import threading
 import uuid
 from unittest.mock import create_autospec
 
@@ -174,4 +175,25 @@ class TestCombineSession(MainTestClass):
         self.assertEqual(expected_master_res['session']['subtype'], master_res.json['session']['subtype'])
         self.assertEqual(4, len(master_res.json['session']['users']))
 
-
+    def test_concurrent_join(self, users=10):
+        print('CombineSession: concurrent joins are all persisted')
+        payload = {
+            "client_alias": self.master_alias,
+            "session_alias": self.session_alias,
+            "session_type": 'transparent',
+            "session_policies": {"shares": users + 1, "quorum": users, "protocol": "native1"}
+        }
+        response = self.client.post('/combine', data=json.dumps(payload))
+        session_id, master = response.json['session_id'], response.json['session']['users'][0]['auth']
+        statuses = []
+
+        def _join(i):
+            client = self.app.test_client()
+            res = client.put('/combine/%s' % session_id, data=json.dumps({'client_alias': 'user %s' % i}))
+            statuses.append(res.status_code)
+        workers = [threading.Thread(target=_join, args=(i,)) for i in range(users)]
+        [w.start() for w in workers]
+        [w.join() for w in workers]
+        self.assertEqual([200] * users, statuses)
+        res = self.client.get('/combine/%s?auth=%s&client_alias=%s' % (session_id, master, self.master_alias))
+        self.assertEqual(users + 1, len(res.json['session']['users']))
@@ -0,0 +1,55 @@
+import json
+from unittest import mock
+from ssshare import control
+from ssshare.domain.combine import CombineSession
+from ssshare.domain.split import SplitSession
+from tests import MainTestClass
+
+
+class TestConditionalGet(MainTestClass):
+    def _session(self, path: str):
+        payload = {'client_alias': 'master', 'session_alias': 'polled session'}
+        payload['session_policies'] = {'shares': 3, 'quorum': 2}
+        if path == '/combine':
+            payload['session_type'] = 'transparent'
+            payload['session_policies']['protocol'] = 'fxc1'
+        response = self.client.post(path, data=json.dumps(payload))
+        session_id, auth = response.json['session_id'], response.json['session']['users'][0]['auth']
+        return session_id, '{}/{}?auth={}&client_alias=master'.format(path, session_id, auth)
+
+    def test_not_modified(self):
+        print('Conditional GET: a matching If-None-Match gets a 304, also when the session is not in the identity map')
+        for path, session_class in (('/split', SplitSession), ('/combine', CombineSession)):
+            session_id, url = self._session(path)
+            response = self.client.get(url)
+            self.assert200(response)
+            etag = response.headers['ETag']
+            self.assertTrue(etag.startswith('W/"'))
+            self.assertEqual('private, no-cache', response.headers['Cache-Control'])
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertStatus(response, 304)
+            self.assertEqual((etag, b''), (response.headers['ETag'], response.data))
+            control.identity_map.clear()
+            with mock.patch.object(session_class, 'from_dict', side_effect=AssertionError):
+                self.assertStatus(self.client.get(url, headers={'If-None-Match': 'W/"0-0", ' + etag}), 304)
+
+    def test_modified(self):
+        print('Conditional GET: a write changes the etag and the session is sent again')
+        session_id, url = self._session('/split')
+        etag = self.client.get(url).headers['ETag']
+        self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'user'}))
+        for _ in range(2):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assert200(response)
+            self.assertNotEqual(etag, response.headers['ETag'])
+            self.assertEqual(['master', 'user'], [u['alias'] for u in response.json['session']['users']])
+            control.identity_map.clear()
+
+    def test_denied(self):
+        print('Conditional GET: the etag of a session does not skip authentication')
+        session_id, url = self._session('/split')
+        etag = self.client.get(url).headers['ETag']
+        url = url.replace(url.split('auth=')[1][:36], '00000000-0000-0000-0000-000000000000')
+        self.assert401(self.client.get(url, headers={'If-None-Match': etag}))
+        control.identity_map.clear()
+        self.assert401(self.client.get(url, headers={'If-None-Match': etag}))
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from unittest import TestCase
+from ssshare.control import session_notifier
+from ssshare.domain.notifier import SessionNotifier
+from tests import MainTestClass
+
+
+class TestSessionNotifier(TestCase):
+    def test_wakeup(self):
+        print('SessionNotifier: a change notified before the wait is not lost')
+        notifier = SessionNotifier()
+        with notifier.listen('split/1') as listener:
+            seen = listener.generation
+            notifier.notify('split/1')
+            notifier.notify('split/2')
+            self.assertTrue(listener.wait(seen, 0))
+            self.assertFalse(listener.wait(listener.generation, 0.01))
+        self.assertEqual(0, len(notifier))
+
+
+class TestSessionEvents(MainTestClass):
+    def _create(self):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'watched session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        return response.json['session_id'], response.json['session']['users'][0]['auth']
+
+    def _url(self, session_id, auth, **kw):
+        query = '&'.join('{}={}'.format(k, v) for k, v in kw.items())
+        return '/split/%s/events?auth=%s&client_alias=master&%s' % (session_id, auth, query)
+
+    def _join(self, session_id, alias, delay=0.1):
+        def _put():
+            time.sleep(delay)
+            self.app.test_client().put('/split/%s' % session_id, data=json.dumps({'client_alias': alias}))
+        thread = threading.Thread(target=_put)
+        thread.start()
+        return thread
+
+    def test_long_poll(self):
+        print('SessionEvents: a long-poll returns the session past the cursor, 204 on timeout')
+        session_id, auth = self._create()
+        response = self.client.get(self._url(session_id, auth))
+        self.assert200(response)
+        version = response.json['version']
+        self.assertEqual(1, len(response.json['session']['users']))
+        self.assertEqual(204, self.client.get(self._url(session_id, auth, version=version, timeout=0)).status_code)
+        self.assert404(self.client.get(self._url('00000000-0000-0000-0000-000000000000', auth)))
+        self.assert400(self.client.get(self._url(session_id, auth, version='last')))
+
+    def test_long_poll_wakeup(self):
+        print('SessionEvents: a waiting long-poll is woken up by an update')
+        session_id, auth = self._create()
+        version = self.client.get(self._url(session_id, auth)).json['version']
+        thread = self._join(session_id, 'a shareholder')
+        start = time.monotonic()
+        response = self.client.get(self._url(session_id, auth, version=version, timeout=10))
+        thread.join()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(version + 1, response.json['version'])
+        self.assertEqual('a shareholder', response.json['session']['users'][1]['alias'])
+        self.assertEqual(0, len(session_notifier))
+
+    def test_event_stream(self):
+        print('SessionEvents: server sent events follow the session changes')
+        session_id, auth = self._create()
+        response = self.client.get(
+            self._url(session_id, auth), headers={'Accept': 'text/event-stream'}, buffered=False
+        )
+        self.assertEqual('text/event-stream', response.mimetype)
+        events = iter(response.response)
+        first = next(events).decode()
+        self.assertTrue(first.startswith('id: 1\nevent: session\n'))
+        thread = self._join(session_id, 'a shareholder')
+        second = next(events).decode()
+        thread.join()
+        self.assertTrue(second.startswith('id: 2\nevent: session\n'))
+        data = json.loads(second.split('data: ', 1)[1])
+        self.assertEqual(2, len(data['session']['users']))
+        response.close()
+        self.assertEqual(0, len(session_notifier))
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from ssshare import exceptions
+from ssshare.domain.secret import SharedSessionSecret, Share
+from ssshare.services.fxc.api import FXCWebApiService
+from tests.fxc_stub import FXCStubServer
+
+
+class TestFXCWebApiService(TestCase):
+    def setUp(self):
+        self.server = FXCStubServer().start()
+        self.service = FXCWebApiService(
+            self.server.url, pool_size=4, connect_timeout=1, read_timeout=0.5, retries=2, retry_backoff=0.01
+        )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _secret(self, value='the secret'):
+        secret = SharedSessionSecret.new(shares=5, quorum=3)
+        secret._secret = value
+        return secret
+
+    def _roundtrip(self, value='the secret'):
+        shares = self.service.split(self._secret(value))
+        combined = SharedSessionSecret.new(shares=5, quorum=3)
+        combined._splitted = shares[2:]
+        return self.service.combine(combined)
+
+    def test_split_combine(self):
+        print('FXCWebApiService: a secret is split and combined by the web api')
+        self.assertEqual(self._roundtrip(), 'the secret')
+        self.assertEqual([p for p, _ in self.server.requests], ['/split', '/combine'])
+
+    def test_keep_alive_pool(self):
+        print('FXCWebApiService: concurrent calls reuse the pooled connections')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: self._roundtrip('secret %s' % i), range(40)))
+        self.assertEqual(results, ['secret %s' % i for i in range(40)])
+        self.assertEqual(len(self.server.requests), 80)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_retry(self):
+        print('FXCWebApiService: unavailable backend responses are retried')
+        self.server.failures = 2
+        self.assertEqual(self._roundtrip(), 'the secret')
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_retries_exhausted(self):
+        print('FXCWebApiService: retries are bounded')
+        self.server.failures = 3
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            self.service.split(self._secret())
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_read_timeout(self):
+        print('FXCWebApiService: a slow backend times out')
+        self.server.delay = 0.5
+        service = FXCWebApiService(self.server.url, read_timeout=0.1, retries=1, retry_backoff=0.01)
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            service.split(self._secret())
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_wrong_shares(self):
+        print('FXCWebApiService: client errors are not retried')
+        combined = SharedSessionSecret.new(shares=5, quorum=3)
+        combined._splitted = [Share('zz')]
+        with self.assertRaises(exceptions.WrongParametersException):
+            self.service.combine(combined)
+        self.assertEqual(len(self.server.requests), 1)
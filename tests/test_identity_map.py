@@ -0,0 +1,91 @@
+import json
+from unittest import TestCase
+from ssshare.control import identity_map
+from ssshare.domain.identity import IdentityMap
+from ssshare.domain.split import SplitSession
+from ssshare.repository.memory import VolatileRepository
+from tests import MainTestClass
+
+
+class _Session():
+    def __init__(self, repo, version=1):
+        self._repo = repo
+        self._version = version
+
+
+class TestIdentityMap(TestCase):
+    def setUp(self):
+        self.repo = VolatileRepository(storage=dict())
+        self.sessions = [self.repo.store_session({'type': 'split', 'session_id': str(i)}) for i in range(3)]
+
+    def test_lru(self):
+        print('IdentityMap: the least recently used session is evicted')
+        i_map = IdentityMap(2)
+        cached = [_Session(self.repo) for _ in range(3)]
+        i_map.put('split/0', cached[0])
+        i_map.put('split/1', cached[1])
+        self.assertIs(i_map.get('split/0', self.repo), cached[0])
+        i_map.put('split/2', cached[2])
+        self.assertIsNone(i_map.get('split/1', self.repo))
+        self.assertIs(i_map.get('split/0', self.repo), cached[0])
+        self.assertEqual(2, len(i_map))
+
+    def test_version(self):
+        print('IdentityMap: a session updated elsewhere is not served')
+        i_map = IdentityMap(2)
+        i_map.put('split/0', _Session(self.repo))
+        self.repo.update_session(self.repo.get_session('split/0'))
+        self.assertIsNone(i_map.get('split/0', self.repo))
+        self.assertIsNone(i_map.get('split/0', VolatileRepository(storage=dict())))
+
+    def test_release(self):
+        print('IdentityMap: the sessions used by a failed unit of work are evicted')
+        i_map = IdentityMap(4)
+        i_map.put('split/0', _Session(self.repo))
+        i_map.release()
+        i_map.put('split/1', _Session(self.repo))
+        i_map.get('split/0', self.repo)
+        i_map.release(commit=False)
+        self.assertEqual(0, len(i_map))
+        i_map.put('split/2', _Session(self.repo))
+        i_map.release()
+        i_map.release(commit=False)
+        self.assertEqual(1, len(i_map))
+
+
+class TestIdentityMapSessions(MainTestClass):
+    def _create(self):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'cached session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        return response.json['session_id'], response.json['session']['users'][0]['auth']
+
+    def test_hit(self):
+        print('IdentityMap: repeated reads reuse the hydrated session')
+        session_id, auth = self._create()
+        url = '/split/%s?auth=%s&client_alias=master' % (session_id, auth)
+        self.assert200(self.client.get(url))
+        hits = identity_map.counters['hits']
+        self.assert200(self.client.get(url))
+        self.assertEqual(hits + 1, identity_map.counters['hits'])
+        self.assertIs(SplitSession.get(session_id), SplitSession.get(session_id))
+
+    def test_write_invalidates(self):
+        print('IdentityMap: a write is visible to the next read')
+        session_id, auth = self._create()
+        url = '/split/%s?auth=%s&client_alias=master' % (session_id, auth)
+        self.assert200(self.client.get(url))
+        self.assert200(self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'a user'})))
+        self.assertEqual(2, len(self.client.get(url).json['session']['users']))
+
+    def test_failure_evicts(self):
+        print('IdentityMap: a failed request does not leave unwritten changes behind')
+        session_id, auth = self._create()
+        self.assert200(self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'a user'})))
+        cached = SplitSession.get(session_id)
+        identity_map.release()
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'a user'}))
+        self.assertEqual(401, response.status_code)
+        self.assertIsNot(cached, SplitSession.get(session_id))
@@ -0,0 +1,180 @@
+import json
+import threading
+from unittest import TestCase, mock
+from ssshare import control, exceptions, settings
+from ssshare.jobs import JobRunner
+from tests import MainTestClass
+
+
+class TestJobRunner(TestCase):
+    def test_bounded(self):
+        print('JobRunner: jobs past the workers and the queue are rejected, the others all run')
+        runner = JobRunner(workers=2, queue_size=1)
+        release, done = threading.Event(), []
+        for i in range(3):
+            runner.admit()
+            runner.submit(lambda i: release.wait(5) and done.append(i), i)
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            runner.admit()
+        self.assertEqual(1, runner.counters['rejected'])
+        release.set()
+        self.assertTrue(runner.wait(5))
+        self.assertEqual([0, 1, 2], sorted(done))
+        runner.admit()
+        runner.shutdown()
+
+    def test_reservations(self):
+        print('JobRunner: admitted jobs hold their room until submitted, or released at the end of the request')
+        runner = JobRunner(workers=2, queue_size=2)
+        admitted, barrier = [], threading.Barrier(8)
+
+        def _request():
+            try:
+                runner.admit()
+                admitted.append(True)
+            except exceptions.BackendUnavailableException:
+                admitted.append(False)
+            barrier.wait()
+            runner.release()
+        threads = [threading.Thread(target=_request) for _ in range(8)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertEqual(4, admitted.count(True))
+        for _ in range(4):
+            runner.admit()
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            runner.admit()
+        runner.release()
+        runner.admit()
+        runner.submit(lambda: None)
+        self.assertTrue(runner.wait(5))
+        for _ in range(4):
+            runner.admit()
+        runner.release()
+        runner.shutdown()
+
+
+class TestAsyncJobs(MainTestClass):
+    def setUp(self):
+        self._settings = settings.JOBS_ENABLED, settings.JOBS_TIMEOUT
+        settings.JOBS_ENABLED = True
+
+    def tearDown(self):
+        control.job_runner.wait(5)
+        settings.JOBS_ENABLED, settings.JOBS_TIMEOUT = self._settings
+
+    def _split_session(self):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'async session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, master_key = response.json['session_id'], response.json['session']['users'][0]['auth']
+        keys = []
+        for alias in ('case', 'molly'):
+            response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': alias}))
+            keys.append((alias, response.json['session']['users'][-1]['auth']))
+        return session_id, master_key, keys
+
+    def _put_secret(self, session_id: str, master_key: str, secret: dict):
+        return self.client.put('/split/%s' % session_id, data=json.dumps({
+            'client_alias': 'master',
+            'auth': master_key,
+            'session': {'secret': secret}
+        }))
+
+    def _get(self, path: str, session_id: str, key: str, alias: str):
+        return self.client.get('/%s/%s?auth=%s&client_alias=%s' % (path, session_id, key, alias))
+
+    def test_split_combine(self):
+        print('Jobs: splits and combines run out of the PUT, the session reports the job until it is done')
+        session_id, master_key, keys = self._split_session()
+        response = self._put_secret(session_id, master_key, {'value': 'my async secret', 'protocol': 'native1'})
+        self.assert200(response)
+        self.assertEqual({'state': 'pending'}, response.json['session']['secret']['job'])
+        self.assertTrue(control.job_runner.wait(5))
+        self.assertEqual(
+            {'state': 'done'}, self._get('split', session_id, master_key, 'master').json['session']['secret']['job']
+        )
+        shares = []
+        for alias, key in keys:
+            response = self._get('split', session_id, key, alias)
+            shares.extend(u['share'] for u in response.json['session']['users'] if u.get('share'))
+        self.assertEqual(2, len(set(shares)))
+
+        response = self.client.post('/combine', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'async combine',
+            'session_type': 'transparent',
+            'session_policies': {'shares': 3, 'quorum': 2, 'protocol': 'native1'}
+        }))
+        combine_id = response.json['session_id']
+        for (alias, _), share in zip(keys, shares):
+            response = self.client.put('/combine/%s' % combine_id, data=json.dumps({
+                'client_alias': alias,
+                'share': share
+            }))
+            self.assert200(response)
+        self.assertEqual({'state': 'pending'}, response.json['session']['secret']['job'])
+        self.assertNotIn('secret', response.json['session']['secret'])
+        self.assertTrue(control.job_runner.wait(5))
+        auth = response.json['session']['users'][-1]['auth']
+        secret = self._get('combine', combine_id, auth, keys[-1][0]).json['session']['secret']
+        self.assertEqual(('done', 'my async secret'), (secret['job']['state'], secret['secret']))
+
+    def test_failed_request(self):
+        print('Jobs: a request failing after its job was admitted gives its room back')
+        session_id, master_key, _ = self._split_session()
+        with mock.patch.object(
+            control.secret_share_repository, 'update_session', side_effect=exceptions.ObjectConflictException
+        ):
+            response = self._put_secret(session_id, master_key, {'value': 'my async secret', 'protocol': 'native1'})
+        self.assertStatus(response, 409)
+        self.assertEqual(0, control.job_runner._reserved)
+        self.assertEqual(0, control.job_runner.pending)
+
+    def test_failure_retry(self):
+        print('Jobs: a failed or timed out job is reported and the session can be retried')
+        session_id, master_key, keys = self._split_session()
+        with mock.patch.object(control.native_shamir_service, 'split', side_effect=ValueError):
+            self._put_secret(session_id, master_key, {'value': 'my async secret', 'protocol': 'native1'})
+            self.assertTrue(control.job_runner.wait(5))
+        job = self._get('split', session_id, master_key, 'master').json['session']['secret']['job']
+        self.assertEqual({'state': 'failed', 'error': 'ValueError'}, job)
+        self.assertFalse(any(u.get('share') for u in self._get('split', session_id, *keys[0][::-1]).json[
+            'session']['users']))
+        settings.JOBS_TIMEOUT = -1
+        self.assert200(self._put_secret(session_id, master_key, {'value': 'another secret'}))
+        self.assertTrue(control.job_runner.wait(5))
+        job = self._get('split', session_id, master_key, 'master').json['session']['secret']['job']
+        self.assertEqual({'state': 'failed', 'error': 'timeout'}, job)
+        settings.JOBS_TIMEOUT = 30
+        self.assert200(self._put_secret(session_id, master_key, {'value': 'another secret'}))
+        self.assertTrue(control.job_runner.wait(5))
+        shares = []
+        for alias, key in keys:
+            response = self._get('split', session_id, key, alias)
+            self.assertEqual({'state': 'done'}, response.json['session']['secret']['job'])
+            shares.extend(u['share'] for u in response.json['session']['users'] if u.get('share'))
+
+        response = self.client.post('/combine', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'async combine',
+            'session_type': 'transparent',
+            'session_policies': {'shares': 3, 'quorum': 2, 'protocol': 'native1'}
+        }))
+        combine_id = response.json['session_id']
+        self.client.put('/combine/%s' % combine_id, data=json.dumps({'client_alias': 'case', 'share': shares[0]}))
+        with mock.patch.object(control.native_shamir_service, 'combine', side_effect=ValueError):
+            response = self.client.put('/combine/%s' % combine_id, data=json.dumps({
+                'client_alias': 'molly', 'share': shares[1]
+            }))
+            self.assertTrue(control.job_runner.wait(5))
+        auth = response.json['session']['users'][-1]['auth']
+        job = self._get('combine', combine_id, auth, 'molly').json['session']['secret']['job']
+        self.assertEqual({'state': 'failed', 'error': 'ValueError'}, job)
+        response = self.client.put('/combine/%s' % combine_id, data=json.dumps({'client_alias': 'wintermute'}))
+        self.assertEqual({'state': 'pending'}, response.json['session']['secret']['job'])
+        self.assertTrue(control.job_runner.wait(5))
+        secret = self._get('combine', combine_id, auth, 'molly').json['session']['secret']
+        self.assertEqual(('done', 'another secret'), (secret['job']['state'], secret['secret']))
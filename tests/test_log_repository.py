@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase, mock
+from ssshare.repository.log import LogRepository
+from tests.repository_cases import RepositoryTestCases
+
+
+class TestLogRepository(RepositoryTestCases, TestCase):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self._path)
+
+    def create_repository(self, session_ttl=-1, on_evict=None, **kw):
+        return LogRepository(os.path.join(self._path, 'sessions'), session_ttl=session_ttl, on_evict=on_evict, **kw)
+
+    def _restart(self, **kw):
+        self.repo.close()
+        self.repo = self.create_repository(session_ttl=10, **kw)
+        return self.repo
+
+    def test_recovery(self):
+        print('LogRepository: sessions, updates and deletes are replayed at restart')
+        sessions = [self._store(alias=i) for i in range(20)]
+        sessions[3]['alias'] = 'updated'
+        self.repo.update_session(sessions[3])
+        self.repo.delete_session(sessions[5])
+        repo = self._restart()
+        self.assertEqual(19, len(repo))
+        self.assertEqual(repo.get_session('split/%s' % sessions[3]['uuid'])['alias'], 'updated')
+        self.assertIsNone(repo.get_session('split/%s' % sessions[5]['uuid']))
+
+    def test_torn_tail(self):
+        print('LogRepository: a torn record at the tail of the log is discarded')
+        sessions = [self._store(alias=i) for i in range(3)]
+        self.repo.close()
+        with open(os.path.join(self._path, 'sessions.log'), 'r+b') as f:
+            f.truncate(os.path.getsize(f.name) - 3)
+        repo = self._restart()
+        self.assertEqual(2, len(repo))
+        session = self._store(alias='after recovery')
+        repo = self._restart()
+        self.assertEqual(3, len(repo))
+        self.assertEqual(repo.get_session('split/%s' % session['uuid'])['alias'], 'after recovery')
+        self.assertEqual(repo.get_session('split/%s' % sessions[1]['uuid'])['alias'], 1)
+
+    def test_snapshot(self):
+        print('LogRepository: a snapshot compacts the log and survives a restart')
+        self._restart(compact_min_size=16 * 1024)
+        sessions = [self._store(alias=i, padding='x' * 100) for i in range(10)]
+        for _ in range(50):
+            for session in sessions:
+                self.repo.update_session(session)
+        self.assertTrue(self.repo.counters['snapshots'])
+        size = sum(os.path.getsize(os.path.join(self._path, f)) for f in os.listdir(self._path))
+        self.assertLess(size, 64 * 1024)
+        self.repo.snapshot()
+        self.assertEqual(0, os.path.getsize(os.path.join(self._path, 'sessions.log')))
+        repo = self._restart()
+        self.assertEqual(10, len(repo))
+        for session in sessions:
+            self.assertEqual(repo.get_session('split/%s' % session['uuid'])['alias'], session['alias'])
+
+    def test_snapshot_keeps_expiry(self):
+        print('LogRepository: expiry survives snapshots and restarts')
+        self._store(last_update=int(time.time()) - 20)
+        self.repo.snapshot()
+        repo = self._restart()
+        self.assertEqual(1, repo.sweep())
+
+    def test_sync(self):
+        print('LogRepository: every write is fsynced before it returns, unless sync is off')
+        with mock.patch('os.fsync') as fsync:
+            session = self._store(alias='synced')
+            self.repo.store_sessions([{'type': 'split', 'last_update': int(time.time())} for _ in range(3)])
+            self.repo.update_session(session)
+            self.repo.delete_session(session)
+            self.repo.delete_session(session)
+            self.assertEqual(4, fsync.call_count)
+            self._restart(sync=False)
+            self._store()
+            self.assertEqual(4, fsync.call_count)
@@ -0,0 +1,72 @@
+import uuid
+from unittest import TestCase
+from ssshare.repository import codec
+from ssshare.repository.memory import VolatileRepository, ShardedVolatileRepository
+from tests.repository_cases import RepositoryTestCases
+
+
+class TestVolatileRepository(RepositoryTestCases, TestCase):
+    def create_repository(self, session_ttl=-1, on_evict=None):
+        return VolatileRepository(storage=dict(), session_ttl=session_ttl, on_evict=on_evict)
+
+    def test_sweep_order(self):
+        print('VolatileRepository: the expiry index pops sessions in expiry order')
+        sessions = [self._store(110 - i) for i in range(5)]
+        self.repo.sweep(now=1000)
+        self.assertEqual(self.evicted, ['split/%s' % s['uuid'] for s in reversed(sessions)])
+        self.assertFalse(self.repo._expiry_index)
+
+    def test_delete(self):
+        print('VolatileRepository: a deleted session leaves no index entry')
+        session = self._store(100)
+        self.repo.delete_session(session)
+        self.assertEqual(self.repo.sweep(now=1000), 0)
+        self.assertEqual(self.repo.counters['evicted'], 0)
+
+    def test_no_ttl(self):
+        print('VolatileRepository: sessions never expire with a -1 ttl')
+        repo = self.create_repository()
+        session = repo.store_session({'type': 'split', 'last_update': 1})
+        self.assertEqual(repo.sweep(), 0)
+        self.assertTrue(repo.get_session('split/%s' % session['uuid']))
+
+
+class TestEncodedVolatileRepository(RepositoryTestCases, TestCase):
+    def create_repository(self, session_ttl=-1, on_evict=None):
+        return VolatileRepository(storage=dict(), session_ttl=session_ttl, on_evict=on_evict, codec=codec)
+
+    def test_encoded(self):
+        print('VolatileRepository: with a codec sessions are stored encoded and read as copies')
+        session = self._store(alias='encoded')
+        key = 'split/%s' % session['uuid']
+        self.assertIsInstance(self.repo._storage[key][1], bytes)
+        self.assertIsNot(self.repo.get_session(key), self.repo.get_session(key))
+        self.assertEqual(1, self.repo.get_version(key))
+
+
+class TestShardedVolatileRepository(RepositoryTestCases, TestCase):
+    def create_repository(self, session_ttl=-1, on_evict=None):
+        return ShardedVolatileRepository(shards=8, session_ttl=session_ttl, on_evict=on_evict)
+
+    def test_shards(self):
+        print('ShardedVolatileRepository: sessions are spread across the shards')
+        sessions = self.repo.store_sessions([{'type': 'split', 'last_update': None} for _ in range(400)])
+        self.assertTrue(all(len(shard) > 20 for shard in self.repo._shards))
+        for session in sessions:
+            key = 'split/%s' % session['uuid']
+            self.assertIs(self.repo._shard(key).get_session(key), session)
+
+    def test_store_sessions_rollback(self):
+        print('ShardedVolatileRepository: a batch refused by a shard is removed from the other shards')
+        stored = self._store()
+        key = 'split/%s' % stored['uuid']
+        batch = [{'type': 'split', 'last_update': None} for _ in range(20)]
+        session_id = str(uuid.uuid4())
+        while self.repo._shard('split/%s' % session_id) is self.repo._shard(key):
+            session_id = str(uuid.uuid4())
+        batch[0]['session_id'] = session_id  # the first shard written is not the one refusing the batch
+        batch.append({'type': 'split', 'last_update': None, 'session_id': stored['uuid']})
+        with self.assertRaises(AssertionError):
+            self.repo.store_sessions(batch)
+        self.assertEqual(1, len(self.repo))
+        self.assertEqual(1, self.repo.get_version(key))
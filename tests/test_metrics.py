@@ -0,0 +1,82 @@
+import json
+from unittest import TestCase
+from ssshare import exceptions, metrics, settings
+from ssshare.repository.memory import VolatileRepository
+from tests import MainTestClass
+
+
+class TestRegistry(TestCase):
+    def test_render(self):
+        print('Metrics: counters and histograms are rendered in the Prometheus text format')
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('requests_total', 'Requests.', labels=('path',)))
+        histogram = registry.register(metrics.Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1)))
+        registry.register(metrics.Collected('live', 'Live things.', lambda: 3))
+        counter.inc('/a "b"\n')
+        counter.inc('/a "b"\n', amount=2)
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual(
+            '# HELP requests_total Requests.\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{path="/a \\"b\\"\\n"} 3\n'
+            '# HELP latency_seconds Latency.\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{le="0.1"} 2\n'
+            'latency_seconds_bucket{le="1"} 3\n'
+            'latency_seconds_bucket{le="+Inf"} 4\n'
+            'latency_seconds_sum 5.65\n'
+            'latency_seconds_count 4\n'
+            '# HELP live Live things.\n'
+            '# TYPE live gauge\n'
+            'live 3\n',
+            registry.render()
+        )
+
+    def test_instrument_repository(self):
+        print('Metrics: repository operations are timed and their failures counted')
+        repository = metrics.instrument_repository(VolatileRepository(storage=dict()))
+        stored = metrics.repository_latency.count('store_session')
+        conflicts = metrics.repository_errors.value('update_session', 'ObjectConflictException')
+        data = repository.store_session({'type': 'split', 'last_update': 1})
+        with self.assertRaises(exceptions.ObjectConflictException):
+            repository.update_session(dict(data, version=0))
+        self.assertEqual(stored + 1, metrics.repository_latency.count('store_session'))
+        self.assertEqual(conflicts + 1, metrics.repository_errors.value('update_session', 'ObjectConflictException'))
+
+
+class TestMetricsEndpoint(MainTestClass):
+    def test_metrics(self):
+        print('Metrics: views, error handlers, repository and split backend are reported at /metrics to the scraper')
+        created = metrics.request_latency.count('split.split_session_create', 'POST')
+        not_found = metrics.errors.value('ObjectNotFoundException', 404)
+        split_bytes = metrics.backend_payload._values.get(('native1', 'split'), [0])[-1]
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'measured session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, auth = response.json['session_id'], response.json['session']['users'][0]['auth']
+        self.client.put('/split/%s' % session_id, data=json.dumps({
+            'client_alias': 'master',
+            'auth': auth,
+            'session': {'secret': {'value': 'cafebabe', 'protocol': 'native1'}}
+        }))
+        self.client.get('/split/00000000-0000-0000-0000-000000000000?auth=%s&client_alias=master' % auth)
+        self.assertEqual(created + 1, metrics.request_latency.count('split.split_session_create', 'POST'))
+        self.assertEqual(not_found + 1, metrics.errors.value('ObjectNotFoundException', 404))
+        self.assertEqual(split_bytes + 8, metrics.backend_payload._values[('native1', 'split')][-1])
+        self.assert404(self.client.get('/metrics'))
+        token, settings.METRICS_TOKEN = settings.METRICS_TOKEN, 'scrape me'
+        try:
+            self.assert404(self.client.get('/metrics', headers={'Authorization': 'Bearer scrape you'}))
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape me'})
+        finally:
+            settings.METRICS_TOKEN = token
+        self.assert200(response)
+        self.assertEqual(metrics.CONTENT_TYPE, response.headers['Content-Type'])
+        body = response.data.decode()
+        self.assertIn('ssshare_http_responses_total{endpoint="split.split_session_shared",status="200"}', body)
+        self.assertIn('ssshare_repository_operation_duration_seconds_count{operation="update_session"}', body)
+        self.assertIn('ssshare_backend_duration_seconds_count{protocol="native1",operation="split"}', body)
+        self.assertIn('# TYPE ssshare_sessions gauge', body)
@@ -0,0 +1,56 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+from ssshare import profiling, settings
+from tests import MainTestClass
+
+
+class TestProfiling(MainTestClass):
+    def setUp(self):
+        self._settings = settings.PROFILE_SAMPLE_RATE, settings.PROFILE_TOKEN, settings.PROFILE_PATH
+        settings.PROFILE_TOKEN = 'profile me'
+        settings.PROFILE_PATH = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(settings.PROFILE_PATH)
+        settings.PROFILE_SAMPLE_RATE, settings.PROFILE_TOKEN, settings.PROFILE_PATH = self._settings
+
+    def _session(self, users: int):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'profiled session',
+            'session_policies': {'shares': users + 1, 'quorum': 2}
+        }))
+        session_id, auth = response.json['session_id'], response.json['session']['users'][0]['auth']
+        for i in range(users):
+            self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'user %s' % i}))
+        return '/split/%s?auth=%s&client_alias=master' % (session_id, auth)
+
+    def test_header(self):
+        print('Profiling: requests carrying the admin header are profiled, named after route and session size')
+        url = self._session(users=4)
+        self.assertEqual([], os.listdir(settings.PROFILE_PATH))
+        self.assertNotIn(profiling.HEADER, self.client.get(url, headers={profiling.HEADER: 'wrong'}).headers)
+        self.assertNotIn(profiling.HEADER, self.client.get(url, headers={profiling.HEADER: 'profile mé'}).headers)
+        response = self.client.get(url, headers={profiling.HEADER: 'profile me'})
+        self.assert200(response)
+        filename = response.headers[profiling.HEADER]
+        self.assertEqual([filename], os.listdir(settings.PROFILE_PATH))
+        self.assertIn('-split.split_session_shared-GET-', filename)
+        self.assertIn('-users4-', filename)
+        stats = pstats.Stats(os.path.join(settings.PROFILE_PATH, filename))
+        self.assertIn('to_api', {function for _, _, function in stats.stats})
+        self.assertFalse(profiling.active())
+
+    def test_sampling(self):
+        print('Profiling: a sampled fraction of the requests is profiled')
+        url = self._session(users=1)
+        settings.PROFILE_SAMPLE_RATE = 1.0
+        self.client.get(url)
+        self.client.put(url.split('?')[0], data=json.dumps({'client_alias': 'user 2'}))
+        self.assert404(self.client.get(url.replace(url[7:43], '00000000-0000-0000-0000-000000000000')))
+        profiles = sorted(os.listdir(settings.PROFILE_PATH))
+        self.assertEqual(3, len(profiles))
+        self.assertEqual(1, len([p for p in profiles if '-PUT-' in p and '-users2-' in p]))
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from ssshare import exceptions
+from ssshare.domain.master import SharedSessionMaster
+from ssshare.domain.split import SplitSession
+from ssshare.repository.memory import VolatileRepository
+
+
+class _Alias(str):
+    comparisons = 0
+
+    def __eq__(self, other):
+        _Alias.comparisons += 1
+        return str.__eq__(self, other)
+
+    __hash__ = str.__hash__
+
+
+class _ScannedList(list):
+    def __init__(self, items):
+        super().__init__(items)
+        self.scans = 0
+
+    def __iter__(self):
+        self.scans += 1
+        return super().__iter__()
+
+    def __contains__(self, item):
+        self.scans += 1
+        return super().__contains__(item)
+
+    def index(self, *args):
+        self.scans += 1
+        return super().index(*args)
+
+
+class TestSessionUsers(TestCase):
+    def setUp(self):
+        self.repo = VolatileRepository(storage=dict())
+        self.session = SplitSession.new(
+            master=SharedSessionMaster.new(alias='master'),
+            alias='crowded session',
+            policies={'shares': 20000, 'quorum': 2},
+            repo=self.repo
+        )
+
+    def test_lookup(self):
+        print('SharedSession: users are found by uuid and aliases are unique')
+        users = [self.session.join('user %s' % i) for i in range(3)]
+        self.assertIs(users[1], self.session.get_user(str(users[1].uuid)))
+        self.assertIs(self.session.master, self.session.get_user(str(self.session.master.uuid)))
+        with self.assertRaises(exceptions.ObjectDeniedException):
+            self.session.join('user 1')
+        session = SplitSession.from_dict(self.session.to_dict(), repo=self.repo)
+        self.assertEqual('user 2', session.get_user(str(users[2].uuid)).alias)
+        with self.assertRaises(exceptions.ObjectDeniedException):
+            session.join('user 2')
+
+    def test_scaling(self, users=10000):
+        print('SharedSession: joins and authenticated lookups do not scan the %s users' % users)
+        joined = [self.session.join(_Alias('user %s' % i)) for i in range(users)]
+        with self.assertRaises(exceptions.ObjectDeniedException):
+            self.session.join(_Alias('user 0'))
+        self.assertLessEqual(_Alias.comparisons, 1)
+        self.session._users = _ScannedList(self.session.users)
+        for user in joined:
+            self.assertIs(user, self.session.get_user(str(user.uuid)))
+        self.assertEqual(0, self.session._users.scans)
+        session = SplitSession.from_dict(self.session.to_dict(), repo=self.repo)
+        self.assertIs(session.users[-1], session.get_user(str(session.users[-1].uuid)))
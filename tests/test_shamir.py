@@ -0,0 +1,122 @@
+import json
+import os
+from unittest import TestCase
+from ssshare import exceptions
+from ssshare.domain.secret import SharedSessionSecret, ShareTable
+from ssshare.services.shamir import api as shamir
+from ssshare.services.shamir.parallel import ProcessPoolShamir
+from tests import MainTestClass
+
+
+class TestShamirEngine(TestCase):
+    def test_tables(self):
+        print('Shamir: GF(256) log/exp tables are consistent')
+        for a in range(1, 256):
+            self.assertEqual(shamir.LOG[shamir.EXP[shamir.LOG[a]]], shamir.LOG[a])
+            self.assertEqual(shamir.MUL[a][shamir.gf_div(1, a)], 1)
+        self.assertEqual(shamir.MUL[0x57][0x83], 0xc1)  # FIPS-197 example
+
+    def test_split_combine(self):
+        print('Shamir: every quorum of shares rebuilds the secret')
+        secret = os.urandom(257)
+        points = shamir.split_bytes(secret, 5, 3)
+        self.assertEqual([x for x, _ in points], [1, 2, 3, 4, 5])
+        self.assertEqual(shamir.combine_bytes(points[:3]), secret)
+        self.assertEqual(shamir.combine_bytes(points[2:]), secret)
+        self.assertEqual(shamir.combine_bytes([points[4], points[0], points[2]]), secret)
+        self.assertNotEqual(shamir.combine_bytes(points[:2]), secret)
+
+    def test_share_encoding(self):
+        print('Shamir: shares are encoded as hex strings')
+        value = shamir.encode_share(3, b'\xca\xfe')
+        self.assertEqual(value, '03cafe')
+        self.assertEqual(shamir.decode_share(value), (3, b'\xca\xfe'))
+        with self.assertRaises(exceptions.WrongParametersException):
+            shamir.decode_share('not a share')
+
+    def test_invalid_policies(self):
+        print('Shamir: invalid policies are refused')
+        with self.assertRaises(exceptions.WrongParametersException):
+            shamir.split_bytes(b'secret', 3, 4)
+        with self.assertRaises(exceptions.WrongParametersException):
+            shamir.combine_bytes([(1, b'a'), (1, b'b')])
+
+
+class TestProcessPoolShamir(TestCase):
+    def setUp(self):
+        self.pool = ProcessPoolShamir(2, min_size=1024, chunk_size=1000)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_split_combine(self):
+        print('Shamir: a secret split in ranges on a process pool is rebuilt by both engines')
+        secret = os.urandom(10 * 1024 + 7)
+        points = self.pool.split_bytes(secret, 5, 3)
+        self.assertEqual([x for x, _ in points], [1, 2, 3, 4, 5])
+        self.assertEqual(shamir.combine_bytes(points[2:]), secret)
+        self.assertEqual(self.pool.combine_bytes([points[4], points[0], points[2]]), secret)
+        self.assertEqual(self.pool.combine_bytes(shamir.split_bytes(secret, 3, 2)[1:]), secret)
+        with self.assertRaises(exceptions.WrongParametersException):
+            self.pool.split_bytes(secret, 3, 4)
+        with self.assertRaises(exceptions.WrongParametersException):
+            self.pool.combine_bytes([(1, secret), (2, secret[1:])])
+
+    def test_service(self):
+        print('Shamir: the native service hands the secrets past the size threshold to the process pool')
+        service = shamir.ShamirService(parallel=self.pool)
+        secret = SharedSessionSecret.new(shares=3, quorum=2, protocol='native1')
+        secret._secret = 'small secret'
+        service.split(secret)
+        self.assertIsNone(self.pool._executor)
+        secret._secret = 'large secret' * 1000
+        secret._splitted = ShareTable(service.split(secret))
+        self.assertIsNotNone(self.pool._executor)
+        secret._secret = None
+        self.assertEqual('large secret' * 1000, service.combine(secret))
+
+
+class TestShamirSessions(MainTestClass):
+    def test_split_and_combine(self):
+        print('Shamir: a secret split by a native split session is rebuilt by a native combine session')
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'native session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        self.assert200(response)
+        session_id, master_key = response.json['session_id'], response.json['session']['users'][0]['auth']
+        keys = []
+        for alias in ('case', 'molly'):
+            response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': alias}))
+            self.assert200(response)
+            keys.append((alias, response.json['session']['users'][-1]['auth']))
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({
+            'client_alias': 'master',
+            'auth': master_key,
+            'session': {'secret': {'value': 'my native secret', 'protocol': 'native1'}}
+        }))
+        self.assert200(response)
+        self.assertEqual(response.json['session']['secret']['protocol'], 'native1')
+        shares = []
+        for alias, key in keys:
+            response = self.client.get('/split/%s?auth=%s&client_alias=%s' % (session_id, key, alias))
+            self.assert200(response)
+            shares.extend(u['share'] for u in response.json['session']['users'] if u.get('share'))
+        self.assertEqual(len(set(shares)), 2)
+
+        response = self.client.post('/combine', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'native combine',
+            'session_type': 'transparent',
+            'session_policies': {'shares': 3, 'quorum': 2, 'protocol': 'native1'}
+        }))
+        self.assert200(response)
+        combine_id = response.json['session_id']
+        for (alias, _), share in zip(keys, shares):
+            response = self.client.put('/combine/%s' % combine_id, data=json.dumps({
+                'client_alias': alias,
+                'share': share
+            }))
+            self.assert200(response)
+        self.assertEqual(response.json['session']['secret']['secret'], 'my native secret')
@@ -0,0 +1,77 @@
+import time
+import uuid
+from unittest import TestCase, mock
+from ssshare.domain.master import SharedSessionMaster
+from ssshare.domain.split import SplitSession
+from ssshare.domain.secret import Share, ShareTable, SharedSessionSecret
+from ssshare.domain.user import SharedSessionUser
+from ssshare.repository.memory import VolatileRepository
+
+
+class TestShareTable(TestCase):
+    def test_attach_and_get(self):
+        print('ShareTable: shares are attached to users and found by user')
+        users = [uuid.uuid4() for _ in range(3)]
+        table = ShareTable([Share('cafe01', str(users[0])), Share('cafe02'), Share('cafe03')])
+        self.assertEqual(1, table.index(None))
+        self.assertEqual('cafe02', table.attach(users[1]).value)
+        self.assertEqual(str(users[1]), table.get(str(users[1])).user)
+        self.assertIsNone(table.get(users[2]))
+        self.assertEqual('cafe03', table.attach(users[2].bytes).value)
+        self.assertIsNone(table.attach(uuid.uuid4()))
+        self.assertIsNone(table.index(None))
+        self.assertEqual(['cafe01', 'cafe02'], [s.value for s in table[:2]])
+
+    def test_serialization(self):
+        print('ShareTable: shares are serialized as columns, legacy lists are still read')
+        user = uuid.uuid4()
+        legacy = [{'user': str(user), 'value': 'cafe01'}, {'user': None, 'value': 'cafe02'}]
+        table = ShareTable.from_dict(legacy)
+        self.assertEqual({'values': ['cafe01', 'cafe02'], 'users': [user.bytes, None]}, table.to_dict())
+        self.assertEqual(legacy, [s.to_dict() for s in ShareTable.from_dict(table.to_dict())])
+
+    def test_slots(self):
+        print('ShareTable: domain objects have no instance dict')
+        user = SharedSessionUser.from_dict({'uuid': str(uuid.uuid4()), 'alias': 'a user', 'shareholder': True})
+        for obj in (user, SharedSessionMaster.new(alias='master'), Share('cafe01'), SharedSessionSecret()):
+            self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertEqual(16, len(user.to_dict()['uuid']))
+        self.assertEqual(user.uuid, SharedSessionUser.from_dict(user.to_dict()).uuid)
+
+    def test_free_queue(self):
+        print('ShareTable: free shares are assigned in order, also after a round trip')
+        user = uuid.uuid4()
+        table = ShareTable([Share('cafe0%s' % i) for i in range(4)])
+        table.attach(user)
+        table = ShareTable.from_dict(table.to_dict())
+        self.assertEqual(0, table.index(user))
+        self.assertEqual(['cafe01', 'cafe02'], [table.attach(uuid.uuid4()).value for _ in range(2)])
+        table.append(Share('cafe04'))
+        self.assertEqual(['cafe03', 'cafe04'], [table.attach(uuid.uuid4()).value for _ in range(2)])
+
+    def _render(self, users: int):
+        session = SplitSession.new(
+            master=SharedSessionMaster.new(alias='master'),
+            alias='crowded session',
+            policies={'shares': users, 'quorum': 2},
+            repo=VolatileRepository(storage=dict())
+        )
+        session._last_update = int(time.time())
+        for i in range(users // 2):
+            session.join('user %s' % i)
+        session.secret._set_splitted([Share('%04x' % i) for i in range(users)])
+        for i in range(users // 2, users):
+            session.secret.attach_user_to_share(session.join('user %s' % i))
+        session = SplitSession.from_dict(session.to_dict(), repo=session._repo)
+        with mock.patch.object(ShareTable, '_share', side_effect=ShareTable._share, autospec=True) as share, \
+                mock.patch.object(ShareTable, 'index', side_effect=ShareTable.index, autospec=True) as index:
+            res = session.to_api(auth=str(session.master.uuid))
+        self.assertEqual(['%04x' % i for i in range(users)], [u['share'] for u in res['users'][1:]])
+        return share.call_count, index.call_count
+
+    def test_render_scaling(self):
+        print('ShareTable: rendering a split session looks up and builds one share per shareholder')
+        for users in (2000, 8000):
+            built, lookups = self._render(users)
+            self.assertEqual(users, built)
+            self.assertLessEqual(lookups, users + 1)
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from ssshare import exceptions
+from ssshare.repository import shm
+from ssshare.repository.shm import SharedMemoryRepository
+from tests.repository_cases import RepositoryTestCases
+
+
+def _increment(path: str, key: str, rounds: int):
+    repo = SharedMemoryRepository(path, buckets=512, slot_size=256)
+    for _ in range(rounds):
+        while True:
+            session = repo.get_session(key)
+            session['counter'] += 1
+            try:
+                repo.update_session(session)
+                break
+            except exceptions.ObjectConflictException:
+                pass
+    repo.close()
+
+
+class TestSharedMemoryRepository(RepositoryTestCases, TestCase):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self._path)
+
+    def create_repository(self, session_ttl=-1, on_evict=None, **kw):
+        kw = dict(dict(buckets=512, slot_size=256), **kw)
+        return SharedMemoryRepository(
+            os.path.join(self._path, 'sessions'), session_ttl=session_ttl, on_evict=on_evict, **kw
+        )
+
+    def test_processes(self):
+        print('SharedMemoryRepository: processes updating the same session do not lose updates')
+        session = self._store(counter=0)
+        key = 'split/%s' % session['uuid']
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_increment, args=(os.path.join(self._path, 'sessions'), key, 50))
+            for _ in range(4)
+        ]
+        [w.start() for w in workers]
+        [w.join() for w in workers]
+        self.assertEqual([0] * 4, [w.exitcode for w in workers])
+        self.assertEqual((200, 201), (self.repo.get_session(key)['counter'], self.repo.get_version(key)))
+
+    def test_large_session(self):
+        print('SharedMemoryRepository: a session larger than a slot spans a chain of slots')
+        session = self._store(padding='x' * 1000)
+        key = 'split/%s' % session['uuid']
+        session['padding'] = 'y' * 2000
+        self.repo.update_session(session)
+        self.assertEqual('y' * 2000, self.repo.get_session(key)['padding'])
+        self.assertEqual(sorted(self.repo._chain(self.repo._find(key.encode())[0])), self._used(key))
+
+    def _used(self, key: str) -> list:
+        return sorted(
+            slot for bucket in self.repo._window(key.encode()) for slot in self.repo._slots(bucket)
+            if self.repo._header(slot)[0] != shm.FREE
+        )
+
+    def test_full_bucket(self):
+        print('SharedMemoryRepository: a full store rejects new sessions and keeps the stored ones')
+        self.repo.close()
+        os.remove(os.path.join(self._path, 'sessions'))
+        self.repo = self.create_repository(session_ttl=10, buckets=1, bucket_slots=4)
+        sessions = [self._store(alias=i) for i in range(4)]
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            self._store()
+        sessions[0]['padding'] = 'x' * 300
+        with self.assertRaises(exceptions.BackendUnavailableException):
+            self.repo.update_session(sessions[0])
+        self.assertEqual(4, len(self.repo))
+        self.repo.delete_session(sessions[1])
+        self.repo.update_session(sessions[0])
+        self.assertEqual('x' * 300, self.repo.get_session('split/%s' % sessions[0]['uuid'])['padding'])
+
+    def test_reopen(self):
+        print('SharedMemoryRepository: the store is shared with a later process of the same geometry only')
+        session = self._store(alias='shared')
+        repo = self.create_repository(session_ttl=10)
+        self.assertEqual('shared', repo.get_session('split/%s' % session['uuid'])['alias'])
+        repo.close()
+        with self.assertRaises(exceptions.SystemException):
+            self.create_repository(buckets=64)
+
+    def test_sweep_crashed_writer(self):
+        print('SharedMemoryRepository: the sweeper reclaims the slots of an interrupted update')
+        session = self._store(padding='x' * 600)
+        key = 'split/%s' % session['uuid']
+        slot = self.repo._find(key.encode())[0]
+        self.repo._release = lambda slots: None
+        session['alias'] = 'updated'
+        self.repo.update_session(session)
+        del self.repo._release
+        self.assertEqual(6, len(self._used(key)))
+        self.assertEqual('updated', self.repo.get_session(key)['alias'])
+        self.assertEqual(0, self.repo.sweep(now=1))
+        self.assertEqual(sorted(self.repo._chain(self.repo._find(key.encode())[0])), self._used(key))
+        self.assertNotIn(slot, self.repo._chain(self.repo._find(key.encode())[0]))
+
+    def test_delete_crashed_writer(self):
+        print('SharedMemoryRepository: a deleted session does not come back from the head an interrupted update left')
+        session = self._store(alias='deleted')
+        key = 'split/%s' % session['uuid']
+        self.repo._release = lambda slots: None
+        self.repo.update_session(session)
+        del self.repo._release
+        self.assertEqual(2, len(self.repo._heads(key.encode())))
+        self.repo.delete_session(session)
+        self.assertIsNone(self.repo.get_session(key))
+        self.assertEqual(0, len(self.repo))
+
+    def test_load(self):
+        print('SharedMemoryRepository: sessions spread on neighbouring buckets, the store takes 80% of its slots')
+        self.repo.close()
+        os.remove(os.path.join(self._path, 'sessions'))
+        self.repo = self.create_repository(session_ttl=10, buckets=128, bucket_slots=16)
+        sessions = [self._store(alias=i) for i in range(128 * 16 * 8 // 10)]
+        for session in sessions:
+            session['alias'] = 'updated'
+            self.repo.update_session(session)
+        self.assertEqual(len(sessions), len(self.repo))
+        self.assertTrue(all(self.repo.get_session('split/%s' % s['uuid'])['alias'] == 'updated' for s in sessions))
+        self.assertEqual(0, self.repo.sweep())
+        self.assertEqual(len(sessions), len(self.repo))
+        self.assertEqual(len(sessions), self.repo.sweep(now=time.time() + 20))
+        self.assertEqual(0, len(self.repo))
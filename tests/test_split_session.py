@@ -278,3 +278,56 @@ class TestSplitSession(MainTestClass):
         }
         response = self.client.put('/split/%s' % session_id, data=json.dumps(payload))
         self.assert400(response)
+
+    def test_batch_create_sessions(self):
+        print('SplitSession: a master create many sessions with secrets in a single request')
+        payload = {
+            'client_alias': self.master_alias,
+            'sessions': [
+                {
+                    'session_alias': 'device %s' % i,
+                    'session_policies': {'shares': 3, 'quorum': 2},
+                    'secret': {'value': 'device secret %s' % i, 'protocol': 'native1'}
+                } for i in range(10)
+            ]
+        }
+        response = self.client.post('/split/batch', data=json.dumps(payload))
+        self.assert200(response)
+        master_key = response.json['auth']
+        self.assertTrue(is_uuid(master_key))
+        self.assertEqual(10, len(response.json['sessions']))
+        self.assertEqual(10, len({s['session_id'] for s in response.json['sessions']}))
+        for i, session in enumerate(response.json['sessions']):
+            self.assertEqual(session['session']['alias'], 'device %s' % i)
+            self.assertEqual(session['session']['secret']['secret'], 'device secret %s' % i)
+            self.assertEqual(session['session']['secret']['protocol'], 'native1')
+        print('SplitSession: a user join a batch created session and obtains its share')
+        session_id = response.json['sessions'][3]['session_id']
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'a shareholder'}))
+        self.assert200(response)
+        self.assertTrue(response.json['session']['users'][1]['share'])
+        response = self.client.get('/split/%s?auth=%s&client_alias=%s' % (session_id, master_key, self.master_alias))
+        self.assert200(response)
+        self.assertEqual(response.json['session']['secret']['secret'], 'device secret 3')
+
+    def test_batch_create_sessions_400_wrong_policies(self):
+        print('SplitSession: a batch with wrong policies, an empty secret or wrong size is refused')
+        payload = {
+            'client_alias': self.master_alias,
+            'sessions': [
+                {
+                    'session_alias': 'device',
+                    'session_policies': {'shares': 3, 'quorum': 3},
+                    'secret': {'value': 'device secret', 'protocol': 'native1'}
+                }
+            ]
+        }
+        response = self.client.post('/split/batch', data=json.dumps(payload))
+        self.assert400(response)
+        payload['sessions'][0]['session_policies'] = {'shares': 3, 'quorum': 2}
+        payload['sessions'][0]['secret']['value'] = ''
+        response = self.client.post('/split/batch', data=json.dumps(payload))
+        self.assert400(response)
+        payload['sessions'] = []
+        response = self.client.post('/split/batch', data=json.dumps(payload))
+        self.assert400(response)
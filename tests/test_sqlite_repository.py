@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from ssshare import exceptions
+from ssshare.repository.sqlite import SQLiteRepository
+from tests.repository_cases import RepositoryTestCases
+
+
+class TestSQLiteRepository(RepositoryTestCases, TestCase):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self._path)
+
+    def create_repository(self, session_ttl=-1, on_evict=None):
+        return SQLiteRepository(os.path.join(self._path, 'sessions.sqlite'), session_ttl=session_ttl, on_evict=on_evict)
+
+    def test_wal(self):
+        print('SQLiteRepository: the database runs in WAL mode')
+        self.assertEqual(self.repo._connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+
+    def test_persistence(self):
+        print('SQLiteRepository: sessions survive a restart')
+        session = self._store(alias='persistent')
+        repo = self.create_repository(session_ttl=10)
+        self.assertEqual(repo.get_session('split/%s' % session['uuid'])['alias'], 'persistent')
+
+    def test_threads(self):
+        print('SQLiteRepository: every thread uses its own connection')
+        stored = []
+
+        def _store():
+            stored.extend(self._store() for _ in range(20))
+        threads = [threading.Thread(target=_store) for _ in range(4)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertEqual(80, len(self.repo))
+
+    def test_private_directory(self):
+        print('SQLiteRepository: a database in a directory open to other users is refused')
+        os.chmod(self._path, 0o1777)
+        with self.assertRaises(exceptions.SystemException):
+            self.create_repository()
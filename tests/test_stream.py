@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+from ssshare import control, exceptions, settings
+from ssshare.repository.blobs import FileBlobStorage
+from tests import MainTestClass
+
+
+class TestStreamSessions(MainTestClass):
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+        self._storage, control.blob_storage = control.blob_storage, FileBlobStorage(self._path)
+        self._chunk_size, settings.STREAM_CHUNK_SIZE = settings.STREAM_CHUNK_SIZE, 4096
+
+    def tearDown(self):
+        control.blob_storage = self._storage
+        settings.STREAM_CHUNK_SIZE = self._chunk_size
+        shutil.rmtree(self._path)
+
+    def _split_session(self, secret: bytes):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'stream session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, master_key = response.json['session_id'], response.json['session']['users'][0]['auth']
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'case'}))
+        user_key = response.json['session']['users'][1]['auth']
+        print('StreamSession: the master streams a secret into a split session')
+        response = self.client.put(
+            '/split/%s/secret?auth=%s&client_alias=master' % (session_id, master_key), data=secret
+        )
+        self.assert200(response)
+        return session_id, master_key, user_key, response.json
+
+    def test_stream_split_and_combine(self):
+        secret = os.urandom(50000)
+        session_id, master_key, user_key, response = self._split_session(secret)
+        from hashlib import sha256
+        self.assertEqual(response['session']['secret']['sha256'], sha256(secret).hexdigest())
+        self.assertTrue(response['session']['secret']['streamed'])
+        self.assertNotIn('secret', response['session']['secret'])
+        self.assertNotIn(secret, control.secret_share_repository.get_session('split/%s' % session_id).values())
+
+        print('StreamSession: shareholders download their shares, also sending the ETag of the session')
+        etag = self.client.get('/split/%s?auth=%s&client_alias=case' % (session_id, user_key)).headers['ETag']
+        shares = [self.client.get(
+            '/split/%s/share?auth=%s&client_alias=case' % (session_id, user_key), headers={'If-None-Match': etag}
+        )]
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({'client_alias': 'molly'}))
+        molly_key = response.json['session']['users'][2]['auth']
+        shares.append(self.client.get('/split/%s/share?auth=%s&client_alias=molly' % (session_id, molly_key)))
+        user = self.client.get('/split/%s?auth=%s&client_alias=molly' % (session_id, molly_key)).json['session'][
+            'users'][2]
+        self.assertEqual((True, None), (user['streamed'], user.get('share')))
+        for share in shares:
+            self.assert200(share)
+            self.assertEqual(len(share.data), len(secret) + 1)
+        self.assertNotEqual(shares[0].data[0], shares[1].data[0])
+        self.assert404(self.client.get('/split/%s/share?auth=%s&client_alias=master' % (session_id, master_key)))
+
+        print('StreamSession: shareholders stream their shares into a combine session')
+        response = self.client.post('/combine', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'stream combine',
+            'session_type': 'federated',
+            'session_policies': {'shares': 3, 'quorum': 2, 'protocol': 'native1'}
+        }))
+        combine_id, combine_master = response.json['session_id'], response.json['session']['users'][0]['auth']
+        for alias, share in zip(('case', 'molly'), shares):
+            response = self.client.put('/combine/%s/share?client_alias=%s' % (combine_id, alias), data=share.data)
+            self.assert200(response)
+        self.assertEqual(response.json['session']['secret']['sha256'], sha256(secret).hexdigest())
+        user_key = response.json['session']['users'][2]['auth']
+        self.assert401(self.client.get('/combine/%s/secret?auth=%s&client_alias=molly' % (combine_id, user_key)))
+        response = self.client.get('/combine/%s/secret?auth=%s&client_alias=master' % (combine_id, combine_master))
+        self.assert200(response)
+        self.assertEqual(response.data, secret)
+
+    def test_stream_secret_only_once(self):
+        session_id, master_key, user_key, _ = self._split_session(b'the secret')
+        print('StreamSession: a secret cannot be streamed twice, nor by a shareholder')
+        response = self.client.put(
+            '/split/%s/secret?auth=%s&client_alias=master' % (session_id, master_key), data=b'another secret'
+        )
+        self.assert401(response)
+        response = self.client.put(
+            '/split/%s/secret?auth=%s&client_alias=case' % (session_id, user_key), data=b'another secret'
+        )
+        self.assert401(response)
+
+    def test_stream_requires_stream_protocol(self):
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'stream session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, master_key = response.json['session_id'], response.json['session']['users'][0]['auth']
+        print('StreamSession: protocols without streaming support are refused')
+        response = self.client.put(
+            '/split/%s/secret?auth=%s&client_alias=master&protocol=fxc1' % (session_id, master_key), data=b'secret'
+        )
+        self.assert400(response)
+
+    def test_private_storage(self):
+        print('StreamSession: blobs are written 0600 in a private directory, a shared one is refused')
+        session_id, *_ = self._split_session(b'the secret')
+        for root, dirs, files in os.walk(self._path):
+            for name in dirs:
+                self.assertEqual(0o700, os.stat(os.path.join(root, name)).st_mode & 0o777)
+            for name in files:
+                self.assertEqual(0o600, os.stat(os.path.join(root, name)).st_mode & 0o777)
+        os.chmod(self._path, 0o755)
+        with self.assertRaises(exceptions.SystemException):
+            FileBlobStorage(self._path).exists('split/%s' % session_id)
+
+    def test_storage_not_configured(self):
+        control.blob_storage = FileBlobStorage(None)
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'stream session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, master_key = response.json['session_id'], response.json['session']['users'][0]['auth']
+        print('StreamSession: streams are unavailable until STREAM_STORAGE_PATH is configured')
+        response = self.client.put('/split/%s/secret?auth=%s&client_alias=master' % (session_id, master_key), data=b's')
+        self.assertStatus(response, 503)
+
+    def test_share_keys(self):
+        response = self.client.post('/combine', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'stream combine',
+            'session_type': 'federated',
+            'session_policies': {'shares': 3, 'quorum': 2, 'protocol': 'native1'}
+        }))
+        combine_id = response.json['session_id']
+        self.assert200(self.client.put('/combine/%s/share?client_alias=case' % combine_id, data=b'\x01share'))
+        print('StreamSession: JSON shares are refused once shares are streamed, keys cannot leave the storage')
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        with open(os.path.join(outside, 'target'), 'wb') as f:
+            f.write(b'\x02server file')
+        key = os.path.relpath(os.path.join(outside, 'target'), self._path)
+        response = self.client.put('/combine/%s' % combine_id, data=json.dumps({'client_alias': 'molly', 'share': key}))
+        self.assert401(response)
+        for key in (key, 'combine//secret', 'combine/./secret'):
+            with self.assertRaises(exceptions.WrongParametersException):
+                control.blob_storage.iter_chunks(key, 1024)
+        with self.assertRaises(exceptions.ObjectNotFoundException):
+            control.blob_storage.iter_chunks('combine/%s/missing' % combine_id, 1024)
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from ssshare import control, tracing
+from ssshare.domain.secret import SharedSessionSecret
+from ssshare.services.fxc.api import FXCWebApiService
+from tests import MainTestClass
+from tests.fxc_stub import FXCStubServer
+
+
+class _Collector():
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans: list):
+        self.traces.append(spans)
+
+
+class TestSpans(TestCase):
+    def setUp(self):
+        self.collector = _Collector()
+        tracing.set_exporter(self.collector)
+
+    def tearDown(self):
+        tracing.set_exporter(None)
+
+    def test_nesting(self):
+        print('Tracing: spans nest under the root span and the trace is exported when it ends')
+        with tracing.span('outside') as span:
+            self.assertIsNone(span)
+        token = tracing.start_trace('request', method='GET')
+        with tracing.span('outer', size=3):
+            with self.assertRaises(ValueError):
+                with tracing.span('inner'):
+                    raise ValueError
+        tracing.end_trace(token, status=200)
+        self.assertIsNone(tracing.current())
+        inner, outer, root = self.collector.traces[0]
+        self.assertEqual(['inner', 'outer', 'request'], [s.name for s in (inner, outer, root)])
+        self.assertEqual({root.trace_id}, {s.trace_id for s in (inner, outer)})
+        self.assertEqual((outer.span_id, root.span_id, None), (inner.parent_id, outer.parent_id, root.parent_id))
+        self.assertEqual(('ValueError', None), (inner.error, outer.error))
+        self.assertEqual({'method': 'GET', 'status': 200}, root.attributes)
+        self.assertEqual({'size': 3}, outer.attributes)
+
+    def test_sampling(self):
+        print('Tracing: requests are sampled, also when the caller sampled them, and join the trace of the caller')
+        self.assertIsNone(tracing.start_trace('request', sample_rate=0))
+        traceparent = '00-{}-{}-01'.format('ab' * 16, 'cd' * 8)
+        self.assertIsNone(tracing.start_trace('request', traceparent, sample_rate=0))
+        for parent in (traceparent, traceparent[:-1] + '0'):
+            tracing.end_trace(tracing.start_trace('request', parent, sample_rate=1))
+        followed, unsampled = self.collector.traces[0][0], self.collector.traces[1][0]
+        self.assertEqual(('ab' * 16, 'cd' * 8), (followed.trace_id, followed.parent_id))
+        self.assertNotEqual('ab' * 16, unsampled.trace_id)
+        self.assertIsNone(unsampled.parent_id)
+
+    def test_json_exporter(self):
+        print('Tracing: the JSON exporter appends a line per trace to a file private to the server user')
+        path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+        tracing.set_exporter(tracing.JsonFileExporter(path))
+        for _ in range(2):
+            token = tracing.start_trace('request')
+            with tracing.span('work'):
+                pass
+            tracing.end_trace(token)
+        with open(path) as f:
+            traces = [json.loads(line) for line in f]
+        self.assertEqual(2, len(traces))
+        self.assertEqual(0o600, os.stat(path).st_mode & 0o777)
+        self.assertEqual(['work', 'request'], [s['name'] for s in traces[1]['spans']])
+        self.assertEqual(traces[1]['trace_id'], traces[1]['spans'][0]['trace_id'])
+
+
+class TestRequestTracing(MainTestClass):
+    def setUp(self):
+        self.collector = _Collector()
+        tracing.set_exporter(self.collector)
+        self.stub = FXCStubServer().start()
+        self._fxc = control.fxc_web_api_service
+        control.fxc_web_api_service = FXCWebApiService(self.stub.url)
+
+    def tearDown(self):
+        tracing.set_exporter(None)
+        control.fxc_web_api_service = self._fxc
+        self.stub.stop()
+
+    def test_request(self):
+        print('Tracing: a request is traced across validation, domain, repository and FXC, which gets the trace')
+        response = self.client.post('/split', data=json.dumps({
+            'client_alias': 'master',
+            'session_alias': 'traced session',
+            'session_policies': {'shares': 3, 'quorum': 2}
+        }))
+        session_id, auth = response.json['session_id'], response.json['session']['users'][0]['auth']
+        self.collector.traces.clear()
+        response = self.client.put('/split/%s' % session_id, data=json.dumps({
+            'client_alias': 'master',
+            'auth': auth,
+            'session': {'secret': {'value': 'cafebabe', 'protocol': 'fxc1'}}
+        }))
+        self.assert200(response)
+        spans = {s.name: s for s in self.collector.traces[0]}
+        self.assertTrue({
+            'validate', 'session.get', 'repository.get_session', 'session.from_dict', 'secret.split',
+            'fxc.split', 'repository.update_session', 'session.to_api', 'split.split_session_shared'
+        } <= set(spans))
+        self.assertEqual(spans['secret.split'].span_id, spans['fxc.split'].parent_id)
+        self.assertEqual(200, spans['split.split_session_shared'].attributes['status'])
+        _, headers = self.stub.requests[-1]
+        self.assertEqual(spans['fxc.split'].traceparent, headers['traceparent'])
+
+    def test_split_many(self):
+        print('Tracing: batched FXC splits keep the trace of the caller')
+        secrets = [SharedSessionSecret.new(shares=3, quorum=2, protocol='fxc1') for _ in range(4)]
+        for secret in secrets:
+            secret._secret = 'cafebabe'
+        token = tracing.start_trace('batch')
+        control.fxc_web_api_service.split_many(secrets)
+        tracing.end_trace(token)
+        spans = self.collector.traces[0]
+        root = spans[-1]
+        self.assertEqual(4, len([s for s in spans if s.name == 'fxc.split' and s.parent_id == root.span_id]))
+        self.assertEqual(
+            {s.traceparent for s in spans if s.name == 'fxc.split'},
+            {headers['traceparent'] for _, headers in self.stub.requests}
+        )
@@ -36,4 +36,60 @@ class TestValidators(TestCase):
 
             invalid = {k: v for k, v in self._valid_create.items()}
             invalid['moar'] = 'values'
-            validators.SplitSessionCreateValidator(invalid)
\ No newline at end of file
+            validators.SplitSessionCreateValidator(invalid)
+
+    def _accepted(self, validator, value):
+        try:
+            validator(value)
+            return True
+        except PyCombValidationError:
+            return False
+
+    def test_compiled_validators(self):
+        print('Validators: compiled validators agree with the pycomb combinators')
+        auth = '5e2e4f8b-2b1c-4a55-9b0d-2c9f1c1a8a11'
+        secret = {'value': 'a secret', 'protocol': 'native1'}
+        cases = {
+            validators.SplitSessionCreateValidator: [
+                self._valid_create, dict(self._valid_create, moar='values'), dict(self._valid_create, client_alias=1),
+                dict(self._valid_create, session_policies={'shares': '5', 'quorum': 3}), {}, None, [], 'string'
+            ],
+            validators.SplitSessionBatchCreateValidator: [
+                {'client_alias': 'a', 'sessions': [{
+                    'session_alias': 'b', 'session_policies': {'shares': 5, 'quorum': 3}, 'secret': secret
+                }]},
+                {'client_alias': 'a', 'sessions': [{
+                    'session_alias': 'b', 'session_policies': {'shares': 5, 'quorum': 3},
+                    'secret': dict(secret, protocol='nope')
+                }]},
+                {'client_alias': 'a', 'sessions': [{'session_alias': 'b'}]},
+                {'client_alias': 'a', 'sessions': None}
+            ],
+            validators.SplitSessionGetValidator: [
+                {'client_alias': 'a', 'auth': auth}, {'client_alias': 'a', 'auth': 'not a uuid'},
+                {'client_alias': 'a'}, {'client_alias': 'a', 'auth': auth, 'more': 1}
+            ],
+            validators.SplitSessionEditValidator: [
+                {'client_alias': 'a'}, {'client_alias': 'a', 'auth': auth, 'session': {'secret': secret}},
+                {'client_alias': 'a', 'auth': auth}, {'client_alias': 'a', 'session': {'secret': secret}},
+                {'client_alias': 'a', 'auth': auth, 'session': {'secret': {'protocol': 'fxc1'}}}, {}
+            ],
+            validators.CombineSessionCreateValidator: [
+                {'client_alias': 'a', 'session_alias': 'b', 'session_type': 'federated',
+                 'session_policies': {'shares': 5, 'quorum': 3}},
+                {'client_alias': 'a', 'session_alias': 'b', 'session_type': 'federated', 'session_id': auth,
+                 'session_policies': {'shares': 5, 'quorum': 3}},
+                {'client_alias': 'a', 'session_alias': 'b', 'session_type': 'federated', 'session_id': 'nope',
+                 'session_policies': {'shares': 5, 'quorum': 3}}
+            ],
+            validators.CombineSessionEditValidator: [
+                {'client_alias': 'a'}, {'client_alias': 'a', 'share': 'cafe'},
+                {'client_alias': 'a', 'auth': auth, 'share': 'cafe'}, {'client_alias': 'a', 'auth': None, 'share': 'x'},
+                {'client_alias': 'a', 'auth': auth, 'session_alias': 'b', 'session_type': 'c'},
+                {'client_alias': 'a', 'auth': auth, 'session_alias': 'b'}, {'client_alias': 'a', 'share': 1}
+            ]
+        }
+        for validator, values in cases.items():
+            check = validators.compile_validator(validator)
+            for value in values:
+                self.assertEqual(self._accepted(validator, value), check(value), value)